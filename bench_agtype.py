@@ -0,0 +1,61 @@
+import json
+import re
+import timeit
+from shared_utils import agtype_utils
+from shared_utils.agtype_utils import parse_agtype, Vertex, Edge, Path
+
+# Benchmark: parse_agtype vs the ad-hoc parsing services do on raw exec_cypher results
+
+VERTEX = '{"id": %d, "label": "Entity", "properties": {"id": "ENTITY %d", "name": "Entity %d", "tags": ["[{\\"page\\": 0, \\"document_id\\": \\"64a56fe2-2cad-4ca5-8ba9-be82feaba479\\"}]"], "references": ["2f7a035f-85fb-4c82-8a9e-68ca7c50b2c2"]}}::vertex'
+EDGE = '{"id": %d, "label": "RELATED_TO", "end_id": %d, "start_id": %d, "properties": {"name": "related to"}}::edge'
+ANNOTATION = re.compile(r'::(vertex|edge|path|numeric)')
+
+def make_vertex_rows(n):
+    return [VERTEX % (i, i, i) for i in range(n)]
+
+def make_path_rows(n, hops=3):
+    rows = []
+    for i in range(n):
+        elements = [VERTEX % (i, i, i)]
+        for h in range(hops):
+            elements.append(EDGE % (i * 10 + h, i + h + 1, i + h))
+            elements.append(VERTEX % (i + h + 1, i + h + 1, i + h + 1))
+        rows.append("[" + ", ".join(elements) + "]::path")
+    return rows
+
+def naive_parse(text):
+    """String slicing + json.loads, as done in services today. Returns plain dicts."""
+    return json.loads(ANNOTATION.sub('', text))
+
+def _to_entity(d):
+    if not isinstance(d, dict):
+        return d
+    if 'start_id' in d:
+        return Edge(d['id'], d['label'], d['start_id'], d['end_id'], d['properties'])
+    return Vertex(d['id'], d['label'], d['properties'])
+
+def naive_typed_parse(text):
+    """naive_parse followed by wrapping the dicts into the same typed objects parse_agtype returns."""
+    value = naive_parse(text)
+    if text.endswith('::path'):
+        return Path(tuple(_to_entity(d) for d in value))
+    return _to_entity(value)
+
+def _time(fn, rows, number):
+    return min(timeit.repeat(lambda: [fn(r) for r in rows], number=number, repeat=3)) / number
+
+def run(name, rows, number=5):
+    naive = _time(naive_parse, rows, number)
+    naive_typed = _time(naive_typed_parse, rows, number)
+    fast = _time(parse_agtype, rows, number)
+    print(f"{name:<12} rows={len(rows):<7} naive={naive * 1e3:8.2f}ms  naive+typed={naive_typed * 1e3:8.2f}ms  "
+          f"parse_agtype={fast * 1e3:8.2f}ms  speedup vs naive+typed={naive_typed / fast:5.2f}x")
+
+def main():
+    print(f"json backend: {'orjson' if agtype_utils.orjson is not None else 'json'}")
+    run("vertices", make_vertex_rows(50_000))
+    run("3-hop paths", make_path_rows(10_000))
+    run("scalars", ['"ENTITY %d"' % i for i in range(100_000)])
+
+if __name__ == "__main__":
+    main()
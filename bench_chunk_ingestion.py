@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import time
+import uuid
+from sqlalchemy import delete
+from shared_utils.clients.db_client import db_client
+from shared_utils.clients.async_db_client import async_db_client
+from shared_utils.queries.chunks import insert_chunks, bulk_insert_chunks
+from shared_utils.queries.async_chunks import async_insert_chunks, async_bulk_insert_chunks
+from shared_utils.sql_models import DocumentMetadata
+from shared_utils.sql_models.Chunk import Chunk
+
+# Benchmark: ORM insert_chunks vs COPY bulk_insert_chunks (sync and async) for one large document.
+# Needs the POSTGRES_* environment variables of DBClient; rows are deleted afterwards.
+# usage: python bench_chunk_ingestion.py [num_chunks ...]
+
+TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 30  # ~1.7 KB per chunk, a PDF page
+
+def make_chunks(document_id, num_chunks):
+    """Generator, so the COPY paths can stream the rows."""
+    for page in range(num_chunks):
+        yield Chunk(chunk_id=uuid.uuid4(), document_id=document_id, text=TEXT, page_number=page)
+
+def create_document():
+    document_id = uuid.uuid4()
+    with db_client.managed_session() as session:
+        session.add(DocumentMetadata(document_id=document_id, s3_key=f"bench/{document_id}.pdf", status="bench"))
+    return document_id
+
+def delete_document(document_id):
+    with db_client.managed_session() as session:
+        session.exec(delete(Chunk).where(Chunk.document_id == document_id))
+        session.exec(delete(DocumentMetadata).where(DocumentMetadata.document_id == document_id))
+
+def time_sync(insert, num_chunks, materialize):
+    document_id = create_document()
+    try:
+        chunks = make_chunks(document_id, num_chunks)
+        with db_client.managed_session() as session:
+            start = time.perf_counter()
+            insert(session, list(chunks) if materialize else chunks)
+            return time.perf_counter() - start
+    finally:
+        delete_document(document_id)
+
+async def time_async(insert, num_chunks, materialize):
+    document_id = create_document()
+    try:
+        chunks = make_chunks(document_id, num_chunks)
+        async with async_db_client.managed_session() as session:
+            start = time.perf_counter()
+            await insert(session, list(chunks) if materialize else chunks)
+            return time.perf_counter() - start
+    finally:
+        delete_document(document_id)
+
+async def time_async_paths(num_chunks):
+    # one event loop for both paths: pooled asyncpg connections are bound to their loop
+    try:
+        return (await time_async(async_insert_chunks, num_chunks, materialize=True),
+                await time_async(async_bulk_insert_chunks, num_chunks, materialize=False))
+    finally:
+        await async_db_client.engine.dispose()
+
+def run(num_chunks):
+    orm = time_sync(insert_chunks, num_chunks, materialize=True)
+    copy = time_sync(bulk_insert_chunks, num_chunks, materialize=False)
+    async_orm, async_copy = asyncio.run(time_async_paths(num_chunks))
+    print(f"chunks={num_chunks:<7} orm={orm:7.2f}s  copy={copy:7.2f}s ({orm / copy:5.1f}x)  "
+          f"async orm={async_orm:7.2f}s  async copy={async_copy:7.2f}s ({async_orm / async_copy:5.1f}x)")
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [2_000, 20_000]
+    for num_chunks in sizes:
+        run(num_chunks)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import sys
+import time
+import numpy as np
+from shared_utils.sql_models import LayoutName
+from shared_utils.visuals.layouts import compute_layout
+
+# Benchmark: compute_layout on random sparse graphs (average degree 4) of growing size.
+# usage: python bench_layouts.py [num_nodes ...]
+
+def make_graph(num_nodes, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, num_nodes, size=(2 * num_nodes, 2))
+
+def run(num_nodes):
+    edges = make_graph(num_nodes)
+    timings = []
+    for layout_name in LayoutName:
+        start = time.perf_counter()
+        compute_layout(layout_name, num_nodes, edges, seed=0)
+        timings.append(f"{layout_name.value.lower()}={time.perf_counter() - start:7.2f}s")
+    print(f"nodes={num_nodes:<7} " + "  ".join(timings))
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for num_nodes in sizes:
+        run(num_nodes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import random
+import re
+import timeit
+from unicodedata import normalize
+from shared_utils.serialization_utils import normalize_entity_id, normalize_entity_ids
+
+# Benchmark: entity ID normalization on the names of one document's chunk graphs, where a few
+# hundred distinct entities appear as entities and as both ends of many relations.
+
+FIRST = ["Marie", "José", "Zoë", "Ægir", "Renée", "Łukasz", "Ana", "Søren", "Chloé", "Nguyễn", "John", "Müller"]
+LAST = ["Curie", "García", "O'Brien", "Smith-Jones", "Dvořák", "Ångström", "Lee", "Fernández", "Çelik", "Kowalski"]
+ORGS = ["Acme Corp.", "Université de Montréal", "Max-Planck-Gesellschaft", "OpenAI, Inc.", "Straße & Co. KG", "NASA", "Département R&D"]
+CONCEPTS = ["machine learning", "Protein Folding", "quantum  entanglement", "CO2 emissions", "the Treaty of Versailles", "GDP (2023)"]
+
+def original_normalize_entity_id(name):
+    """normalize_entity_id before memoization, for reference."""
+    name = normalize('NFKD', name)
+    name = name.encode('ascii', 'ignore').decode('ascii')
+    name = name.lower()
+    name = re.sub(r'[^a-z0-9]+', '_', name)
+    return name.strip('_')
+
+def make_names(num_names, num_distinct, seed=0):
+    """Entity names with a skewed frequency: a few entities appear in most relations."""
+    rng = random.Random(seed)
+    distinct = [f"{rng.choice(FIRST)} {rng.choice(LAST)}" for _ in range(num_distinct // 2)]
+    distinct += [f"{rng.choice(ORGS)} {i}" for i in range(num_distinct // 4)]
+    distinct += [f"{rng.choice(CONCEPTS)} {i}" for i in range(num_distinct - len(distinct))]
+    weights = [1 / (rank + 1) for rank in range(len(distinct))]
+    return rng.choices(distinct, weights=weights, k=num_names)
+
+def _time(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+def run(num_names, num_distinct, number=5):
+    names = make_names(num_names, num_distinct)
+    assert normalize_entity_ids(names) == [original_normalize_entity_id(name) for name in names]
+    original = _time(lambda: [original_normalize_entity_id(name) for name in names], number)
+    uncached = _time(lambda: [normalize_entity_id.__wrapped__(name) for name in names], number)
+    memoized = _time(lambda: [normalize_entity_id(name) for name in names], number)
+    batch = _time(lambda: normalize_entity_ids(names), number)
+    print(f"names={num_names:<8} distinct={num_distinct:<6} original={original * 1e3:8.2f}ms  ascii fast path={uncached * 1e3:8.2f}ms  "
+          f"memoized={memoized * 1e3:7.2f}ms  batch={batch * 1e3:7.2f}ms  speedup={original / batch:5.1f}x")
+
+def main():
+    run(10_000, 300)
+    run(100_000, 2_000)
+    run(1_000_000, 20_000, number=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import time
+import uuid
+from shared_utils.clients.utils.stream_codecs import StreamCodec
+from shared_utils.event_models.ProcessChunkRequestEvent import ProcessChunkRequestEvent
+
+# Benchmark: encode/decode time and entry size of ProcessChunkRequestEvents per stream codec.
+# usage: python bench_stream_codecs.py [text_length ...]
+
+CODECS = [("json", None), ("json", "zlib"), ("json", "zstd"), ("msgpack", None), ("msgpack", "zstd")]
+REPEATS = 2000
+
+def run(text_length):
+    words = " ".join(f"entity{i % 500} relates to concept{i % 97}." for i in range(text_length // 30 + 1))
+    event = ProcessChunkRequestEvent(job_id=uuid.uuid4(), chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), text=words[:text_length])
+    results = []
+    for serializer, compression in CODECS:
+        try:
+            codec = StreamCodec(serializer, compression, compression_threshold=0)
+        except ImportError:
+            continue
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            fields = codec.encode(event)
+        encoded = time.perf_counter() - start
+        read = {key.encode('utf-8'): value for key, value in fields.items()}
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            codec.decode(read)
+        decoded = time.perf_counter() - start
+        name = serializer + (f"+{compression}" if compression else "")
+        results.append(f"{name}: {len(fields['data'])}B enc={encoded / REPEATS * 1e6:.1f}us dec={decoded / REPEATS * 1e6:.1f}us")
+    print(f"text={text_length:<6} " + "  ".join(results))
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 4_000, 32_000]
+    for text_length in sizes:
+        run(text_length)
+
+if __name__ == "__main__":
+    main()
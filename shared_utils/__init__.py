@@ -2,3 +2,4 @@ from .serialization_utils import deserialize_event
 from .serialization_utils import to_db_repr
 from .serialization_utils import to_age_graph_id
 from .serialization_utils import normalize_entity_id
+from .serialization_utils import normalize_entity_ids
@@ -0,0 +1,204 @@
+import json
+import re
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+from psycopg.adapt import Loader
+from psycopg.abc import AdaptContext, Buffer
+
+try:
+    import orjson
+except ImportError:  # optional: decodes vertices, edges and paths about twice as fast
+    orjson = None
+
+class Vertex(NamedTuple):
+    """An AGE vertex decoded from agtype."""
+    id: int
+    label: str
+    properties: Dict[str, Any]
+
+class Edge(NamedTuple):
+    """An AGE edge decoded from agtype."""
+    id: int
+    label: str
+    start_id: int
+    end_id: int
+    properties: Dict[str, Any]
+
+class Path(NamedTuple):
+    """An AGE path decoded from agtype: alternating vertices and edges."""
+    elements: Tuple[Union[Vertex, Edge], ...]
+
+    @property
+    def vertices(self) -> Tuple[Vertex, ...]:
+        return self.elements[0::2]
+
+    @property
+    def edges(self) -> Tuple[Edge, ...]:
+        return self.elements[1::2]
+
+_raw_decode = json.JSONDecoder().raw_decode
+_new = tuple.__new__  # builds the slotted tuples without going through their python-level __new__
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_ANNOTATION = re.compile(r'::([a-z_]+)')
+_ENTITY_ANNOTATION = re.compile(r'\}::(?:vertex|edge)')
+
+def _json_loads(value: str) -> Any:
+    """Decode one JSON document, raising ValueError on trailing data. Faster than json.loads on short values."""
+    obj, end = _raw_decode(value, _WHITESPACE.match(value).end())
+    if end != len(value) and _WHITESPACE.match(value, end).end() != len(value):
+        raise ValueError(f"Unexpected trailing data in agtype value at position {end}")
+    return obj
+
+# whole-document decoder: a sliced-off annotation is known to be the last token when the rest decodes
+_loads = orjson.loads if orjson is not None else _json_loads
+
+def parse_agtype(value: Optional[str]) -> Any:
+    """
+    Decode the text form of an agtype value.
+    - `{...}::vertex` -> Vertex, `{...}::edge` -> Edge, `[...]::path` -> Path
+    - `...::numeric` -> Decimal
+    - everything else (maps, lists, strings, numbers, booleans, null) -> the matching python value
+    """
+    if value is None:
+        return None
+    if '::' not in value:
+        # no annotations: plain JSON, decoded in C
+        if orjson is not None:
+            try:
+                return orjson.loads(value)
+            except ValueError:
+                pass  # e.g. NaN or integers beyond 64 bits, which only the json module accepts
+        return _json_loads(value)
+    if value.endswith('}::vertex'):
+        d = _loads_entity(value[:-8])
+        if d is not None:
+            return _new(Vertex, (d['id'], d['label'], d.get('properties') or {}))
+    elif value.endswith('}::edge'):
+        d = _loads_entity(value[:-6])
+        if d is not None:
+            return _new(Edge, (d['id'], d['label'], d['start_id'], d['end_id'], d.get('properties') or {}))
+    elif value[:1] == '[':
+        entities = _parse_entity_list(value)
+        if entities is not None:
+            return entities
+    obj, end = _parse_value(value, 0)
+    end = _WHITESPACE.match(value, end).end()
+    if end != len(value):
+        raise ValueError(f"Unexpected trailing data in agtype value at position {end}")
+    return obj
+
+def _loads_entity(text: str) -> Optional[dict]:
+    """Decode a vertex or edge without its annotation. Returns None when the text is not one plain
+    JSON object, e.g. a map holding annotated values, so the caller falls back to the full parser."""
+    try:
+        d = _loads(text)
+    except ValueError:
+        return None
+    return d if type(d) is dict else None
+
+def _parse_entity_list(value: str) -> Optional[Union[Path, list]]:
+    """
+    Fast path for paths and lists of vertices/edges (nodes(p), relationships(p), collect(v)).
+    Strips the element annotations and decodes the list in one C call. Returns None when the
+    value has any other shape, including '::' inside a string, so the caller falls back to the full parser.
+    """
+    is_path = value.endswith(']::path')
+    body = value[:-6] if is_path else value
+    body, annotations = _ENTITY_ANNOTATION.subn('}', body)
+    if '::' in body:
+        return None
+    try:
+        items = _loads(body)
+    except ValueError:
+        return None
+    # every element must have carried exactly one annotation; a match inside a string breaks the count
+    if type(items) is not list or len(items) != annotations:
+        return None
+    try:
+        entities = [
+            _new(Edge, (d['id'], d['label'], d['start_id'], d['end_id'], d.get('properties') or {})) if 'start_id' in d
+            else _new(Vertex, (d['id'], d['label'], d.get('properties') or {}))
+            for d in items
+        ]
+    except (TypeError, KeyError):
+        return None
+    return _new(Path, (tuple(entities),)) if is_path else entities
+
+def _parse_value(s: str, idx: int) -> Tuple[Any, int]:
+    idx = _WHITESPACE.match(s, idx).end()
+    char = s[idx:idx + 1]
+    if char == '[':
+        # lists of annotated values (paths, nodes(p), collect(v)) are not valid JSON
+        obj, end = _parse_list(s, idx)
+    else:
+        try:
+            # vertices, edges and scalars are plain JSON followed by an annotation
+            obj, end = _raw_decode(s, idx)
+        except json.JSONDecodeError:
+            if char != '{':
+                raise ValueError(f"Invalid agtype value at position {idx}")
+            # a map holding annotated values
+            obj, end = _parse_map(s, idx)
+
+    if s.startswith('::', end):
+        annotation = _ANNOTATION.match(s, end)
+        if annotation is not None:
+            return _annotate(annotation.group(1), obj, s[idx:end]), annotation.end()
+    return obj, end
+
+def _parse_list(s: str, idx: int) -> Tuple[list, int]:
+    items = []
+    idx = _WHITESPACE.match(s, idx + 1).end()
+    if s[idx:idx + 1] == ']':
+        return items, idx + 1
+    while True:
+        item, idx = _parse_value(s, idx)
+        items.append(item)
+        idx = _WHITESPACE.match(s, idx).end()
+        char = s[idx:idx + 1]
+        if char == ']':
+            return items, idx + 1
+        if char != ',':
+            raise ValueError(f"Expected ',' or ']' in agtype list at position {idx}")
+        idx += 1
+
+def _parse_map(s: str, idx: int) -> Tuple[dict, int]:
+    result = {}
+    idx = _WHITESPACE.match(s, idx + 1).end()
+    if s[idx:idx + 1] == '}':
+        return result, idx + 1
+    while True:
+        key, idx = _raw_decode(s, _WHITESPACE.match(s, idx).end())
+        idx = _WHITESPACE.match(s, idx).end()
+        if s[idx:idx + 1] != ':':
+            raise ValueError(f"Expected ':' in agtype map at position {idx}")
+        result[key], idx = _parse_value(s, idx + 1)
+        idx = _WHITESPACE.match(s, idx).end()
+        char = s[idx:idx + 1]
+        if char == '}':
+            return result, idx + 1
+        if char != ',':
+            raise ValueError(f"Expected ',' or '}}' in agtype map at position {idx}")
+        idx += 1
+
+def _annotate(annotation: str, obj: Any, text: str) -> Any:
+    if annotation == 'vertex':
+        return Vertex(obj['id'], obj['label'], obj.get('properties') or {})
+    if annotation == 'edge':
+        return Edge(obj['id'], obj['label'], obj['start_id'], obj['end_id'], obj.get('properties') or {})
+    if annotation == 'path':
+        return Path(tuple(obj))
+    if annotation == 'numeric':
+        return Decimal(text)
+    return obj
+
+class AgtypeLoader(Loader):
+    """psycopg loader decoding agtype columns with `parse_agtype` while rows are fetched."""
+    def load(self, data: Buffer) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return parse_agtype(data.decode())
+
+def register_agtype_loader(oid: int, context: AdaptContext) -> None:
+    """Register `AgtypeLoader` for the agtype type oid on a connection or cursor."""
+    context.adapters.register_loader(oid, AgtypeLoader)
@@ -1,7 +1,12 @@
 from contextlib import contextmanager
+from typing import Optional, Dict
 import psycopg
 from psycopg import Connection
+from psycopg.types import TypeInfo
+from psycopg_pool import ConnectionPool
 from .utils.age_client_base import AGEClientBase
+from .utils.pool_config import PoolConfig
+from ..agtype_utils import register_agtype_loader
 
 class AGEClient(AGEClientBase):
     """AGE client for connecting to a PostgreSQL database with Apache AGE extension.
@@ -11,13 +16,43 @@ class AGEClient(AGEClientBase):
     - POSTGRES_HOST: The host of the database (default: localhost).
     - POSTGRES_PORT: The port of the database (default: 5432).
     - POSTGRES_DB: The name of the database.
+
+    When a `PoolConfig` is given, connections are served from a connection pool
+    and the AGE session setup runs once per physical connection instead of once per use.
+
+    With `decode_agtype=True`, agtype columns are returned as `Vertex`/`Edge`/`Path` objects and
+    python values (see `shared_utils.agtype_utils`) instead of raw agtype text.
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, pool_config: Optional[PoolConfig] = None, decode_agtype: bool = False):
+        super().__init__(decode_agtype=decode_agtype)
+        self._pool: Optional[ConnectionPool] = None
+        if pool_config is not None:
+            self._pool = ConnectionPool(
+                kwargs=self.connection_params,
+                min_size=pool_config.min_size,
+                max_size=pool_config.max_size,
+                max_idle=pool_config.max_idle,
+                max_lifetime=pool_config.max_lifetime,
+                timeout=pool_config.timeout,
+                max_waiting=pool_config.max_waiting,
+                configure=self._configure_pooled_connection,
+                name="age_client_pool",
+                open=False,
+            )
+
+    @property
+    def is_pooled(self) -> bool:
+        return self._pool is not None
 
     @contextmanager
     def managed_connection(self):
         """context-managed connection with auto commit/rollback/close."""
+        if self._pool is not None:
+            # the pool commits/rolls back and returns the connection on exit
+            with self._get_pool().connection() as conn:
+                yield conn
+            return
+
         conn: Connection = psycopg.connect(**self.connection_params)
         try:
             self._setup_age_session(conn)
@@ -30,12 +65,50 @@ class AGEClient(AGEClientBase):
             conn.close()
 
     def create_connection(self) -> Connection:
-        """Caller is responsible for commit/rollback/close."""
+        """Caller is responsible for commit/rollback and `release_connection`."""
+        if self._pool is not None:
+            return self._get_pool().getconn()
+
         conn = psycopg.connect(**self.connection_params)
         self._setup_age_session(conn)
         conn.commit()  # commit required after setup. SEE: https://github.com/apache/age/issues/2195
         return conn
 
+    def release_connection(self, conn: Connection) -> None:
+        """Return a connection from `create_connection` to the pool, or close it when not pooled."""
+        if self._pool is not None:
+            self._pool.putconn(conn)
+        else:
+            conn.close()
+
+    def open_pool(self, wait: bool = False, timeout: float = 30.0) -> None:
+        """Open the pool. With `wait=True`, block until min_size connections are ready."""
+        if self._pool is None:
+            raise RuntimeError("AGEClient was created without a pool configuration.")
+        self._pool.open(wait=wait, timeout=timeout)
+
+    def close_pool(self, timeout: float = 5.0) -> None:
+        """Close the pool and all its connections."""
+        if self._pool is not None:
+            self._pool.close(timeout=timeout)
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Return the pool counters (pool_size, pool_available, requests_waiting, ...)."""
+        if self._pool is None:
+            return {}
+        return self._pool.get_stats()
+
+    def _get_pool(self) -> ConnectionPool:
+        """Return the pool, opening it lazily on first use."""
+        if self._pool.closed:
+            self._pool.open()
+        return self._pool
+
+    def _configure_pooled_connection(self, conn: Connection) -> None:
+        """Run once by the pool for every new physical connection."""
+        self._setup_age_session(conn)
+        conn.commit()  # the pool requires connections to be idle after configure
+
     def _setup_age_session(self, conn: Connection) -> None:
         """Setup AGE environment for each session."""
         try:
@@ -45,5 +118,17 @@ class AGEClient(AGEClientBase):
         except Exception:
             raise RuntimeError("Failed to load AGE extension. Ensure it is installed in the PostgreSQL database.")
 
+        if self.decode_agtype:
+            self._register_agtype_loader(conn)
+
+    def _register_agtype_loader(self, conn: Connection) -> None:
+        """Register the agtype loader, looking up the agtype oid once per client."""
+        if self._agtype_oid is None:
+            info = TypeInfo.fetch(conn, "agtype")
+            if info is None:
+                raise RuntimeError("agtype type not found. Ensure the AGE extension is installed in the PostgreSQL database.")
+            self._agtype_oid = info.oid
+        register_agtype_loader(self._agtype_oid, conn)
+
 
 age_client = AGEClient()  # module level singleton instance
@@ -1,6 +1,11 @@
 from contextlib import asynccontextmanager
+from typing import Optional, Dict
 from psycopg import AsyncConnection
+from psycopg.types import TypeInfo
+from psycopg_pool import AsyncConnectionPool
 from .utils.age_client_base import AGEClientBase
+from .utils.pool_config import PoolConfig
+from ..agtype_utils import register_agtype_loader
 
 class AsyncAGEClient(AGEClientBase):
     """AGE client for connecting to a PostgreSQL database with Apache AGE extension.
@@ -10,13 +15,51 @@ class AsyncAGEClient(AGEClientBase):
     - POSTGRES_HOST: The host of the database (default: localhost).
     - POSTGRES_PORT: The port of the database (default: 5432).
     - POSTGRES_DB: The name of the database.
+
+    When a `PoolConfig` is given, connections are served from an async connection pool
+    and the AGE session setup runs once per physical connection instead of once per use.
+
+    With `decode_agtype=True`, agtype columns are returned as `Vertex`/`Edge`/`Path` objects and
+    python values (see `shared_utils.agtype_utils`) instead of raw agtype text.
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, pool_config: Optional[PoolConfig] = None, decode_agtype: bool = False):
+        super().__init__(decode_agtype=decode_agtype)
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._pool_timeout: Optional[float] = None
+        if pool_config is not None:
+            self._pool_timeout = pool_config.timeout
+            # the pool is opened from a running event loop, see `open_pool`
+            self._pool = AsyncConnectionPool(
+                kwargs=self.connection_params,
+                min_size=pool_config.min_size,
+                max_size=pool_config.max_size,
+                max_idle=pool_config.max_idle,
+                max_lifetime=pool_config.max_lifetime,
+                timeout=pool_config.timeout,
+                max_waiting=pool_config.max_waiting,
+                configure=self._configure_pooled_connection,
+                name="async_age_client_pool",
+                open=False,
+            )
+
+    @property
+    def is_pooled(self) -> bool:
+        return self._pool is not None
 
     @asynccontextmanager
-    async def managed_connection(self):
-        """context-managed async connection with auto commit/rollback/close."""
+    async def managed_connection(self, timeout: Optional[float] = None):
+        """context-managed async connection with auto commit/rollback/close.
+
+        On a pooled client, `timeout` bounds the wait for a free connection
+        (defaults to the pool config timeout) and raises `psycopg_pool.PoolTimeout` when exceeded.
+        """
+        if self._pool is not None:
+            pool = await self._get_pool()
+            # the pool commits/rolls back and returns the connection on exit
+            async with pool.connection(timeout=self._pool_timeout if timeout is None else timeout) as conn:
+                yield conn
+            return
+
         conn: AsyncConnection = await AsyncConnection.connect(**self.connection_params)
         try:
             await self._setup_age_session(conn)
@@ -28,12 +71,55 @@ class AsyncAGEClient(AGEClientBase):
         finally:
             await conn.close()
 
-    async def create_connection(self) -> AsyncConnection:
-        """Caller is responsible for commit/rollback/close."""
+    async def create_connection(self, timeout: Optional[float] = None) -> AsyncConnection:
+        """Caller is responsible for commit/rollback and `release_connection`."""
+        if self._pool is not None:
+            pool = await self._get_pool()
+            return await pool.getconn(timeout=self._pool_timeout if timeout is None else timeout)
+
         conn: AsyncConnection = await AsyncConnection.connect(**self.connection_params)
-        self._setup_age_session(conn)
+        await self._setup_age_session(conn)
+        await conn.commit()  # commit required after setup. SEE: https://github.com/apache/age/issues/2195
         return conn
 
+    async def release_connection(self, conn: AsyncConnection) -> None:
+        """Return a connection from `create_connection` to the pool, or close it when not pooled."""
+        if self._pool is not None:
+            await self._pool.putconn(conn)
+        else:
+            await conn.close()
+
+    async def open_pool(self, wait: bool = True, timeout: float = 30.0) -> None:
+        """Open the pool. With `wait=True` (pre-warm), block until min_size connections are configured.
+
+        Call at application startup so the first requests don't pay for connection setup.
+        """
+        if self._pool is None:
+            raise RuntimeError("AsyncAGEClient was created without a pool configuration.")
+        await self._pool.open(wait=wait, timeout=timeout)
+
+    async def close_pool(self, timeout: float = 5.0) -> None:
+        """Close the pool and all its connections."""
+        if self._pool is not None:
+            await self._pool.close(timeout=timeout)
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Return the pool counters (pool_size, pool_available, requests_waiting, ...)."""
+        if self._pool is None:
+            return {}
+        return self._pool.get_stats()
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        """Return the pool, opening it lazily (without pre-warming) on first use."""
+        if self._pool.closed:
+            await self._pool.open()
+        return self._pool
+
+    async def _configure_pooled_connection(self, conn: AsyncConnection) -> None:
+        """Run once by the pool for every new physical connection."""
+        await self._setup_age_session(conn)
+        await conn.commit()  # the pool requires connections to be idle after configure
+
     async def _setup_age_session(self, conn: AsyncConnection) -> None:
         """Setup AGE environment for each session."""
         try:
@@ -43,5 +129,17 @@ class AsyncAGEClient(AGEClientBase):
         except Exception:
             raise RuntimeError("Failed to load AGE extension. Ensure it is installed in the PostgreSQL database.")
 
+        if self.decode_agtype:
+            await self._register_agtype_loader(conn)
+
+    async def _register_agtype_loader(self, conn: AsyncConnection) -> None:
+        """Register the agtype loader, looking up the agtype oid once per client."""
+        if self._agtype_oid is None:
+            info = await TypeInfo.fetch(conn, "agtype")
+            if info is None:
+                raise RuntimeError("agtype type not found. Ensure the AGE extension is installed in the PostgreSQL database.")
+            self._agtype_oid = info.oid
+        register_agtype_loader(self._agtype_oid, conn)
+
 
-async_age_client = AsyncAGEClient()  # module level singleton instance
\ No newline at end of file
+async_age_client = AsyncAGEClient()  # module level singleton instance
@@ -0,0 +1,484 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+import redis
+import redis.asyncio as aioredis
+from pydantic import BaseModel
+from .utils.ack_buffer import AckBuffer, DEFAULT_ACK_BATCH_SIZE, DEFAULT_ACK_FLUSH_INTERVAL, drain_due_buffers
+from .utils.stream_codecs import DecodedMessage, StreamCodec
+from .utils.stream_producer import BufferedStreamProducer, DEFAULT_PRODUCER_BATCH_SIZE, DEFAULT_PRODUCER_LINGER
+from .utils.stream_recovery import (
+    DEFAULT_CLAIM_INTERVAL, DEFAULT_CLAIM_MIN_IDLE_MS, DEFAULT_CONSUMER_IDLE_TIMEOUT_MS,
+    idle_consumers, split_claimed, unique_consumer_name,
+)
+from .utils.stream_retention import DEFAULT_TRIM_INTERVAL, StreamRetentionPolicy, safe_trim_id, trim_id, xadd_trim_args
+
+STREAM_READ_BLOCK_MS = 1000  # longest XREADGROUP wait, bounds how long stop_consumer waits for the read loop
+READ_RETRY_DELAY = 1.0  # seconds before reading again after a failed XREADGROUP
+SEND_BATCH_SIZE = 1000  # XADDs pipelined per round trip by send_many
+
+class AsyncRedisClient:
+    """Redis client built on `redis.asyncio`.
+    Requires environment variables:
+    - REDIS_URL: The url of the redis server.
+
+    Consumers run as tasks in the caller's event loop instead of dedicated threads. Every stream
+    has `max_concurrent_tasks` slots: a message is read as soon as a slot is free and processed as
+    its own task, so a slow callback only holds its own slot instead of stalling the stream.
+    `codec` encodes sent events (JSON by default); consumers decode every codec.
+    """
+    def __init__(self, codec: Optional[StreamCodec] = None):
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            raise EnvironmentError("REDIS_URL environment variable is not set")
+        self._client = aioredis.from_url(redis_url)
+        self._codec = codec or StreamCodec()
+        self._consumers: Dict[str, asyncio.Task] = {}
+        self._callbacks: Dict[str, List[Tuple[Callable, Optional[Type[BaseModel]]]]] = {}
+        self._stop_events: Dict[str, asyncio.Event] = {}
+        self._consumer_names: Dict[str, str] = {}
+        self._invalid_messages: Dict[str, int] = {}  # per stream, messages whose payload failed to decode
+        self._ack_buffers: Dict[str, AckBuffer] = {}
+        self._ack_wakeup: Optional[asyncio.Event] = None
+        self._ack_flusher: Optional[asyncio.Task] = None
+        self._ack_flush_lock = asyncio.Lock()  # held from draining buffers until their XACK is done
+        self._retention_policies: Dict[str, StreamRetentionPolicy] = {}
+        self._safe_trim_ids: Dict[str, str] = {}
+        self._trim_interval = DEFAULT_TRIM_INTERVAL
+        self._trimmer: Optional[asyncio.Task] = None
+
+    async def send(self, stream: str, value: BaseModel) -> str:
+        """Add an event to a stream. Returns the message id."""
+        return _decode_id(await self._client.xadd(stream, self._encode_message(value), **self._trim_args(stream)))
+
+    async def send_many(self, stream: str, values: Iterable[BaseModel], batch_size: int = SEND_BATCH_SIZE) -> List[str]:
+        """Add events to a stream, pipelining `batch_size` XADDs per round trip. Returns the message ids in order."""
+        ids = []
+        values = iter(values)
+        while batch := list(islice(values, batch_size)):
+            pipe = self._client.pipeline(transaction=False)
+            trim_args = self._trim_args(stream)
+            for value in batch:
+                pipe.xadd(stream, self._encode_message(value), **trim_args)
+            ids.extend(_decode_id(msg_id) for msg_id in await pipe.execute())
+        return ids
+
+    def create_producer(self, linger: float = DEFAULT_PRODUCER_LINGER, max_batch_size: int = DEFAULT_PRODUCER_BATCH_SIZE) -> BufferedStreamProducer:
+        """Create a producer that buffers events for up to `linger` seconds and sends them with `send_many`."""
+        return BufferedStreamProducer(self, linger, max_batch_size)
+
+    def _encode_message(self, value: BaseModel) -> Dict[str, bytes]:
+        # Serialize entire object under the 'data' field, tagged with the codec that wrote it
+        return self._codec.encode(value)
+
+    def _trim_args(self, stream: str) -> Dict[str, Any]:
+        return xadd_trim_args(self._retention_policies.get(stream), self._safe_trim_ids.get(stream))
+
+    # Retention
+    async def set_retention_policy(self, stream: str, policy: Optional[StreamRetentionPolicy], trim_interval: float = DEFAULT_TRIM_INTERVAL):
+        """Bound the memory of a stream (None removes its policy), as `RedisClient.set_retention_policy`.
+        The background trimmer runs as a task in the running event loop."""
+        if policy is None:
+            self._retention_policies.pop(stream, None)
+            self._safe_trim_ids.pop(stream, None)
+            return
+        self._retention_policies[stream] = policy
+        self._trim_interval = trim_interval
+        if self._trimmer is None:
+            self._trimmer = asyncio.create_task(self._trim_loop(), name="RedisStreamTrimmer")
+
+    async def trim_streams(self, streams: Optional[List[str]] = None) -> Dict[str, int]:
+        """Apply the age limit of every stream with a retention policy now. Returns the number of trimmed entries per stream."""
+        trimmed = {}
+        for stream, policy in list(self._retention_policies.items()):
+            if streams is not None and stream not in streams:
+                continue
+            try:
+                groups = await self._client.xinfo_groups(stream)
+            except redis.exceptions.ResponseError:
+                continue  # the stream does not exist yet
+            pipe = self._client.pipeline(transaction=False)
+            pending_groups = [group['name'] for group in groups if group['pending']]
+            for name in pending_groups:
+                pipe.xpending(stream, name)
+            pending_min_ids = {
+                name.decode('utf-8') if isinstance(name, bytes) else name: summary['min']
+                for name, summary in zip(pending_groups, await pipe.execute())
+            }
+            safe_id = safe_trim_id(groups, pending_min_ids)
+            if safe_id is not None:
+                self._safe_trim_ids[stream] = safe_id
+            target = trim_id(policy, safe_id)
+            if target is not None:
+                trimmed[stream] = await self._client.xtrim(stream, minid=target, approximate=policy.approximate)
+        return trimmed
+
+    async def _trim_loop(self):
+        """Trim the streams every trim interval. Exits once no stream has a retention policy."""
+        while self._retention_policies:
+            try:
+                await self.trim_streams()
+            except Exception as e:
+                logging.error(f"Error trimming streams: {e}")
+            await asyncio.sleep(self._trim_interval)
+        self._trimmer = None
+
+    # Key-Value Operations
+    async def get(self, key: str) -> Optional[str]:
+        """Get a value from Redis by key."""
+        value = await self._client.get(key)
+        return value.decode('utf-8') if value else None
+
+    async def set(self, key: str, value: Union[str, int, float], ex: Optional[int] = None) -> bool:
+        """Set a key-value pair in Redis with optional expiration."""
+        try:
+            return await self._client.set(key, str(value), ex=ex)
+        except Exception:
+            return False
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        """Get a JSON value from Redis by key and deserialize it."""
+        value = await self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+
+    async def set_json(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        """Set a JSON-serializable value in Redis."""
+        try:
+            json_str = json.dumps(value)
+        except (TypeError, ValueError):
+            return False
+        return await self.set(key, json_str, ex=ex)
+
+    async def get_versioned_json(self, key: str, version_key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Get a JSON value and the current version held by `version_key` (None when unset) in one round trip."""
+        value, version = await self._client.mget(key, version_key)
+        return _loads_json(value), _decode_id(version) if version is not None else None
+
+    async def set_versioned_json(self, key: str, value: Any, version_key: str, version: Optional[str], ex: Optional[int] = None) -> bool:
+        """Set a JSON value only while `version_key` still holds `version`, as in `RedisClient.set_versioned_json`."""
+        async with self._client.pipeline() as pipe:
+            try:
+                await pipe.watch(version_key)
+                current = await pipe.get(version_key)
+                if (_decode_id(current) if current is not None else None) != version:
+                    return False
+                pipe.multi()
+                pipe.set(key, json.dumps(value), ex=ex)
+                await pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    async def bump_versions(self, version_keys: Iterable[str], delete_keys: Iterable[str] = (), ex: Optional[int] = None) -> None:
+        """Increment version keys and delete `delete_keys` in one transaction, as in `RedisClient.bump_versions`."""
+        pipe = self._client.pipeline(transaction=True)
+        for version_key in version_keys:
+            pipe.incr(version_key)
+            if ex is not None:
+                pipe.expire(version_key, ex)
+        delete_keys = list(delete_keys)
+        if delete_keys:
+            pipe.delete(*delete_keys)
+        await pipe.execute()
+
+    async def increment(self, key: str, amount: int = 1) -> int:
+        """Increment a numeric value in Redis."""
+        return await self._client.incrby(key, amount)
+
+    async def decrement(self, key: str, amount: int = 1) -> int:
+        """Decrement a numeric value in Redis."""
+        return await self._client.decrby(key, amount)
+
+    async def delete(self, *keys: str) -> int:
+        """Delete one or more keys from Redis."""
+        return await self._client.delete(*keys)
+
+    async def exists(self, key: str) -> bool:
+        """Check if a key exists in Redis."""
+        return bool(await self._client.exists(key))
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        """Set an expiration time for a key."""
+        return bool(await self._client.expire(key, seconds))
+
+    async def ttl(self, key: str) -> int:
+        """Get the time-to-live of a key in seconds."""
+        return await self._client.ttl(key)
+
+    async def create_consumer(self, stream: str, group_id: str, max_concurrent_tasks: int = 10,
+                              ack_batch_size: int = DEFAULT_ACK_BATCH_SIZE, ack_flush_interval: float = DEFAULT_ACK_FLUSH_INTERVAL,
+                              consumer_name: Optional[str] = None, claim_min_idle_ms: int = DEFAULT_CLAIM_MIN_IDLE_MS,
+                              claim_interval: Optional[float] = DEFAULT_CLAIM_INTERVAL,
+                              consumer_idle_timeout_ms: Optional[int] = DEFAULT_CONSUMER_IDLE_TIMEOUT_MS):
+        """Start a consumer task for a stream in the running event loop, processing at most
+        `max_concurrent_tasks` messages at a time. Processed messages are acknowledged in batches
+        of up to `ack_batch_size` ids, at most `ack_flush_interval` seconds after processing.
+
+        Consumer identity and recovery work as in `RedisClient.create_consumer`: a name unique to
+        this process, XAUTOCLAIM of messages pending for `claim_min_idle_ms` every `claim_interval`
+        seconds, and deletion of consumers idle for `consumer_idle_timeout_ms`."""
+        if stream in self._consumers:
+            raise RuntimeError(f"Consumer for stream '{stream}' already exists.")
+
+        try:
+            await self._client.xgroup_create(stream, group_id, id='0', mkstream=True)
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._callbacks.setdefault(stream, [])
+        self._stop_events[stream] = asyncio.Event()
+        self._consumer_names[stream] = consumer_name or unique_consumer_name(group_id)
+        self._ack_buffers[stream] = AckBuffer(group_id, ack_batch_size, ack_flush_interval)
+        self._consumers[stream] = asyncio.create_task(
+            self._consume_loop(stream, group_id, max_concurrent_tasks, claim_min_idle_ms, claim_interval, consumer_idle_timeout_ms),
+            name=f"RedisConsumer-{stream}"
+        )
+        if self._ack_flusher is None:
+            # created with the flusher so it belongs to the running event loop
+            self._ack_wakeup = asyncio.Event()
+            self._ack_flusher = asyncio.create_task(self._ack_flush_loop(), name="RedisAckFlusher")
+
+    async def register_callback(self, stream: str, group_id: str, callback: Union[Callable[..., None], Callable[..., Awaitable[None]]],
+                                event_type: Optional[Type[BaseModel]] = None):
+        """Register a callback for a stream. Creates a consumer if one doesn't exist.
+        With `event_type` the callback receives the validated event only, as in `RedisClient.register_callback`."""
+        if stream not in self._consumers:
+            await self.create_consumer(stream, group_id)
+        self._callbacks[stream].append((callback, event_type))
+
+    async def stop_consumer(self, stream: str):
+        """Stop a consumer once its in-flight messages are processed and acknowledged."""
+        if stream not in self._consumers:
+            return
+        self._stop_events[stream].set()
+        await self._consumers[stream]
+        # under the flush lock no XACK of this stream is in flight, and once the buffer is removed
+        # the flusher cannot drain it any more
+        async with self._ack_flush_lock:
+            buffer = self._ack_buffers.pop(stream)
+            await self._xack(drain_due_buffers({stream: buffer}, force=True))
+        if len(buffer):
+            logging.warning(f"{len(buffer)} messages of stream {stream} could not be acknowledged and stay pending to be reclaimed")
+        await self._delete_own_consumer(stream, buffer.group_id, self._consumer_names[stream])
+        del self._consumers[stream]
+        del self._callbacks[stream]
+        del self._stop_events[stream]
+        del self._consumer_names[stream]
+
+    async def close(self):
+        """Stop every consumer and close the connection pool."""
+        for stream in list(self._consumers):
+            await self.stop_consumer(stream)
+        if self._ack_flusher is not None:
+            self._ack_wakeup.set()
+            await self._ack_flusher
+        if self._trimmer is not None:
+            self._trimmer.cancel()
+            try:
+                await self._trimmer
+            except asyncio.CancelledError:
+                pass
+            self._trimmer = None
+        await self._client.aclose()
+
+    def get_ack_metrics(self, stream: Optional[str] = None) -> Dict[str, Any]:
+        """Return ack counters, batch sizes and latency of one stream, or of every stream keyed by name."""
+        if stream is not None:
+            buffer = self._ack_buffers.get(stream)
+            return buffer.stats() if buffer is not None else {}
+        return {name: buffer.stats() for name, buffer in self._ack_buffers.items()}
+
+    async def flush_acks(self, streams: Optional[List[str]] = None) -> int:
+        """Acknowledge every buffered message now. Returns the number of acknowledged messages."""
+        return await self._flush_acks(streams, force=True)
+
+    def get_invalid_message_counts(self, stream: Optional[str] = None) -> Union[int, Dict[str, int]]:
+        """Return the number of messages whose payload failed to decode, for one stream or for every stream keyed by name."""
+        if stream is not None:
+            return self._invalid_messages.get(stream, 0)
+        return dict(self._invalid_messages)
+
+    def get_consumer_name(self, stream: str) -> Optional[str]:
+        """Return the consumer name this process reads a stream with."""
+        return self._consumer_names.get(stream)
+
+    async def _consume_loop(self, stream: str, group_id: str, max_concurrent_tasks: int,
+                            claim_min_idle_ms: int, claim_interval: Optional[float], consumer_idle_timeout_ms: Optional[int]):
+        consumer_name = self._consumer_names[stream]
+        slots = asyncio.Semaphore(max_concurrent_tasks)
+        in_flight: Set[asyncio.Task] = set()
+        stop = self._stop_events[stream]
+        loop = asyncio.get_running_loop()
+        claim_cursor, next_claim = '0-0', loop.time()
+
+        while not stop.is_set():
+            # wait for a free slot, then read as many messages as there are free slots
+            await slots.acquire()
+            if stop.is_set():
+                slots.release()
+                break
+            count = max_concurrent_tasks - len(in_flight)
+
+            # Take over messages left pending by other consumers before reading new ones
+            resp = None
+            if claim_interval is not None and loop.time() >= next_claim:
+                try:
+                    claim_cursor, resp = await self._reclaim(stream, group_id, consumer_name, claim_cursor, count, claim_min_idle_ms)
+                    if claim_cursor == '0-0':
+                        # scan complete: wait before scanning the pending list again
+                        next_claim = loop.time() + claim_interval
+                        if consumer_idle_timeout_ms is not None:
+                            await self._delete_idle_consumers(stream, group_id, consumer_name, consumer_idle_timeout_ms)
+                except Exception as e:
+                    logging.error(f"Error reclaiming pending messages of stream {stream}: {e}")
+                    claim_cursor, next_claim = '0-0', loop.time() + claim_interval
+
+            try:
+                if not resp:
+                    resp = await self._client.xreadgroup(
+                        groupname=group_id,
+                        consumername=consumer_name,
+                        streams={stream: '>'},
+                        count=count,
+                        block=STREAM_READ_BLOCK_MS
+                    )
+            except Exception as e:
+                slots.release()
+                logging.error(f"Error reading from stream {stream}: {e}")
+                await asyncio.sleep(READ_RETRY_DELAY)
+                continue
+
+            messages = [message for _, stream_messages in resp or [] for message in stream_messages]
+            if not messages:
+                slots.release()
+                continue
+            for i, (msg_id, fields) in enumerate(messages):
+                if i:
+                    await slots.acquire()  # free: at most one message was read per free slot
+                task = asyncio.create_task(self._process_message(stream, msg_id, fields))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: slots.release())
+
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _reclaim(self, stream: str, group_id: str, consumer_name: str, cursor: str, count: int, min_idle_ms: int):
+        """Claim up to `count` messages idle for `min_idle_ms`, continuing the XAUTOCLAIM scan at `cursor`.
+        Returns the next cursor ('0-0' once the scan is complete) and the messages in XREADGROUP form."""
+        response = await self._client.xautoclaim(stream, group_id, consumer_name, min_idle_time=min_idle_ms, start_id=cursor, count=count)
+        cursor, messages, deleted = split_claimed(response)
+        if deleted:
+            # entries trimmed from the stream can no longer be processed
+            await self._client.xack(stream, group_id, *deleted)
+        if not messages:
+            return cursor, []
+        logging.info(f"Reclaimed {len(messages)} pending messages on stream {stream}")
+        return cursor, [(stream, messages)]
+
+    async def _delete_idle_consumers(self, stream: str, group_id: str, consumer_name: str, idle_timeout_ms: int):
+        for name in idle_consumers(await self._client.xinfo_consumers(stream, group_id), consumer_name, idle_timeout_ms):
+            await self._client.xgroup_delconsumer(stream, group_id, name)
+            logging.info(f"Deleted idle consumer {name} of group {group_id} on stream {stream}")
+
+    async def _delete_own_consumer(self, stream: str, group_id: str, consumer_name: str):
+        """Delete this process' consumer on shutdown, unless it still has pending messages to be reclaimed."""
+        try:
+            for consumer in await self._client.xinfo_consumers(stream, group_id):
+                name = consumer['name'].decode('utf-8') if isinstance(consumer['name'], bytes) else consumer['name']
+                if name == consumer_name and consumer['pending'] == 0:
+                    await self._client.xgroup_delconsumer(stream, group_id, consumer_name)
+        except Exception as e:
+            logging.error(f"Error deleting consumer {consumer_name} of stream {stream}: {e}")
+
+    async def _process_message(self, stream: str, msg_id: Any, fields: Dict[Any, Any]):
+        """Process a single message by executing all callbacks and then acknowledging."""
+        message = DecodedMessage(self._codec, fields)
+        try:
+            for cb, event_type in self._callbacks[stream]:
+                try:
+                    args = (message.decode(event_type),) if event_type is not None else (msg_id, message.decode())
+                except Exception:
+                    if event_type is not None:
+                        continue  # typed callbacks only receive valid events
+                    args = (msg_id, None)
+                try:
+                    if inspect.iscoroutinefunction(cb):
+                        await cb(*args)
+                    else:
+                        # Run non-async callback in a thread pool so it does not block the event loop
+                        await asyncio.to_thread(cb, *args)
+                except Exception as e:
+                    logging.error(f"Error in callback for stream {stream}: {e}")
+        finally:
+            if message.errors:
+                self._invalid_messages[stream] = self._invalid_messages.get(stream, 0) + 1
+                logging.warning(f"Invalid message {msg_id} on stream {stream}: {next(iter(message.errors.values()))}")
+            # Always acknowledge the message after all callbacks are executed, batched with other acks
+            if self._ack_buffers[stream].add(msg_id):
+                self._ack_wakeup.set()
+
+    async def _ack_flush_loop(self):
+        """Flush due ack buffers when one fills up or its flush interval elapses. Exits with the last consumer."""
+        while self._ack_buffers:
+            interval = min(buffer.flush_interval for buffer in self._ack_buffers.values())
+            try:
+                await asyncio.wait_for(self._ack_wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ack_wakeup.clear()
+            try:
+                await self._flush_acks()
+            except Exception as e:
+                logging.error(f"Error flushing acks: {e}")
+        self._ack_flusher = None
+
+    async def _flush_acks(self, streams: Optional[List[str]] = None, force: bool = False) -> int:
+        """Send one XACK per due stream, all in a single pipelined round trip."""
+        async with self._ack_flush_lock:
+            return await self._xack(drain_due_buffers(self._ack_buffers, streams, force))
+
+    async def _xack(self, batches: List[Tuple[str, AckBuffer, List[Any], List[float]]]) -> int:
+        if not batches:
+            return 0
+
+        pipe = self._client.pipeline(transaction=False)
+        for stream, buffer, ids, _ in batches:
+            pipe.xack(stream, buffer.group_id, *ids)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logging.error(f"XACK of {sum(len(ids) for _, _, ids, _ in batches)} messages failed: {e}")
+            for _, buffer, ids, added_at in batches:
+                buffer.restore(ids, added_at)
+            return 0
+
+        for _, buffer, _, added_at in batches:
+            buffer.record_flush(added_at)
+        return sum(len(ids) for _, _, ids, _ in batches)
+
+
+def _decode_id(msg_id: Union[bytes, str]) -> str:
+    return msg_id.decode('utf-8') if isinstance(msg_id, bytes) else msg_id
+
+
+def _loads_json(value: Optional[Union[bytes, str]]) -> Optional[Any]:
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return None
+
+
+async_redis_client = AsyncRedisClient()  # module level singleton instance
@@ -1,7 +1,12 @@
+import json
 from os import getenv
+from typing import Any, AsyncIterable, Optional, Union
 import aioboto3
 import logging
 
+MIN_MULTIPART_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+DEFAULT_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
 class S3Client:
 
     def __init__(self, s3_region_override:str=None):
@@ -51,4 +56,65 @@ class S3Client:
             logging.error(f"Upload JSON failed: {e}")
             return False
 
+    async def download_json(self, bucket_name: str, object_key: str) -> Optional[Any]:
+        """Asynchronously downloads and parses a JSON object. Returns None if the download fails.
+        Example:
+            elements = await client.download_json('my-bucket', 'folder/graph.json')
+        """
+        try:
+            async with self.session.client('s3', region_name=self.region_name) as s3:
+                response = await s3.get_object(Bucket=bucket_name, Key=object_key)
+                async with response['Body'] as body:
+                    content = await body.read()
+            return json.loads(content)
+        except Exception as e:
+            logging.error(f"Download JSON failed: {e}")
+            return None
+
+    async def upload_json_stream(self, bucket_name: str, object_key: str, chunks: AsyncIterable[Union[str, bytes]], part_size: int = DEFAULT_MULTIPART_PART_SIZE) -> bool:
+        """Asynchronously uploads JSON produced incrementally as a multipart upload.
+        At most one part (`part_size` bytes) is buffered in memory; the upload is aborted on failure.
+        Example:
+            await client.upload_json_stream('my-bucket', 'folder/graph.json', iter_json_fragments())
+        """
+        if part_size < MIN_MULTIPART_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_MULTIPART_PART_SIZE} bytes")
+        try:
+            async with self.session.client('s3', region_name=self.region_name) as s3:
+                upload = await s3.create_multipart_upload(Bucket=bucket_name, Key=object_key, ContentType='application/json')
+                upload_id = upload['UploadId']
+                try:
+                    parts = []
+                    buffer = bytearray()
+                    async for chunk in chunks:
+                        buffer += chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+                        if len(buffer) >= part_size:
+                            parts.append(await self._upload_part(s3, bucket_name, object_key, upload_id, len(parts) + 1, bytes(buffer)))
+                            buffer.clear()
+                    if buffer or not parts:
+                        parts.append(await self._upload_part(s3, bucket_name, object_key, upload_id, len(parts) + 1, bytes(buffer)))
+                    await s3.complete_multipart_upload(
+                        Bucket=bucket_name,
+                        Key=object_key,
+                        UploadId=upload_id,
+                        MultipartUpload={'Parts': parts}
+                    )
+                except BaseException:
+                    await s3.abort_multipart_upload(Bucket=bucket_name, Key=object_key, UploadId=upload_id)
+                    raise
+            return True
+        except Exception as e:
+            logging.error(f"Upload JSON stream failed: {e}")
+            return False
+
+    async def _upload_part(self, s3, bucket_name: str, object_key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+        response = await s3.upload_part(
+            Bucket=bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
 async_s3_client = S3Client()  # module level singleton instance
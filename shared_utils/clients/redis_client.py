@@ -6,8 +6,18 @@ import redis
 import threading
 import inspect
 import time
-from typing import List, Optional, Union, Any, Dict, Set, Callable, Awaitable
+from itertools import islice
+from typing import List, Optional, Union, Any, Dict, Set, Callable, Awaitable, Iterable, Tuple, Type
 from pydantic import BaseModel
+from .utils.ack_buffer import AckBuffer, DEFAULT_ACK_BATCH_SIZE, DEFAULT_ACK_FLUSH_INTERVAL, drain_due_buffers
+from .utils.stream_codecs import DecodedMessage, StreamCodec
+from .utils.stream_recovery import (
+    DEFAULT_CLAIM_INTERVAL, DEFAULT_CLAIM_MIN_IDLE_MS, DEFAULT_CONSUMER_IDLE_TIMEOUT_MS,
+    idle_consumers, split_claimed, unique_consumer_name,
+)
+from .utils.stream_retention import DEFAULT_TRIM_INTERVAL, StreamRetentionPolicy, safe_trim_id, trim_id, xadd_trim_args
+
+SEND_BATCH_SIZE = 1000  # XADDs pipelined per round trip by send_many
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,26 +25,118 @@ logging.basicConfig(
 )
 
 class RedisClient:
-    def __init__(self):
+    def __init__(self, codec: Optional[StreamCodec] = None):
+        """`codec` encodes sent events (JSON by default); consumers decode every codec."""
         redis_url = os.getenv("REDIS_URL")
         if not redis_url:
             raise EnvironmentError("REDIS_URL environment variable is not set")
         self._client = redis.from_url(redis_url)
+        self._codec = codec or StreamCodec()
         self._consumers = {}
         self._callbacks = {}
         self._stop_flags = {}
         self._max_concurrent_tasks = {}
         self._running_tasks: Dict[str, int] = {}
+        self._consumer_names: Dict[str, str] = {}
+        self._invalid_messages: Dict[str, int] = {}  # per stream, messages whose payload failed to decode
         
         # Thread safety locks
         self._consumer_lock = threading.RLock()  # For consumer creation/deletion
         self._callback_lock = threading.RLock()  # For callback registration
         self._task_count_locks: Dict[str, threading.Lock] = {}  # Per-stream task counting
 
-    def send(self, stream: str, value: BaseModel):
-        # Serialize entire object as single JSON string under 'data' field
-        message = {"data": value.model_dump_json()}
-        self._client.xadd(stream, message)
+        # Acknowledgements are buffered per stream and flushed in batches by a background thread
+        self._ack_buffers: Dict[str, AckBuffer] = {}
+        self._ack_wakeup = threading.Event()
+        self._ack_flusher: Optional[threading.Thread] = None
+        self._ack_flusher_lock = threading.Lock()
+        self._ack_flush_lock = threading.Lock()  # held from draining buffers until their XACK is done
+
+        # Streams with a retention policy are trimmed on produce and by a background thread
+        self._retention_policies: Dict[str, StreamRetentionPolicy] = {}
+        self._safe_trim_ids: Dict[str, str] = {}
+        self._trim_interval = DEFAULT_TRIM_INTERVAL
+        self._trimmer: Optional[threading.Thread] = None
+        self._trimmer_lock = threading.Lock()
+
+    def send(self, stream: str, value: BaseModel) -> str:
+        """Add an event to a stream. Returns the message id."""
+        return _decode_id(self._client.xadd(stream, self._encode_message(value), **self._trim_args(stream)))
+
+    def send_many(self, stream: str, values: Iterable[BaseModel], batch_size: int = SEND_BATCH_SIZE) -> List[str]:
+        """Add events to a stream, pipelining `batch_size` XADDs per round trip. Returns the message ids in order."""
+        ids = []
+        values = iter(values)
+        while batch := list(islice(values, batch_size)):
+            pipe = self._client.pipeline(transaction=False)
+            trim_args = self._trim_args(stream)
+            for value in batch:
+                pipe.xadd(stream, self._encode_message(value), **trim_args)
+            ids.extend(_decode_id(msg_id) for msg_id in pipe.execute())
+        return ids
+
+    def _encode_message(self, value: BaseModel) -> Dict[str, bytes]:
+        # Serialize entire object under the 'data' field, tagged with the codec that wrote it
+        return self._codec.encode(value)
+
+    def _trim_args(self, stream: str) -> Dict[str, Any]:
+        return xadd_trim_args(self._retention_policies.get(stream), self._safe_trim_ids.get(stream))
+
+    # Retention
+    def set_retention_policy(self, stream: str, policy: Optional[StreamRetentionPolicy], trim_interval: float = DEFAULT_TRIM_INTERVAL):
+        """Bound the memory of a stream (None removes its policy). `max_len` is applied by every XADD;
+        `max_age_seconds` by a background thread every `trim_interval` seconds and, once known, by XADD,
+        in both cases never trimming past the oldest entry a consumer group has not acknowledged."""
+        with self._trimmer_lock:
+            if policy is None:
+                self._retention_policies.pop(stream, None)
+                self._safe_trim_ids.pop(stream, None)
+                return
+            self._retention_policies[stream] = policy
+            self._trim_interval = trim_interval
+            if self._trimmer is None:
+                self._trimmer = threading.Thread(target=self._trim_loop, daemon=True, name="RedisStreamTrimmer")
+                self._trimmer.start()
+
+    def trim_streams(self, streams: Optional[List[str]] = None) -> Dict[str, int]:
+        """Apply the age limit of every stream with a retention policy now. Returns the number of trimmed entries per stream."""
+        trimmed = {}
+        for stream, policy in list(self._retention_policies.items()):
+            if streams is not None and stream not in streams:
+                continue
+            try:
+                groups = self._client.xinfo_groups(stream)
+            except redis.exceptions.ResponseError:
+                continue  # the stream does not exist yet
+            pipe = self._client.pipeline(transaction=False)
+            pending_groups = [group['name'] for group in groups if group['pending']]
+            for name in pending_groups:
+                pipe.xpending(stream, name)
+            pending_min_ids = {
+                name.decode('utf-8') if isinstance(name, bytes) else name: summary['min']
+                for name, summary in zip(pending_groups, pipe.execute())
+            }
+            safe_id = safe_trim_id(groups, pending_min_ids)
+            if safe_id is not None:
+                self._safe_trim_ids[stream] = safe_id
+            target = trim_id(policy, safe_id)
+            if target is not None:
+                trimmed[stream] = self._client.xtrim(stream, minid=target, approximate=policy.approximate)
+        return trimmed
+
+    def _trim_loop(self):
+        """Trim the streams every trim interval. Exits once no stream has a retention policy."""
+        while True:
+            with self._trimmer_lock:
+                if not self._retention_policies:
+                    self._trimmer = None
+                    return
+                interval = self._trim_interval
+            try:
+                self.trim_streams()
+            except Exception as e:
+                logging.error(f"Error trimming streams: {e}")
+            time.sleep(interval)
 
     # Key-Value Operations
     def get(self, key: str) -> Optional[str]:
@@ -67,6 +169,42 @@ class RedisClient:
         except (TypeError, ValueError):
             return False
 
+    def get_versioned_json(self, key: str, version_key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Get a JSON value and the current version held by `version_key` (None when unset) in one round trip."""
+        value, version = self._client.mget(key, version_key)
+        return _loads_json(value), _decode_id(version) if version is not None else None
+
+    def set_versioned_json(self, key: str, value: Any, version_key: str, version: Optional[str], ex: Optional[int] = None) -> bool:
+        """
+        Set a JSON value only while `version_key` still holds `version` (None: unset), e.g. the version
+        returned by `get_versioned_json` before the value was computed. Returns False when the version
+        moved in the meantime, so values computed from stale data are never written.
+        """
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(version_key)
+                current = pipe.get(version_key)
+                if (_decode_id(current) if current is not None else None) != version:
+                    return False
+                pipe.multi()
+                pipe.set(key, json.dumps(value), ex=ex)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def bump_versions(self, version_keys: Iterable[str], delete_keys: Iterable[str] = (), ex: Optional[int] = None) -> None:
+        """Increment version keys, so pending `set_versioned_json` calls fail, and delete `delete_keys`, in one transaction."""
+        pipe = self._client.pipeline(transaction=True)
+        for version_key in version_keys:
+            pipe.incr(version_key)
+            if ex is not None:
+                pipe.expire(version_key, ex)
+        delete_keys = list(delete_keys)
+        if delete_keys:
+            pipe.delete(*delete_keys)
+        pipe.execute()
+
     def increment(self, key: str, amount: int = 1) -> int:
         """Increment a numeric value in Redis."""
         return self._client.incrby(key, amount)
@@ -91,8 +229,21 @@ class RedisClient:
         """Get the time-to-live of a key in seconds."""
         return self._client.ttl(key)
 
-    def create_consumer(self, stream: str, group_id: str, max_concurrent_tasks: int = 10):
-        """Create a consumer thread for a specific stream with a maximum number of concurrent tasks."""
+    def create_consumer(self, stream: str, group_id: str, max_concurrent_tasks: int = 10,
+                        ack_batch_size: int = DEFAULT_ACK_BATCH_SIZE, ack_flush_interval: float = DEFAULT_ACK_FLUSH_INTERVAL,
+                        consumer_name: Optional[str] = None, claim_min_idle_ms: int = DEFAULT_CLAIM_MIN_IDLE_MS,
+                        claim_interval: Optional[float] = DEFAULT_CLAIM_INTERVAL,
+                        consumer_idle_timeout_ms: Optional[int] = DEFAULT_CONSUMER_IDLE_TIMEOUT_MS):
+        """Create a consumer thread for a specific stream with a maximum number of concurrent tasks.
+        Processed messages are acknowledged in batches of up to `ack_batch_size` ids, at most
+        `ack_flush_interval` seconds after processing.
+
+        The consumer reads under a name unique to this process (`unique_consumer_name`) unless
+        `consumer_name` is given. Every `claim_interval` seconds it takes over messages other
+        consumers left pending for `claim_min_idle_ms` (XAUTOCLAIM), e.g. after a replica crashed,
+        and deletes consumers idle for `consumer_idle_timeout_ms` without pending messages.
+        `claim_interval=None` disables the recovery. `claim_min_idle_ms` must exceed the longest
+        processing time of a message, or messages still being processed get claimed again."""
         with self._consumer_lock:
             if stream in self._consumers:
                 raise RuntimeError(f"Consumer for stream '{stream}' already exists.")
@@ -109,6 +260,9 @@ class RedisClient:
             self._max_concurrent_tasks[stream] = max_concurrent_tasks
             self._running_tasks[stream] = 0
             self._task_count_locks[stream] = threading.Lock()  # Per-stream lock
+            self._consumer_names[stream] = consumer_name or unique_consumer_name(group_id)
+            self._ack_buffers[stream] = AckBuffer(group_id, ack_batch_size, ack_flush_interval)
+            self._start_ack_flusher()
 
         # Dedicated thread for this stream's consumer
         def consume_loop():
@@ -116,7 +270,8 @@ class RedisClient:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             
-            consumer_name = f"{group_id}-consumer"
+            consumer_name = self._consumer_names[stream]
+            claim_cursor, next_claim = '0-0', time.monotonic()
             while not self._stop_flags[stream]:
 
                 # Calculate how many messages to read from stream based on currently running tasks
@@ -130,14 +285,29 @@ class RedisClient:
                     continue
                     
                 read_count = self._max_concurrent_tasks[stream] - running_task_count
-                
-                resp = self._client.xreadgroup(
-                    groupname=group_id,
-                    consumername=consumer_name,
-                    streams={stream: '>'},
-                    count=read_count,
-                    block=1000
-                )
+
+                # Take over messages left pending by other consumers before reading new ones
+                resp = None
+                if claim_interval is not None and time.monotonic() >= next_claim:
+                    try:
+                        claim_cursor, resp = self._reclaim(stream, group_id, consumer_name, claim_cursor, read_count, claim_min_idle_ms)
+                        if claim_cursor == '0-0':
+                            # scan complete: wait before scanning the pending list again
+                            next_claim = time.monotonic() + claim_interval
+                            if consumer_idle_timeout_ms is not None:
+                                self._delete_idle_consumers(stream, group_id, consumer_name, consumer_idle_timeout_ms)
+                    except Exception as e:
+                        logging.error(f"Error reclaiming pending messages of stream {stream}: {e}")
+                        claim_cursor, next_claim = '0-0', time.monotonic() + claim_interval
+
+                if not resp:
+                    resp = self._client.xreadgroup(
+                        groupname=group_id,
+                        consumername=consumer_name,
+                        streams={stream: '>'},
+                        count=read_count,
+                        block=1000
+                    )
                 if not resp:
                     continue
 
@@ -154,8 +324,46 @@ class RedisClient:
         t.start()
         self._consumers[stream] = t
 
-    def register_callback(self, stream: str, group_id: str, callback: Union[Callable[[str, Any], None], Callable[[str, Any], Awaitable[None]]]):
-        """Register a callback for a stream. Creates a consumer if one doesn't exist."""
+    def get_consumer_name(self, stream: str) -> Optional[str]:
+        """Return the consumer name this process reads a stream with."""
+        return self._consumer_names.get(stream)
+
+    def _reclaim(self, stream: str, group_id: str, consumer_name: str, cursor: str, count: int, min_idle_ms: int):
+        """Claim up to `count` messages idle for `min_idle_ms`, continuing the XAUTOCLAIM scan at `cursor`.
+        Returns the next cursor ('0-0' once the scan is complete) and the messages in XREADGROUP form."""
+        response = self._client.xautoclaim(stream, group_id, consumer_name, min_idle_time=min_idle_ms, start_id=cursor, count=count)
+        cursor, messages, deleted = split_claimed(response)
+        if deleted:
+            # entries trimmed from the stream can no longer be processed
+            self._client.xack(stream, group_id, *deleted)
+        if not messages:
+            return cursor, []
+        logging.info(f"Reclaimed {len(messages)} pending messages on stream {stream}")
+        return cursor, [(stream, messages)]
+
+    def _delete_idle_consumers(self, stream: str, group_id: str, consumer_name: str, idle_timeout_ms: int):
+        for name in idle_consumers(self._client.xinfo_consumers(stream, group_id), consumer_name, idle_timeout_ms):
+            self._client.xgroup_delconsumer(stream, group_id, name)
+            logging.info(f"Deleted idle consumer {name} of group {group_id} on stream {stream}")
+
+    def _delete_own_consumer(self, stream: str, group_id: str, consumer_name: str):
+        """Delete this process' consumer on shutdown, unless it still has pending messages to be reclaimed."""
+        try:
+            for consumer in self._client.xinfo_consumers(stream, group_id):
+                name = consumer['name'].decode('utf-8') if isinstance(consumer['name'], bytes) else consumer['name']
+                if name == consumer_name and consumer['pending'] == 0:
+                    self._client.xgroup_delconsumer(stream, group_id, consumer_name)
+        except Exception as e:
+            logging.error(f"Error deleting consumer {consumer_name} of stream {stream}: {e}")
+
+    def register_callback(self, stream: str, group_id: str, callback: Union[Callable[..., None], Callable[..., Awaitable[None]]],
+                          event_type: Optional[Type[BaseModel]] = None):
+        """Register a callback for a stream. Creates a consumer if one doesn't exist.
+
+        Without `event_type` the callback is called with the message id and the decoded data.
+        With an event contract class it is called with the validated event only: each message
+        is validated once per class, straight from its payload, and invalid messages are counted
+        (`get_invalid_message_counts`) instead of reaching the callback."""
         with self._callback_lock:
             # Create a consumer if one doesn't exist
             if stream not in self._consumers:
@@ -163,9 +371,9 @@ class RedisClient:
             
             # Add the callback to the stream's callback list
             if stream in self._callbacks:
-                self._callbacks[stream].append(callback)
+                self._callbacks[stream].append((callback, event_type))
             else:
-                self._callbacks[stream] = [callback]
+                self._callbacks[stream] = [(callback, event_type)]
 
     # def handle_messages_sync(self, redis_response, stream:str, group_id:str):
     #     """process messages serially, executing callbacks serially as well"""
@@ -188,18 +396,9 @@ class RedisClient:
         tasks = []
         for _, messages in redis_response:
             for msg_id, fields in messages:
-                data_json = fields.get(b'data') or fields.get('data')
-                if data_json:
-                    try:
-                        val = json.loads(data_json)
-                    except Exception:
-                        val = None
-                else:
-                    val = None
-
                 # Create a task for this message
                 task = loop.create_task(
-                    self._process_message(stream, group_id, msg_id, val)
+                    self._process_message(stream, group_id, msg_id, fields)
                 )
                 
                 # Track the task
@@ -224,24 +423,98 @@ class RedisClient:
                 if stream in self._running_tasks and self._running_tasks[stream] > 0:
                     self._running_tasks[stream] -= 1
 
-    async def _process_message(self, stream: str, group_id: str, msg_id: str, val: Any):
+    async def _process_message(self, stream: str, group_id: str, msg_id: str, fields: Dict[Any, Any]):
         """Process a single message by executing all callbacks and then acknowledging."""
+        message = DecodedMessage(self._codec, fields)
         try:
             # Execute all callbacks for this message
-            for cb in self._callbacks[stream]:
+            for cb, event_type in self._callbacks[stream]:
+                try:
+                    args = (message.decode(event_type),) if event_type is not None else (msg_id, message.decode())
+                except Exception:
+                    if event_type is not None:
+                        continue  # typed callbacks only receive valid events
+                    args = (msg_id, None)
                 try:
                     # Check if callback is a coroutine function
                     if inspect.iscoroutinefunction(cb):
-                        await cb(msg_id, val)
+                        await cb(*args)
                     else:
                         # Run non-async callback in a thread pool
                         logging.info(f"Running non-async callback {cb} in thread pool")
-                        await asyncio.to_thread(cb, msg_id, val)
+                        await asyncio.to_thread(cb, *args)
                 except Exception as e:
                     logging.error(f"Error in callback for stream {stream}: {e}")
         finally:
-            # Always acknowledge the message after all callbacks are executed
-            self._client.xack(stream, group_id, msg_id)
+            if message.errors:
+                self._invalid_messages[stream] = self._invalid_messages.get(stream, 0) + 1
+                logging.warning(f"Invalid message {msg_id} on stream {stream}: {next(iter(message.errors.values()))}")
+            # Always acknowledge the message after all callbacks are executed, batched with other acks
+            if self._ack_buffers[stream].add(msg_id):
+                self._ack_wakeup.set()
+
+    def get_ack_metrics(self, stream: Optional[str] = None) -> Dict[str, Any]:
+        """Return ack counters, batch sizes and latency of one stream, or of every stream keyed by name."""
+        if stream is not None:
+            buffer = self._ack_buffers.get(stream)
+            return buffer.stats() if buffer is not None else {}
+        return {name: buffer.stats() for name, buffer in list(self._ack_buffers.items())}
+
+    def get_invalid_message_counts(self, stream: Optional[str] = None) -> Union[int, Dict[str, int]]:
+        """Return the number of messages whose payload failed to decode, for one stream or for every stream keyed by name."""
+        if stream is not None:
+            return self._invalid_messages.get(stream, 0)
+        return dict(self._invalid_messages)
+
+    def flush_acks(self, streams: Optional[List[str]] = None) -> int:
+        """Acknowledge every buffered message now. Returns the number of acknowledged messages."""
+        return self._flush_acks(streams, force=True)
+
+    def _start_ack_flusher(self):
+        with self._ack_flusher_lock:
+            if self._ack_flusher is None:
+                self._ack_flusher = threading.Thread(target=self._ack_flush_loop, daemon=True, name="RedisAckFlusher")
+                self._ack_flusher.start()
+
+    def _ack_flush_loop(self):
+        """Flush due ack buffers when one fills up or its flush interval elapses. Exits with the last consumer."""
+        while True:
+            with self._ack_flusher_lock:
+                buffers = list(self._ack_buffers.values())
+                if not buffers:
+                    self._ack_flusher = None
+                    return
+            interval = min(buffer.flush_interval for buffer in buffers)
+            self._ack_wakeup.wait(timeout=interval)
+            self._ack_wakeup.clear()
+            try:
+                self._flush_acks()
+            except Exception as e:
+                logging.error(f"Error flushing acks: {e}")
+
+    def _flush_acks(self, streams: Optional[List[str]] = None, force: bool = False) -> int:
+        """Send one XACK per due stream, all in a single pipelined round trip."""
+        with self._ack_flush_lock:
+            return self._xack(drain_due_buffers(self._ack_buffers, streams, force))
+
+    def _xack(self, batches: List[Tuple[str, AckBuffer, List[Any], List[float]]]) -> int:
+        if not batches:
+            return 0
+
+        pipe = self._client.pipeline(transaction=False)
+        for stream, buffer, ids, _ in batches:
+            pipe.xack(stream, buffer.group_id, *ids)
+        try:
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"XACK of {sum(len(ids) for _, _, ids, _ in batches)} messages failed: {e}")
+            for _, buffer, ids, added_at in batches:
+                buffer.restore(ids, added_at)
+            return 0
+
+        for _, buffer, _, added_at in batches:
+            buffer.record_flush(added_at)
+        return sum(len(ids) for _, _, ids, _ in batches)
 
     def stop_consumer(self, stream: str):
         """Stop a consumer thread and clean up resources."""
@@ -249,6 +522,16 @@ class RedisClient:
             if stream in self._stop_flags:
                 self._stop_flags[stream] = True
                 self._consumers[stream].join()
+                # the consumer thread has finished its messages: acknowledge everything still buffered.
+                # Under the flush lock no XACK of this stream is in flight, and once the buffer is
+                # removed the flusher cannot drain it any more
+                with self._ack_flush_lock:
+                    buffer = self._ack_buffers.pop(stream)
+                    self._xack(drain_due_buffers({stream: buffer}, force=True))
+                if len(buffer):
+                    logging.warning(f"{len(buffer)} messages of stream {stream} could not be acknowledged and stay pending to be reclaimed")
+                self._delete_own_consumer(stream, buffer.group_id, self._consumer_names[stream])
+                del self._consumer_names[stream]
                 del self._consumers[stream]
                 del self._callbacks[stream]
                 del self._stop_flags[stream]
@@ -261,5 +544,18 @@ class RedisClient:
                     del self._task_count_locks[stream]
 
 
+def _decode_id(msg_id: Union[bytes, str]) -> str:
+    return msg_id.decode('utf-8') if isinstance(msg_id, bytes) else msg_id
+
+
+def _loads_json(value: Optional[Union[bytes, str]]) -> Optional[Any]:
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return None
+
+
 redis_client = RedisClient()  # module level singleton instance
     
\ No newline at end of file
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+DEFAULT_ACK_BATCH_SIZE = 100
+DEFAULT_ACK_FLUSH_INTERVAL = 0.05  # seconds a processed message may wait for its XACK
+
+class AckBuffer:
+    """
+    Thread-safe buffer of processed message ids waiting to be acknowledged on one stream/group.
+
+    Clients `add` ids as messages finish and `drain` the buffer into a single XACK once it is
+    due: `batch_size` ids are pending or the oldest has waited `flush_interval` seconds.
+    The buffer keeps the ack metrics (batch sizes, latency from processing to XACK).
+    """
+    def __init__(self, group_id: str, batch_size: int = DEFAULT_ACK_BATCH_SIZE, flush_interval: float = DEFAULT_ACK_FLUSH_INTERVAL):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.group_id = group_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._ids: List[Any] = []
+        self._added_at: List[float] = []
+        self._acked = 0
+        self._flushes = 0
+        self._errors = 0
+        self._max_batch_size = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def add(self, msg_id: Any) -> bool:
+        """Buffer a processed message id. Returns True when the buffer reached `batch_size`."""
+        with self._lock:
+            self._ids.append(msg_id)
+            self._added_at.append(time.monotonic())
+            return len(self._ids) >= self.batch_size
+
+    def is_due(self) -> bool:
+        with self._lock:
+            return bool(self._ids) and (
+                len(self._ids) >= self.batch_size or time.monotonic() - self._added_at[0] >= self.flush_interval
+            )
+
+    def drain(self) -> Tuple[List[Any], List[float]]:
+        """Take every buffered id, with the time each was added, for one XACK."""
+        with self._lock:
+            ids, added_at = self._ids, self._added_at
+            self._ids, self._added_at = [], []
+            return ids, added_at
+
+    def restore(self, ids: List[Any], added_at: List[float]) -> None:
+        """Put back ids whose XACK failed, so the next flush retries them."""
+        with self._lock:
+            self._ids[:0] = ids
+            self._added_at[:0] = added_at
+            self._errors += 1
+
+    def record_flush(self, added_at: List[float]) -> None:
+        """Record a successful XACK of ids added at `added_at`."""
+        now = time.monotonic()
+        with self._lock:
+            self._acked += len(added_at)
+            self._flushes += 1
+            self._max_batch_size = max(self._max_batch_size, len(added_at))
+            self._total_latency += sum(now - t for t in added_at)
+            self._max_latency = max(self._max_latency, now - min(added_at, default=now))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return ack counters, batch sizes and ack latency (seconds from processing to XACK)."""
+        with self._lock:
+            return {
+                "pending": len(self._ids),
+                "acked": self._acked,
+                "flushes": self._flushes,
+                "errors": self._errors,
+                "avg_batch_size": self._acked / self._flushes if self._flushes else None,
+                "max_batch_size": self._max_batch_size,
+                "avg_ack_latency": self._total_latency / self._acked if self._acked else None,
+                "max_ack_latency": self._max_latency,
+            }
+
+def drain_due_buffers(buffers: Mapping[str, AckBuffer], streams: Optional[Iterable[str]] = None, force: bool = False) -> List[Tuple[str, AckBuffer, List[Any], List[float]]]:
+    """Drain the buffers that are due (all non-empty ones with `force`) into (stream, buffer, ids, added_at) batches."""
+    streams = set(streams) if streams is not None else None
+    batches = []
+    for stream, buffer in list(buffers.items()):
+        if (streams is None or stream in streams) and (force or buffer.is_due()):
+            ids, added_at = buffer.drain()
+            if ids:
+                batches.append((stream, buffer, ids, added_at))
+    return batches
@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any, ContextManager
+from typing import Any, ContextManager, Optional
 from .postgres_client import PostgresClient
 
 class AGEClientBase(ABC):
     """Abstract base class for apache age enabeld database clients."""
-    def __init__(self):
+    def __init__(self, decode_agtype: bool = False):
         self._postgres_client = PostgresClient()
+        # when set, agtype columns are decoded into python objects while rows are fetched
+        self.decode_agtype = decode_agtype
+        self._agtype_oid: Optional[int] = None
         # Expose postgres client attributes for easy access
         self.user = self._postgres_client.user
         self.password = self._postgres_client.password
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+class PoolConfig(BaseModel):
+    """Sizing and lifetime settings for a psycopg connection pool."""
+    min_size: int = Field(default=1, ge=0, description="Number of connections kept open by the pool.")
+    max_size: int = Field(default=10, ge=1, description="Maximum number of connections the pool can open.")
+    max_idle: float = Field(default=600.0, gt=0, description="Seconds an unused connection above min_size stays open before being closed.")
+    max_lifetime: float = Field(default=3600.0, gt=0, description="Seconds after which a connection is replaced, to spread reconnections over time.")
+    timeout: float = Field(default=30.0, gt=0, description="Seconds a client waits for a connection before the request fails.")
+    max_waiting: int = Field(default=0, ge=0, description="Maximum number of clients queued for a connection (0 means unbounded).")
@@ -0,0 +1,137 @@
+import json
+import zlib
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Type
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding
+    orjson = None
+
+DATA_FIELD = "data"
+CODEC_FIELD = "codec"  # '<serializer>[+<compression>]'; entries without it are legacy JSON
+DEFAULT_COMPRESSION_THRESHOLD = 4096  # payloads up to this many bytes are never compressed
+DEFAULT_COMPRESSION_LEVELS = {"zlib": 1, "zstd": 3}  # favour CPU over ratio: events are short-lived
+
+def _load_json(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _import_optional(module: str, extra: str) -> Any:
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ImportError(f"The '{extra}' stream codec requires the '{module}' package: pip install insurgentai_shared_utils[{extra}]") from None
+
+def _serializer(name: str) -> Tuple[Callable[[BaseModel], bytes], Callable[[bytes], Any]]:
+    if name == "json":
+        return lambda value: value.model_dump_json().encode('utf-8'), _load_json
+    if name == "msgpack":
+        msgpack = _import_optional("msgpack", "msgpack")
+        return lambda value: msgpack.packb(value.model_dump(mode='json')), lambda data: msgpack.unpackb(data, raw=False)
+    raise ValueError(f"Unknown stream serializer: {name}")
+
+def _compressor(name: str, level: Optional[int]) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    level = DEFAULT_COMPRESSION_LEVELS.get(name) if level is None else level
+    if name == "zlib":
+        return lambda data: zlib.compress(data, level), zlib.decompress
+    if name == "zstd":
+        zstandard = _import_optional("zstandard", "zstd")
+        # one-shot functions: compressor objects are not thread-safe, and frames record their content size
+        return lambda data: zstandard.compress(data, level), zstandard.decompress
+    raise ValueError(f"Unknown stream compression: {name}")
+
+class StreamCodec:
+    """
+    Encodes events into stream entry fields and decodes them back.
+
+    Entries carry the serialized event under `data` and the codec that wrote it under `codec`
+    (e.g. 'msgpack+zstd'), so a consumer decodes whatever codec each producer uses. Entries
+    without a `codec` field come from producers that predate codecs and are decoded as JSON.
+    Payloads above `compression_threshold` bytes are compressed with `compression`.
+    """
+    def __init__(self, serializer: str = "json", compression: Optional[str] = None,
+                 compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD, compression_level: Optional[int] = None):
+        self.serializer = serializer
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self._serialize, _ = _serializer(serializer)
+        self._compress = _compressor(compression, compression_level)[0] if compression else None
+        # decoders are created on first use, for the codecs other producers write
+        self._deserializers: Dict[str, Callable[[bytes], Any]] = {}
+        self._decompressors: Dict[str, Callable[[bytes], bytes]] = {}
+
+    def encode(self, value: BaseModel) -> Dict[str, bytes]:
+        data = self._serialize(value)
+        codec = self.serializer
+        if self._compress is not None and len(data) > self.compression_threshold:
+            data = self._compress(data)
+            codec = f"{codec}+{self.compression}"
+        return {DATA_FIELD: data, CODEC_FIELD: codec.encode('utf-8')}
+
+    def decode(self, fields: Mapping[Any, Any]) -> Any:
+        """Decode the event of a stream entry. Returns None for entries without data."""
+        payload = self._payload(fields)
+        if payload is None:
+            return None
+        serializer, data = payload
+        return self._deserializer(serializer)(data)
+
+    def decode_model(self, fields: Mapping[Any, Any], event_type: Type[BaseModel]) -> BaseModel:
+        """Decode the event of a stream entry into `event_type`, validating JSON payloads straight from bytes.
+        Raises ValueError for entries without data and pydantic's ValidationError for invalid events."""
+        payload = self._payload(fields)
+        if payload is None:
+            raise ValueError("Stream entry has no data")
+        serializer, data = payload
+        if serializer == "json":
+            return event_type.model_validate_json(data)
+        return event_type.model_validate(self._deserializer(serializer)(data))
+
+    def _payload(self, fields: Mapping[Any, Any]) -> Optional[Tuple[str, bytes]]:
+        """Serializer and uncompressed payload of a stream entry, None when it has no data."""
+        data = fields.get(DATA_FIELD.encode('utf-8')) or fields.get(DATA_FIELD)
+        if not data:
+            return None
+        codec = fields.get(CODEC_FIELD.encode('utf-8')) or fields.get(CODEC_FIELD) or "json"
+        if isinstance(codec, bytes):
+            codec = codec.decode('utf-8')
+        serializer, _, compression = codec.partition('+')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if compression:
+            if compression not in self._decompressors:
+                self._decompressors[compression] = _compressor(compression, None)[1]
+            data = self._decompressors[compression](data)
+        return serializer, data
+
+    def _deserializer(self, serializer: str) -> Callable[[bytes], Any]:
+        if serializer not in self._deserializers:
+            self._deserializers[serializer] = _serializer(serializer)[1]
+        return self._deserializers[serializer]
+
+class DecodedMessage:
+    """
+    The event of one stream entry, decoded for the callbacks of a stream at most once per event
+    type: every callback typed with the same event class receives the same validated instance,
+    untyped callbacks share the decoded dict. Decoding errors are kept in `errors` by event type.
+    """
+    def __init__(self, codec: StreamCodec, fields: Mapping[Any, Any]):
+        self._codec = codec
+        self._fields = fields
+        self._decoded: Dict[Optional[type], Any] = {}
+        self.errors: Dict[Optional[type], Exception] = {}
+
+    def decode(self, event_type: Optional[Type[BaseModel]] = None) -> Any:
+        """Return the event as an `event_type` instance, or as decoded data without one. Re-raises earlier decoding errors."""
+        if event_type in self.errors:
+            raise self.errors[event_type]
+        if event_type not in self._decoded:
+            try:
+                if event_type is None:
+                    self._decoded[event_type] = self._codec.decode(self._fields)
+                else:
+                    self._decoded[event_type] = self._codec.decode_model(self._fields, event_type)
+            except Exception as e:
+                self.errors[event_type] = e
+                raise
+        return self._decoded[event_type]
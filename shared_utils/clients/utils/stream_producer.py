@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel
+
+DEFAULT_PRODUCER_LINGER = 0.005  # seconds an event may wait for other events to share its round trip
+DEFAULT_PRODUCER_BATCH_SIZE = 500
+
+class BufferedStreamProducer:
+    """
+    Buffers events sent from the event loop and writes them with the client's `send_many`.
+
+    Events are flushed `linger` seconds after the first one was buffered, or as soon as
+    `max_batch_size` events are waiting. Flushes run one at a time, so events reach each stream
+    in the order they were sent. Every event gets a future resolved with its message id.
+    """
+    def __init__(self, client: Any, linger: float = DEFAULT_PRODUCER_LINGER, max_batch_size: int = DEFAULT_PRODUCER_BATCH_SIZE):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._client = client
+        self.linger = linger
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, BaseModel, asyncio.Future]] = []
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._closed = False
+        self._sent = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_batch_size = 0
+        self._flush_seconds = 0.0
+
+    def enqueue(self, stream: str, value: BaseModel) -> asyncio.Future:
+        """Buffer an event. Returns a future resolved with its message id once it is flushed."""
+        if self._closed:
+            raise RuntimeError("Producer is closed")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((stream, value, future))
+        if len(self._pending) >= self.max_batch_size:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_linger())
+        return future
+
+    async def send(self, stream: str, value: BaseModel) -> str:
+        """Buffer an event and wait until it is written. Returns the message id."""
+        return await self.enqueue(stream, value)
+
+    async def flush(self) -> int:
+        """Write every buffered event now. Returns the number of events written."""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            by_stream: Dict[str, List[Tuple[BaseModel, asyncio.Future]]] = {}
+            for stream, value, future in pending:
+                by_stream.setdefault(stream, []).append((value, future))
+
+            sent = 0
+            for stream, events in by_stream.items():
+                started = time.monotonic()
+                try:
+                    ids = await self._client.send_many(stream, [value for value, _ in events], batch_size=self.max_batch_size)
+                except Exception as e:
+                    self._errors += 1
+                    logging.error(f"Sending {len(events)} events to stream {stream} failed: {e}")
+                    for _, future in events:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self._flush_seconds += time.monotonic() - started
+                self._batches += -(-len(events) // self.max_batch_size)
+                self._max_batch_size = max(self._max_batch_size, min(len(events), self.max_batch_size))
+                for (_, future), msg_id in zip(events, ids):
+                    if not future.done():
+                        future.set_result(msg_id)
+                sent += len(events)
+            self._sent += sent
+            return sent
+
+    async def close(self):
+        """Stop accepting events and write the ones still buffered."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return producer counters, batch sizes and throughput (events written per second of XADD round trips)."""
+        return {
+            "pending": len(self._pending),
+            "sent": self._sent,
+            "batches": self._batches,
+            "errors": self._errors,
+            "avg_batch_size": self._sent / self._batches if self._batches else None,
+            "max_batch_size": self._max_batch_size,
+            "avg_flush_seconds": self._flush_seconds / self._batches if self._batches else None,
+            "throughput": self._sent / self._flush_seconds if self._flush_seconds else None,
+        }
+
+    async def _flush_after_linger(self):
+        await asyncio.sleep(self.linger)
+        self._timer = None  # flushing from here on: enqueue must not cancel this task any more
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"Error flushing producer: {e}")
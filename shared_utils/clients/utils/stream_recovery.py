@@ -0,0 +1,44 @@
+import os
+import socket
+import uuid
+from typing import Any, Dict, Iterable, List, Tuple
+
+DEFAULT_CLAIM_MIN_IDLE_MS = 60_000  # pending messages idle this long are considered lost by their consumer
+DEFAULT_CLAIM_INTERVAL = 30.0  # seconds between two XAUTOCLAIM scans of a stream
+DEFAULT_CONSUMER_IDLE_TIMEOUT_MS = 3_600_000  # consumers idle this long without pending messages are deleted
+
+def unique_consumer_name(group_id: str) -> str:
+    """
+    Consumer name unique to this process: every replica reads with its own identity,
+    so pending-entry lists are never shared between processes.
+    """
+    return f"{group_id}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+def split_claimed(response: List[Any]) -> Tuple[str, List[Tuple[Any, Dict]], List[Any]]:
+    """
+    Split an XAUTOCLAIM response into the next cursor, the claimed messages, and the ids of
+    pending entries deleted from the stream (reported in the third element from Redis 7, and
+    as entries without fields before).
+    """
+    cursor = response[0].decode('utf-8') if isinstance(response[0], bytes) else response[0]
+    messages, deleted = [], list(response[2]) if len(response) > 2 else []
+    for msg_id, fields in response[1]:
+        if msg_id is None:
+            continue
+        if fields is None:
+            deleted.append(msg_id)
+        else:
+            messages.append((msg_id, fields))
+    return cursor, messages, deleted
+
+def idle_consumers(consumers: Iterable[Dict[str, Any]], own_name: str, idle_timeout_ms: int) -> List[str]:
+    """
+    Names of the consumers (from XINFO CONSUMERS) that can be deleted: idle for longer than
+    `idle_timeout_ms` and without pending messages, which deleting a consumer would drop.
+    """
+    names = []
+    for consumer in consumers:
+        name = consumer['name'].decode('utf-8') if isinstance(consumer['name'], bytes) else consumer['name']
+        if name != own_name and consumer['pending'] == 0 and consumer['idle'] >= idle_timeout_ms:
+            names.append(name)
+    return names
@@ -0,0 +1,70 @@
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from pydantic import BaseModel, Field, model_validator
+
+DEFAULT_TRIM_INTERVAL = 10.0  # seconds between two background trims of the streams with a retention policy
+
+class StreamRetentionPolicy(BaseModel):
+    """How much of a stream Redis keeps."""
+    max_len: Optional[int] = Field(default=None, ge=1, description="Entries kept by XADD MAXLEN on every produce; a hard bound that also drops unread entries.")
+    max_age_seconds: Optional[float] = Field(default=None, gt=0, description="Entries older than this are trimmed (MINID), never before every consumer group acknowledged them.")
+    approximate: bool = Field(default=True, description="Trim with '~' so Redis only removes whole macro nodes, which is much cheaper.")
+
+    @model_validator(mode='after')
+    def _check_bound(self) -> 'StreamRetentionPolicy':
+        if self.max_len is None and self.max_age_seconds is None:
+            raise ValueError("A retention policy needs max_len or max_age_seconds")
+        return self
+
+def parse_stream_id(msg_id: Any) -> Tuple[int, int]:
+    """Split a stream id ('<ms>-<seq>', str or bytes) into comparable integers."""
+    if isinstance(msg_id, bytes):
+        msg_id = msg_id.decode('utf-8')
+    ms, _, seq = msg_id.partition('-')
+    return int(ms), int(seq or 0)
+
+def age_cutoff_id(max_age_seconds: float, now: Optional[float] = None) -> str:
+    """Id of the first entry younger than `max_age_seconds`."""
+    now = time.time() if now is None else now
+    return f"{max(int((now - max_age_seconds) * 1000), 0)}-0"
+
+def safe_trim_id(groups: Iterable[Mapping[str, Any]], pending_min_ids: Mapping[str, Any]) -> Optional[str]:
+    """
+    Lowest id any consumer group still needs, from XINFO GROUPS and the oldest pending id of each
+    group (XPENDING): a group needs its oldest pending entry, or else everything after the last
+    entry delivered to it. Trimming with MINID up to this id only removes acknowledged entries.
+    Returns None when the stream has no consumer group.
+    """
+    safe = None
+    for group in groups:
+        name = group['name'].decode('utf-8') if isinstance(group['name'], bytes) else group['name']
+        if group['pending'] and pending_min_ids.get(name) is not None:
+            needed = parse_stream_id(pending_min_ids[name])
+        else:
+            ms, seq = parse_stream_id(group['last-delivered-id'])
+            needed = (ms, seq + 1)
+        safe = needed if safe is None else min(safe, needed)
+    return None if safe is None else f"{safe[0]}-{safe[1]}"
+
+def trim_id(policy: StreamRetentionPolicy, safe_id: Optional[str], now: Optional[float] = None) -> Optional[str]:
+    """MINID that applies the policy's age limit without passing `safe_id`. None when the policy has no age limit."""
+    if policy.max_age_seconds is None:
+        return None
+    cutoff = age_cutoff_id(policy.max_age_seconds, now)
+    if safe_id is None:
+        return cutoff
+    return min(cutoff, safe_id, key=parse_stream_id)
+
+def xadd_trim_args(policy: Optional[StreamRetentionPolicy], safe_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Trimming arguments for XADD. MAXLEN takes precedence since XADD accepts one strategy; the age
+    limit is then applied by the background trimmer alone. MINID is only used once the trimmer
+    found the `safe_id` of the stream, so produce never trims entries a group still needs.
+    """
+    if policy is None:
+        return {}
+    if policy.max_len is not None:
+        return {"maxlen": policy.max_len, "approximate": policy.approximate}
+    if safe_id is None:
+        return {}
+    return {"minid": trim_id(policy, safe_id), "approximate": policy.approximate}
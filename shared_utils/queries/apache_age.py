@@ -1,11 +1,25 @@
+import json
 import logging
 import re
-from typing import Dict, Any, Optional, List, Annotated
-from pydantic import BaseModel, AfterValidator
+import threading
+import time
+from itertools import islice
+from uuid import uuid4
+from typing import Dict, Any, Optional, List, Annotated, Iterable, Iterator, Tuple, NamedTuple
+from pydantic import BaseModel, AfterValidator, Field
 from psycopg import Connection, Cursor
 from psycopg.errors import SyntaxError as PgSyntaxError
+from shared_utils.serialization_utils import normalize_entity_id, normalize_entity_ids, deserialize_event
+from shared_utils.sql_models import ChunkGraph
+from shared_utils.event_models import KnowledgeGraphUpdatedEvent
+from shared_utils.agtype_utils import Vertex, Edge, parse_agtype
+from shared_utils.cache_utils import LRUCache
 
 WHITESPACE = re.compile('\s')
+ENTITY_LABEL = "Entity"
+DEFAULT_EDGE_LABEL = "RELATED_TO"
+K_HOP_CACHE_SIZE = 4096
+K_HOP_COLUMNS = ["seed", "vertex", "path"]
 _SQL_INVALID_CHARS = re.compile(r"[\x00-\x1F]")  # ASCII control characters
 
 def _escape_cypher_string(s:str)->str:
@@ -90,7 +104,75 @@ def exec_cypher(cursor:Cursor, graph_name:str, cypher_stmt:str, params:Optional[
     except Exception as cause:
         raise Exception("Execution error in statement execution: ERR[" + str(cause) +"](" + stmt +")") from cause
 
-def _build_cypher(graph_name:str, cypher_stmt:str, columns:Optional[List[str]]) ->str:
+def exec_cypher_with_params(cursor:Cursor, graph_name:str, cypher_stmt:str, params:Optional[Dict[str, Any]]=None, cols:Optional[List[str]]=None) -> Cursor:
+    """
+    Executes a cypher statement with its parameters bound server side.
+
+    Parameters are referenced as `$name` in the statement and sent as an agtype map through
+    the third argument of cypher(). The statement text is the same for every parameter value,
+    so it is prepared and planned once per connection and values are never spliced into SQL.
+
+    Example:
+        exec_cypher_with_params(cur, graph_name, "MATCH (a:Entity {id: $id}) RETURN a", {"id": entity_id})
+    """
+    if cursor == None or cursor.closed:
+        raise Exception("Connection is not open or is closed")
+
+    if graph_name is None:
+        raise Exception("Graph name cannot be None")
+
+    cypher = cypher_stmt.replace("\n", " ").replace("\t", " ").strip()
+    stmt = _build_cypher(graph_name, cypher, cols, parameterized=True)
+
+    try:
+        return cursor.execute(stmt, (_to_agtype_map(params),), prepare=True)
+    except PgSyntaxError as cause:
+        raise cause
+    except Exception as cause:
+        raise Exception("Execution error in statement execution: ERR[" + str(cause) +"](" + stmt +")") from cause
+
+def stream_cypher(conn:Connection, graph_name:str, cypher_stmt:str, params:Optional[Dict[str, Any]]=None, cols:Optional[List[str]]=None, batch_size:int=1000) -> Iterator[Tuple[Any, ...]]:
+    """
+    Executes a cypher statement on a named, server-side cursor and yields result rows.
+
+    Rows are fetched `batch_size` at a time, so large results (e.g. `MATCH (v) RETURN v`) are
+    processed in constant memory and the first rows are available before the whole result is read.
+    `params` are bound server side as in `exec_cypher_with_params`. Must be called inside a
+    transaction (the default for non-autocommit connections); the cursor is closed when the
+    generator is exhausted or closed.
+
+    Example:
+        for (vertex,) in stream_cypher(conn, graph_name, "MATCH (v) RETURN v", batch_size=5000):
+            ...
+    """
+    if conn == None or conn.closed:
+        raise Exception("Connection is not open or is closed")
+
+    if graph_name is None:
+        raise Exception("Graph name cannot be None")
+
+    cypher = cypher_stmt.replace("\n", " ").replace("\t", " ").strip()
+    stmt = _build_cypher(graph_name, cypher, cols, parameterized=params is not None)
+    args = (_to_agtype_map(params),) if params is not None else None
+
+    with conn.cursor(name=f"cypher_stream_{uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(stmt, args)
+        except PgSyntaxError as cause:
+            raise cause
+        except Exception as cause:
+            raise Exception("Execution error in statement execution: ERR[" + str(cause) +"](" + stmt +")") from cause
+
+        while rows := cursor.fetchmany(batch_size):
+            yield from rows
+
+def _to_agtype_map(params:Optional[Dict[str, Any]]) -> str:
+    """Serialize cypher parameters to the text form of an agtype map."""
+    # non JSON-native values such as UUIDs are sent as their string representation
+    return json.dumps(params or {}, default=str)
+
+def _build_cypher(graph_name:str, cypher_stmt:str, columns:Optional[List[str]], parameterized:bool=False) ->str:
     if graph_name == None:
         raise Exception("Graph name cannot be None")
     
@@ -106,6 +188,11 @@ def _build_cypher(graph_name:str, cypher_stmt:str, columns:Optional[List[str]])
     else:
         columnExp.append('v agtype')
 
+    if parameterized:
+        # the agtype params map is bound as a query placeholder, so literal '%' must be escaped
+        cypher_stmt = cypher_stmt.replace("%", "%%")
+        return f"SELECT * FROM cypher('{graph_name}',$${cypher_stmt}$$,%s) AS ({','.join(columnExp)});"
+
     return f"SELECT * FROM cypher('{graph_name}',$${cypher_stmt}$$) AS ({','.join(columnExp)});"
 
 def graph_exists(conn: Connection, graph_name: str) -> bool:
@@ -143,3 +230,283 @@ def drop_graph(conn: Connection, graph_name: str) -> bool:
     except Exception:
         logging.error(f"Error dropping graph: {graph_name}", exc_info=True)
         return False
+
+
+class BulkLoadReport(BaseModel):
+    """Summary of a bulk graph load."""
+    vertices: int = Field(default=0, description="Number of vertex rows written.")
+    edges: int = Field(default=0, description="Number of edge rows written.")
+    batches: int = Field(default=0, description="Number of UNWIND statements executed.")
+    elapsed_seconds: float = Field(default=0.0, description="Wall clock duration of the load.")
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return (self.vertices + self.edges) / self.elapsed_seconds
+
+
+def bulk_load_graph(conn: Connection, graph_name: str, entities: Iterable[str], relations: Iterable[Tuple[str, str, str]] = (), batch_size: int = 1000, deduplicate: bool = True) -> BulkLoadReport:
+    """
+    Writes entities and (source, relation, target) tuples to a graph with set-based UNWIND statements.
+
+    Vertices are `Entity` nodes with `id` set to `normalize_entity_id(name)` and `name` set to the
+    original name; relation endpoints are added as vertices as well. Edges are labelled with the
+    upper-cased normalized relation text.
+
+    Args:
+        conn (Connection): The AGE connection to write with. The caller commits.
+        graph_name (str): The name of the graph to load into.
+        entities (Iterable[str]): Entity names.
+        relations (Iterable[Tuple[str, str, str]]): (source_entity, relation_type, target_entity) tuples.
+        batch_size (int): Number of rows sent per UNWIND statement.
+        deduplicate (bool): Collapse edges that normalize to the same (source, label, target) and
+            MERGE vertices and edges, so loading is idempotent. When False vertices and edges are
+            CREATEd, which is faster but assumes the graph does not already contain them. Vertices
+            are written once per load either way; edges are written as given.
+
+    Returns:
+        BulkLoadReport: Row counts, elapsed time and rows/sec.
+    """
+    start = time.perf_counter()
+    vertex_rows, edge_rows = _prepare_bulk_rows(entities, relations, deduplicate)
+    report = BulkLoadReport()
+
+    with conn.cursor() as cur:
+        vertex_stmt = _vertex_load_stmt(deduplicate)
+        for batch in _batched(vertex_rows, batch_size):
+            exec_cypher_with_params(cur, graph_name, vertex_stmt, {"rows": batch})
+            report.vertices += len(batch)
+            report.batches += 1
+
+        for label, rows in edge_rows.items():
+            edge_stmt = _edge_load_stmt(label, deduplicate)
+            for batch in _batched(rows, batch_size):
+                exec_cypher_with_params(cur, graph_name, edge_stmt, {"rows": batch})
+                report.edges += len(batch)
+                report.batches += 1
+
+    report.elapsed_seconds = time.perf_counter() - start
+    invalidate_k_hop_cache(graph_name)
+    logging.info(f"Bulk loaded {report.vertices} vertices and {report.edges} edges into {graph_name} ({report.rows_per_second:.0f} rows/sec)")
+    return report
+
+
+def bulk_load_chunk_graphs(conn: Connection, graph_name: str, chunk_graphs: Iterable[ChunkGraph], batch_size: int = 1000, deduplicate: bool = True) -> BulkLoadReport:
+    """Bulk loads the entities and relations of many ChunkGraph rows into a graph. See `bulk_load_graph`."""
+    entities: List[str] = []
+    relations: List[Tuple[str, str, str]] = []
+    for chunk_graph in chunk_graphs:
+        entities.extend(chunk_graph.entities)
+        relations.extend(chunk_graph.relations)
+    return bulk_load_graph(conn, graph_name, entities, relations, batch_size=batch_size, deduplicate=deduplicate)
+
+
+def _prepare_bulk_rows(entities: Iterable[str], relations: Iterable[Tuple[str, str, str]], deduplicate: bool) -> Tuple[List[Dict[str, str]], Dict[str, List[Dict[str, str]]]]:
+    """Build the vertex rows and the edge rows grouped by edge label for a bulk load."""
+    vertex_rows: List[Dict[str, str]] = []
+    seen_vertices = set()
+    edge_rows: Dict[str, List[Dict[str, str]]] = {}
+    seen_edges = set()
+
+    # normalize every entity name and relation endpoint in one batch
+    entities, relations = list(entities), list(relations)
+    names = entities + [name for source, _, target in relations for name in (source, target)]
+    vertex_ids = dict(zip(names, normalize_entity_ids(names)))
+
+    def add_vertex(name: str) -> Optional[str]:
+        vertex_id = vertex_ids[name]
+        if not vertex_id:
+            return None
+        # a vertex is written once per load either way: relation endpoints repeat the entities, and
+        # CREATEd copies would make the edge MATCH create one edge per pair of copies
+        if vertex_id not in seen_vertices:
+            seen_vertices.add(vertex_id)
+            vertex_rows.append({"id": vertex_id, "name": name})
+        return vertex_id
+
+    for name in entities:
+        add_vertex(name)
+
+    for source, relation, target in relations:
+        source_id = add_vertex(source)
+        target_id = add_vertex(target)
+        if source_id is None or target_id is None:
+            continue
+        label = _to_edge_label(relation)
+        if deduplicate:
+            edge_key = (source_id, label, target_id)
+            if edge_key in seen_edges:
+                continue
+            seen_edges.add(edge_key)
+        edge_rows.setdefault(label, []).append({"src": source_id, "dst": target_id, "name": relation})
+
+    return vertex_rows, edge_rows
+
+
+def _to_edge_label(relation: str) -> str:
+    """Convert free-form relation text into a valid AGE edge label."""
+    label = normalize_entity_id(relation).upper()
+    if not label:
+        return DEFAULT_EDGE_LABEL
+    if label[0].isdigit():
+        label = f"R_{label}"
+    return label
+
+
+def _vertex_load_stmt(deduplicate: bool) -> str:
+    if deduplicate:
+        return f"UNWIND $rows AS row MERGE (v:{ENTITY_LABEL} {{id: row.id}}) SET v.name = row.name"
+    return f"UNWIND $rows AS row CREATE (v:{ENTITY_LABEL} {{id: row.id, name: row.name}})"
+
+
+def _edge_load_stmt(label: str, deduplicate: bool) -> str:
+    match = f"UNWIND $rows AS row MATCH (a:{ENTITY_LABEL} {{id: row.src}}), (b:{ENTITY_LABEL} {{id: row.dst}}) "
+    if deduplicate:
+        return match + f"MERGE (a)-[e:{label}]->(b) SET e.name = row.name"
+    return match + f"CREATE (a)-[e:{label} {{name: row.name}}]->(b)"
+
+
+def _batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most `size` rows."""
+    if size <= 0:
+        raise ValueError("batch_size must be greater than 0")
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Subgraph(NamedTuple):
+    """Vertices and edges of a graph neighbourhood, keyed by their AGE ids."""
+    vertices: Dict[int, Vertex]
+    edges: Dict[int, Edge]
+
+# k-hop results per (graph, generation, seed, hops). Invalidating a graph bumps its generation,
+# so stale entries become unreachable and age out of the LRU
+_k_hop_cache = LRUCache(maxsize=K_HOP_CACHE_SIZE)
+_graph_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+def k_hop_neighbours(conn: Connection, graph_name: str, seed_ids: Iterable[str], max_hops: int = 2, use_cache: bool = True) -> Subgraph:
+    """
+    Retrieves the neighbourhood reachable within `max_hops` outgoing hops of many seed entities.
+
+    Only outgoing edges are followed: a vertex that merely points to a seed is not part of its
+    neighbourhood. Every seed vertex found in the graph is included, also when it has no outgoing edge.
+    All seeds missing from the cache are resolved with a single query; the per-seed subgraphs are
+    cached per (graph, seed, hops) and merged, so vertices and edges shared between seeds appear once.
+
+    Args:
+        conn (Connection): The AGE connection to query with.
+        graph_name (str): The name of the graph to query.
+        seed_ids (Iterable[str]): The `id` properties of the seed `Entity` vertices.
+        max_hops (int): The maximum path length.
+        use_cache (bool): Read from and populate the k-hop cache.
+
+    Returns:
+        Subgraph: The seed vertices and the deduplicated vertices and edges of all paths starting at them.
+    """
+    seeds = list(dict.fromkeys(seed_ids))
+    generation = _graph_generation(graph_name)
+    subgraphs, missing = _k_hop_cache_lookup(graph_name, generation, seeds, max_hops, use_cache)
+
+    if missing:
+        with conn.cursor() as cur:
+            exec_cypher_with_params(cur, graph_name, _k_hop_stmt(max_hops), {"seeds": missing}, cols=K_HOP_COLUMNS)
+            fetched = _collect_k_hop_rows(cur.fetchall(), missing)
+        _k_hop_cache_store(graph_name, generation, fetched, max_hops, use_cache)
+        subgraphs.extend(fetched.values())
+
+    return _merge_subgraphs(subgraphs)
+
+
+def invalidate_k_hop_cache(graph_name: Optional[str] = None) -> None:
+    """Drop the cached k-hop results of a graph, or of every graph when no name is given."""
+    if graph_name is None:
+        _k_hop_cache.clear()
+        return
+    with _generations_lock:
+        _graph_generations[graph_name] = _graph_generations.get(graph_name, 0) + 1
+
+
+@deserialize_event(KnowledgeGraphUpdatedEvent)
+def handle_knowledge_graph_updated(event: KnowledgeGraphUpdatedEvent) -> None:
+    """
+    Stream callback invalidating the k-hop cache of the updated graph.
+
+    Register it under a consumer group of its own per replica, so every replica receives the event.
+    The group name must be stable across restarts, e.g. the StatefulSet pod name: every group holds
+    back stream trimming until it has consumed an entry, so a name made up at startup leaves an
+    abandoned group behind on each restart. Destroy the group when its replica is removed for good:
+        redis_client.register_callback(stream, f"k-hop-cache-{replica_name}", handle_knowledge_graph_updated)
+        XGROUP DESTROY <stream> k-hop-cache-<replica_name>
+    """
+    invalidate_k_hop_cache(event.kg_name)
+
+
+def get_k_hop_cache_stats() -> Dict[str, Any]:
+    """Return size and hit/miss counters of the k-hop cache."""
+    return _k_hop_cache.stats()
+
+
+def _graph_generation(graph_name: str) -> int:
+    with _generations_lock:
+        return _graph_generations.get(graph_name, 0)
+
+
+def _k_hop_stmt(max_hops: int) -> str:
+    if not isinstance(max_hops, int) or max_hops < 1:
+        raise ValueError(f"max_hops must be a positive integer, got {max_hops!r}")
+    # OPTIONAL MATCH keeps seeds without outgoing edges, with a null path
+    return (f"MATCH (a:{ENTITY_LABEL}) WHERE a.id IN $seeds "
+            f"OPTIONAL MATCH p=(a)-[*1..{max_hops}]->(b) RETURN a.id, a, p")
+
+
+def _k_hop_cache_lookup(graph_name: str, generation: int, seeds: List[str], max_hops: int, use_cache: bool) -> Tuple[List[Subgraph], List[str]]:
+    """Split seeds into cached subgraphs and seeds that must be queried."""
+    if not use_cache:
+        return [], seeds
+    subgraphs, missing = [], []
+    for seed in seeds:
+        subgraph = _k_hop_cache.get((graph_name, generation, seed, max_hops))
+        if subgraph is None:
+            missing.append(seed)
+        else:
+            subgraphs.append(subgraph)
+    return subgraphs, missing
+
+
+def _k_hop_cache_store(graph_name: str, generation: int, subgraphs: Dict[str, Subgraph], max_hops: int, use_cache: bool) -> None:
+    if not use_cache:
+        return
+    for seed, subgraph in subgraphs.items():
+        _k_hop_cache.put((graph_name, generation, seed, max_hops), subgraph)
+
+
+def _collect_k_hop_rows(rows: Iterable[Tuple[Any, Any, Any]], seeds: List[str]) -> Dict[str, Subgraph]:
+    """
+    Group (seed, seed vertex, path) rows into one subgraph per seed; the path is null for seeds
+    without outgoing edges. Seeds that are not in the graph get an empty subgraph.
+    """
+    subgraphs = {seed: Subgraph({}, {}) for seed in seeds}
+    for seed, seed_vertex, path in rows:
+        # rows are agtype text unless the connection decodes agtype
+        if not isinstance(seed_vertex, Vertex):
+            seed, seed_vertex, path = parse_agtype(seed), parse_agtype(seed_vertex), parse_agtype(path)
+        subgraph = subgraphs.setdefault(seed, Subgraph({}, {}))
+        subgraph.vertices[seed_vertex.id] = seed_vertex
+        if path is None:
+            continue
+        for vertex in path.vertices:
+            subgraph.vertices[vertex.id] = vertex
+        for edge in path.edges:
+            subgraph.edges[edge.id] = edge
+    return subgraphs
+
+
+def _merge_subgraphs(subgraphs: Iterable[Subgraph]) -> Subgraph:
+    merged = Subgraph({}, {})
+    for subgraph in subgraphs:
+        merged.vertices.update(subgraph.vertices)
+        merged.edges.update(subgraph.edges)
+    return merged
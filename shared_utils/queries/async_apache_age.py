@@ -1,14 +1,53 @@
 import logging
+import time
+from typing import Dict, Any, Optional, Iterable, Tuple, AsyncIterator, List
+from uuid import uuid4
 from psycopg import AsyncConnection, AsyncCursor
-from psycopg import sql
-from re import compile
+from psycopg.errors import SyntaxError as PgSyntaxError
+from .apache_age import _build_cypher, _to_agtype_map
+from .apache_age import BulkLoadReport, _prepare_bulk_rows, _vertex_load_stmt, _edge_load_stmt, _batched
+from .apache_age import Subgraph, invalidate_k_hop_cache, _graph_generation, K_HOP_COLUMNS, _k_hop_stmt, _k_hop_cache_lookup, _k_hop_cache_store, _collect_k_hop_rows, _merge_subgraphs
+
+# server-side prepared statements are cached per connection by psycopg, in an LRU of `prepared_max`
+# statements that DEALLOCATEs the ones it evicts. Cypher statements are executed with `prepare=True`,
+# so they enter that cache on first use; this is the least number of them it keeps
+PREPARED_MAX = 128
+
+def _ensure_prepared_max(conn:AsyncConnection) -> None:
+    """Let psycopg keep at least `PREPARED_MAX` prepared statements on the connection."""
+    if conn.prepared_max is not None and conn.prepared_max < PREPARED_MAX:
+        conn.prepared_max = PREPARED_MAX
+
+def get_statement_cache_stats(conn:AsyncConnection) -> Dict[str, Any]:
+    """
+    Return the bound of psycopg's prepared statement cache on a connection (`prepared_max`) and,
+    best-effort, how many statements it currently holds prepared on the server (`prepared`).
+
+    psycopg has no public accessor for its prepared statements, so `prepared` reads its internals
+    and is None when they are not found, e.g. after a psycopg upgrade.
+    """
+    prepared = getattr(getattr(conn, "_prepared", None), "_names", None)
+    return {
+        "prepared": len(prepared) if isinstance(prepared, dict) else None,
+        "prepared_max": conn.prepared_max,
+    }
 
-WHITESPACE = compile('\s')
 async def async_exec_cypher(conn:AsyncConnection, graph_name:str, cypher_stmt:str, cols:list=None, params:tuple=None) ->AsyncCursor:
+    """
+    Executes a cypher statement in a single round trip.
+
+    Statements without `params` are executed as server-side prepared statements, which psycopg
+    caches per connection by statement text, so repeated query shapes skip re-parsing and
+    re-planning. `params` are pasted into the statement text, so every value makes a different
+    statement: these are never prepared. Use `async_exec_cypher_with_params` for repeated lookups
+    with varying values.
+    """
     if conn == None or conn.closed:
         raise Exception("Connection is not open or is closed")
 
-    cursor:AsyncCursor = conn.cursor()
+    if graph_name is None:
+        raise Exception("Graph name cannot be None")
+
     #clean up the string for parameter injection
     cypher_stmt = cypher_stmt.replace("\n", "")
     cypher_stmt = cypher_stmt.replace("\t", "")
@@ -16,59 +55,88 @@ async def async_exec_cypher(conn:AsyncConnection, graph_name:str, cypher_stmt:st
     # Simple parameter injection for backend-only use
     # (not sql injection safe)
     if params:
-        cypher = cypher_stmt % params
+        stmt = _build_cypher(graph_name, (cypher_stmt % params).strip(), cols)
     else:
-        cypher = cypher_stmt
-    
-    cypher = cypher.strip()
+        stmt = _build_cypher(graph_name, cypher_stmt.strip(), cols)
+        _ensure_prepared_max(conn)
 
-    # prepate the statement (validates)
-    preparedStmt = "SELECT * FROM age_prepare_cypher({graphName},{cypherStmt})"
     cursor: AsyncCursor = conn.cursor()
     try:
-        await cursor.execute(sql.SQL(preparedStmt).format(graphName=sql.Literal(graph_name),cypherStmt=sql.Literal(cypher)))
-    except SyntaxError as cause:
+        await cursor.execute(stmt, prepare=not params)
+        return cursor
+    except PgSyntaxError as cause:
         await conn.rollback()
         raise cause
     except Exception as cause:
         await conn.rollback()
-        raise Exception("Execution ERR[" + str(cause) +"](" + preparedStmt +")") from cause
+        raise Exception("Execution ERR[" + str(cause) +"](" + stmt +")") from cause
+
+async def async_exec_cypher_with_params(conn:AsyncConnection, graph_name:str, cypher_stmt:str, params:Optional[Dict[str, Any]]=None, cols:list=None) ->AsyncCursor:
+    """
+    Executes a cypher statement with its parameters bound server side.
+
+    Parameters are referenced as `$name` in the statement and sent as an agtype map through
+    the third argument of cypher(), so one statement is prepared per query shape and reused
+    for every parameter value.
+    """
+    if conn == None or conn.closed:
+        raise Exception("Connection is not open or is closed")
+
+    if graph_name is None:
+        raise Exception("Graph name cannot be None")
+
+    cypher = cypher_stmt.replace("\n", " ").replace("\t", " ").strip()
+
+    stmt = _build_cypher(graph_name, cypher, cols, parameterized=True)
+    _ensure_prepared_max(conn)
 
-    # build and execute the cypher statement
-    stmt = build_cypher(graph_name, cypher, cols)
     cursor: AsyncCursor = conn.cursor()
     try:
-        await cursor.execute(stmt)
+        await cursor.execute(stmt, (_to_agtype_map(params),), prepare=True)
         return cursor
-    except SyntaxError as cause:
+    except PgSyntaxError as cause:
         await conn.rollback()
         raise cause
     except Exception as cause:
         await conn.rollback()
         raise Exception("Execution ERR[" + str(cause) +"](" + stmt +")") from cause
 
-# From apache age official repository
-def build_cypher(graphName:str, cypherStmt:str, columns:list) ->str:
-    if graphName == None:
+async def async_stream_cypher(conn:AsyncConnection, graph_name:str, cypher_stmt:str, params:Optional[Dict[str, Any]]=None, cols:list=None, batch_size:int=1000) -> AsyncIterator[Tuple[Any, ...]]:
+    """
+    Executes a cypher statement on a named, server-side cursor and asynchronously yields result rows.
+
+    Rows are fetched `batch_size` at a time, so large results are processed in constant memory.
+    `params` are bound server side as in `async_exec_cypher_with_params`. Wrap the iterator in
+    `contextlib.aclosing` when breaking out early, so the cursor is closed right away.
+
+    Example:
+        async for (vertex,) in async_stream_cypher(conn, graph_name, "MATCH (v) RETURN v"):
+            ...
+    """
+    if conn == None or conn.closed:
+        raise Exception("Connection is not open or is closed")
+
+    if graph_name is None:
         raise Exception("Graph name cannot be None")
-    
-    columnExp=[]
-    if columns != None and len(columns) > 0:
-        for col in columns:
-            if col.strip() == '':
-                continue
-            elif WHITESPACE.search(col) != None:
-                columnExp.append(col)
-            else:
-                columnExp.append(col + " agtype")
-    else:
-        columnExp.append('v agtype')
 
-    stmtArr = []
-    stmtArr.append("SELECT * from cypher(NULL,NULL) as (")
-    stmtArr.append(','.join(columnExp))
-    stmtArr.append(");")
-    return "".join(stmtArr)
+    cypher = cypher_stmt.replace("\n", " ").replace("\t", " ").strip()
+    stmt = _build_cypher(graph_name, cypher, cols, parameterized=params is not None)
+    args = (_to_agtype_map(params),) if params is not None else None
+
+    async with conn.cursor(name=f"cypher_stream_{uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        try:
+            await cursor.execute(stmt, args)
+        except PgSyntaxError as cause:
+            await conn.rollback()
+            raise cause
+        except Exception as cause:
+            await conn.rollback()
+            raise Exception("Execution ERR[" + str(cause) +"](" + stmt +")") from cause
+
+        while rows := await cursor.fetchmany(batch_size):
+            for row in rows:
+                yield row
 
 async def async_graph_exists(conn:AsyncConnection, graph_name: str) -> bool:
     """Check if the AGE graph with the given name exists."""
@@ -103,3 +171,54 @@ async def async_drop_graph(conn:AsyncConnection, graph_name: str):
     except Exception:
         logging.error(f"Error dropping graph: {graph_name}", exc_info=True)
         return False
+
+
+async def async_bulk_load_graph(conn:AsyncConnection, graph_name: str, entities: Iterable[str], relations: Iterable[Tuple[str, str, str]] = (), batch_size: int = 1000, deduplicate: bool = True) -> BulkLoadReport:
+    """
+    Asynchronously writes entities and (source, relation, target) tuples to a graph with set-based UNWIND statements.
+    See `apache_age.bulk_load_graph` for the graph shape and arguments. The caller commits.
+    """
+    start = time.perf_counter()
+    vertex_rows, edge_rows = _prepare_bulk_rows(entities, relations, deduplicate)
+    report = BulkLoadReport()
+
+    vertex_stmt = _vertex_load_stmt(deduplicate)
+    for batch in _batched(vertex_rows, batch_size):
+        cursor = await async_exec_cypher_with_params(conn, graph_name, vertex_stmt, {"rows": batch})
+        await cursor.close()
+        report.vertices += len(batch)
+        report.batches += 1
+
+    for label, rows in edge_rows.items():
+        edge_stmt = _edge_load_stmt(label, deduplicate)
+        for batch in _batched(rows, batch_size):
+            cursor = await async_exec_cypher_with_params(conn, graph_name, edge_stmt, {"rows": batch})
+            await cursor.close()
+            report.edges += len(batch)
+            report.batches += 1
+
+    report.elapsed_seconds = time.perf_counter() - start
+    invalidate_k_hop_cache(graph_name)
+    logging.info(f"Bulk loaded {report.vertices} vertices and {report.edges} edges into {graph_name} ({report.rows_per_second:.0f} rows/sec)")
+    return report
+
+
+async def async_k_hop_neighbours(conn:AsyncConnection, graph_name: str, seed_ids: Iterable[str], max_hops: int = 2, use_cache: bool = True) -> Subgraph:
+    """
+    Asynchronously retrieves the neighbourhood reachable within `max_hops` outgoing hops of many seed entities.
+    Shares its cache with `apache_age.k_hop_neighbours`; see there for details.
+    """
+    seeds: List[str] = list(dict.fromkeys(seed_ids))
+    generation = _graph_generation(graph_name)
+    subgraphs, missing = _k_hop_cache_lookup(graph_name, generation, seeds, max_hops, use_cache)
+
+    if missing:
+        cursor = await async_exec_cypher_with_params(conn, graph_name, _k_hop_stmt(max_hops), {"seeds": missing}, cols=K_HOP_COLUMNS)
+        try:
+            fetched = _collect_k_hop_rows(await cursor.fetchall(), missing)
+        finally:
+            await cursor.close()
+        _k_hop_cache_store(graph_name, generation, fetched, max_hops, use_cache)
+        subgraphs.extend(fetched.values())
+
+    return _merge_subgraphs(subgraphs)
@@ -1,8 +1,10 @@
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List
 from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared_utils.sql_models import ChunkGraph
+from shared_utils.queries.query_cache import cached_query, query_cache
+from .chunk_graphs import UPSERT_BATCH_SIZE, UpsertCounts, _collect_upserted, _previous_chunk_ids_stmt, _upsert_batches, _upsert_chunk_graphs_stmt, _upsert_counts
 
 async def async_insert_chunk_graph(session: AsyncSession, graph: ChunkGraph) -> None:
     """
@@ -15,8 +17,10 @@ async def async_insert_chunk_graph(session: AsyncSession, graph: ChunkGraph) ->
     Returns:
         None
     """
+    chunk_id = graph.chunk_id
     session.add(graph)
     await session.commit()
+    await query_cache.async_invalidate("chunk_graph_for_chunk", chunk_id)
 
 async def async_get_chunk_graph(session: AsyncSession, graph_id: UUID) -> Optional[ChunkGraph]:
     """
@@ -33,6 +37,7 @@ async def async_get_chunk_graph(session: AsyncSession, graph_id: UUID) -> Option
     result = await session.execute(statement)
     return result.scalar_one_or_none()
 
+@cached_query("chunk_graph_for_chunk", ChunkGraph)
 async def async_get_chunk_graph_for_chunk(session: AsyncSession, chunk_id: UUID) -> Optional[ChunkGraph]:
     """
     Asynchronously retrieves the graph associated with a specific chunk.
@@ -61,4 +66,28 @@ async def async_get_chunk_graphs_for_chunks(session: AsyncSession, chunk_ids: Li
     """
     statement = select(ChunkGraph).where(ChunkGraph.chunk_id.in_(chunk_ids))
     result = await session.execute(statement)
-    return result.scalars().all() or []
\ No newline at end of file
+    return result.scalars().all() or []
+
+async def async_upsert_chunk_graphs(session: AsyncSession, graphs: Iterable[ChunkGraph], batch_size: int = UPSERT_BATCH_SIZE) -> UpsertCounts:
+    """
+    Asynchronously inserts many graphs, replacing the ones whose ID already exists (e.g. when a chunk
+    is retried), with one INSERT ... ON CONFLICT DO UPDATE statement per batch and a single commit.
+    See `chunk_graphs.upsert_chunk_graphs`.
+
+    Args:
+        session (AsyncSession): The async session to use for the upsert operation.
+        graphs (Iterable[ChunkGraph]): The graph objects to write. The last graph with a given ID wins.
+        batch_size (int): Number of graphs written per statement.
+
+    Returns:
+        UpsertCounts: The number of distinct graph IDs inserted and updated, each counted once by its first write.
+    """
+    written: Dict[UUID, bool] = {}
+    chunk_ids = set()
+    for rows in _upsert_batches(graphs, batch_size):
+        previous = (await session.execute(_previous_chunk_ids_stmt(rows))).all()
+        result = await session.execute(_upsert_chunk_graphs_stmt(rows))
+        _collect_upserted(previous, result.all(), rows, written, chunk_ids)
+    await session.commit()
+    await query_cache.async_invalidate("chunk_graph_for_chunk", *chunk_ids)
+    return _upsert_counts(written)
@@ -1,8 +1,14 @@
-from typing import Optional, List
+from typing import AsyncIterable, AsyncIterator, Iterable, Mapping, Optional, List, Tuple, Union
 from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared_utils.sql_models.Chunk import Chunk
+from shared_utils.queries.query_cache import cached_query, query_cache
+from .chunks import (
+    CHUNK_COLUMNS, DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, ChunkCursor, ChunkPage, ChunkSummary,
+    _UPDATE_CHUNK_GRAPH_IDS, _chunk_page, _chunk_rows, _chunk_summaries_stmt, _chunks_from_doc_stmt,
+    _update_chunk_graph_id_stmt,
+)
 
 async def async_insert_chunk(session: AsyncSession, chunk: Chunk) -> None:
     """
@@ -15,8 +21,10 @@ async def async_insert_chunk(session: AsyncSession, chunk: Chunk) -> None:
     Returns:
         None
     """
+    chunk_id = chunk.chunk_id
     session.add(chunk)
     await session.commit()
+    await query_cache.async_invalidate("chunk", chunk_id)
 
 async def async_insert_chunks(session: AsyncSession, chunks: List[Chunk]) -> None:
     """
@@ -29,9 +37,36 @@ async def async_insert_chunks(session: AsyncSession, chunks: List[Chunk]) -> Non
     Returns:
         None
     """
+    chunk_ids = [chunk.chunk_id for chunk in chunks]
     session.add_all(chunks)
     await session.commit()
+    await query_cache.async_invalidate("chunk", *chunk_ids)
 
+async def async_bulk_insert_chunks(session: AsyncSession, chunks: Union[Iterable[Chunk], AsyncIterable[Chunk]]) -> int:
+    """
+    Asynchronously streams chunks into the database with asyncpg's binary COPY (`copy_records_to_table`),
+    bypassing the ORM unit of work. Accepts sync and async iterables, consumed as rows are sent.
+
+    Args:
+        session (AsyncSession): The async session whose transaction the rows are copied in. Committed on success.
+        chunks (Union[Iterable[Chunk], AsyncIterable[Chunk]]): The chunks to insert; no chunk may exist yet.
+
+    Returns:
+        int: The number of inserted chunks.
+    """
+    connection = await session.connection()
+    # asyncpg connection of the session's transaction
+    raw_connection = (await connection.get_raw_connection()).driver_connection
+    rows = _async_chunk_rows(chunks) if isinstance(chunks, AsyncIterable) else _chunk_rows(chunks)
+    status = await raw_connection.copy_records_to_table(Chunk.__tablename__, records=rows, columns=CHUNK_COLUMNS)
+    await session.commit()
+    return int(status.split()[-1])
+
+async def _async_chunk_rows(chunks: AsyncIterable[Chunk]) -> AsyncIterator[Tuple]:
+    async for chunk in chunks:
+        yield tuple(getattr(chunk, column) for column in CHUNK_COLUMNS)
+
+@cached_query("chunk", Chunk)
 async def async_get_chunk(session: AsyncSession, chunk_id: UUID) -> Optional[Chunk]:
     """
     Asynchronously retrieves a chunk by its ID.
@@ -62,6 +97,59 @@ async def async_get_all_chunks_from_doc(session: AsyncSession, document_id: UUID
     result = await session.execute(statement)
     return result.scalars().all()
 
+async def async_get_chunk_summaries_from_doc(session: AsyncSession, document_id: UUID) -> List[ChunkSummary]:
+    """
+    Asynchronously retrieves the ID, page number and graph ID of all chunks of a document, ordered by
+    page number. Unlike `async_get_all_chunks_from_doc` the chunk text is neither transferred nor loaded into models.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+
+    Returns:
+        List[ChunkSummary]: A summary of each chunk belonging to the specified document.
+    """
+    result = await session.execute(_chunk_summaries_stmt(document_id))
+    return [ChunkSummary(*row) for row in result]
+
+async def async_stream_chunks_from_doc(session: AsyncSession, document_id: UUID,
+                                       batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[List[Chunk]]:
+    """
+    Asynchronously streams the chunks of a document in batches, ordered by page number, through a
+    server-side cursor: only one batch is held in memory. The session cannot run other queries
+    until the iteration is finished.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+        batch_size (int): The number of chunks per batch.
+
+    Returns:
+        AsyncIterator[List[Chunk]]: Batches of at most `batch_size` chunks.
+    """
+    statement = _chunks_from_doc_stmt(document_id).execution_options(yield_per=batch_size)
+    result = await session.stream(statement)
+    async for batch in result.scalars().partitions():
+        yield list(batch)
+
+async def async_get_chunks_page(session: AsyncSession, document_id: UUID, after: Optional[ChunkCursor] = None,
+                                limit: int = DEFAULT_PAGE_SIZE) -> ChunkPage:
+    """
+    Asynchronously retrieves a page of the chunks of a document with keyset pagination: the page
+    starts right after the `after` cursor, so each page costs an index range scan however deep it is.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+        after (Optional[ChunkCursor]): The `next_cursor` of the previous page, None for the first page.
+        limit (int): The maximum number of chunks on the page.
+
+    Returns:
+        ChunkPage: The chunks of the page and the cursor of the next one.
+    """
+    result = await session.execute(_chunks_from_doc_stmt(document_id, after).limit(limit + 1))
+    return _chunk_page(list(result.scalars()), limit)
+
 async def async_update_chunk_graph_id(session: AsyncSession, chunk_id: UUID, graph_id: UUID) -> None:
     """
     Asynchronously updates the graph ID of a chunk.
@@ -74,11 +162,26 @@ async def async_update_chunk_graph_id(session: AsyncSession, chunk_id: UUID, gra
     Returns:
         None
     """
-    statement = select(Chunk).where(Chunk.chunk_id == chunk_id)
-    result = await session.execute(statement)
-    chunk = result.scalar_one_or_none()
-    
-    if chunk:
-        chunk.graph_id = graph_id
-        session.add(chunk)
-        await session.commit()
\ No newline at end of file
+    result = await session.execute(_update_chunk_graph_id_stmt(chunk_id, graph_id))
+    if result.first() is not None:
+        await session.commit()
+        await query_cache.async_invalidate("chunk", chunk_id)
+
+async def async_update_chunk_graph_ids(session: AsyncSession, graph_ids: Mapping[UUID, UUID]) -> int:
+    """
+    Asynchronously updates the graph IDs of many chunks in a single statement, joining the chunks
+    to the unnested (chunk_id, graph_id) arrays. Chunks loaded in the session are not refreshed.
+
+    Args:
+        session (AsyncSession): The async session to use for the update operation.
+        graph_ids (Mapping[UUID, UUID]): The new graph ID of each chunk, keyed by chunk ID.
+
+    Returns:
+        int: The number of updated chunks.
+    """
+    if not graph_ids:
+        return 0
+    result = await session.execute(_UPDATE_CHUNK_GRAPH_IDS, {"chunk_ids": list(graph_ids), "graph_ids": list(graph_ids.values())})
+    await session.commit()
+    await query_cache.async_invalidate("chunk", *graph_ids)
+    return result.rowcount
@@ -0,0 +1,66 @@
+from typing import Optional, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared_utils.sql_models import CytoscapeElements, LayoutName
+
+async def async_insert_cytoscape_elements(session: AsyncSession, elements: CytoscapeElements) -> None:
+    """
+    Asynchronously inserts a new cytoscape elements entry into the database.
+
+    Args:
+        session (AsyncSession): The async session to use for the insert operation.
+        elements (CytoscapeElements): The cytoscape elements object to insert.
+
+    Returns:
+        None
+    """
+    session.add(elements)
+    await session.commit()
+
+async def async_upsert_cytoscape_elements(session: AsyncSession, elements: CytoscapeElements) -> None:
+    """
+    Asynchronously inserts a cytoscape elements entry, or replaces the s3 key of the existing entry for the same graph and layout.
+
+    Args:
+        session (AsyncSession): The async session to use for the upsert operation.
+        elements (CytoscapeElements): The cytoscape elements object to insert or update.
+
+    Returns:
+        None
+    """
+    await session.merge(elements)
+    await session.commit()
+
+async def async_get_cytoscape_elements(session: AsyncSession, concept_graph_name: str, layout_name: LayoutName) -> Optional[CytoscapeElements]:
+    """
+    Asynchronously retrieves the cytoscape elements entry of a graph for a specific layout.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        concept_graph_name (str): The AGE name of the concept graph.
+        layout_name (LayoutName): The layout of the exported elements.
+
+    Returns:
+        Optional[CytoscapeElements]: The cytoscape elements entry if found, otherwise None.
+    """
+    statement = select(CytoscapeElements).where(
+        CytoscapeElements.concept_graph_name == concept_graph_name,
+        CytoscapeElements.layout_name == layout_name
+    )
+    result = await session.execute(statement)
+    return result.scalar_one_or_none()
+
+async def async_get_all_cytoscape_elements(session: AsyncSession, concept_graph_name: str) -> List[CytoscapeElements]:
+    """
+    Asynchronously retrieves the cytoscape elements entries of a graph for every exported layout.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        concept_graph_name (str): The AGE name of the concept graph.
+
+    Returns:
+        List[CytoscapeElements]: The cytoscape elements entries of the graph.
+    """
+    statement = select(CytoscapeElements).where(CytoscapeElements.concept_graph_name == concept_graph_name)
+    result = await session.execute(statement)
+    return result.scalars().all() or []
@@ -1,8 +1,13 @@
-from typing import Optional, List
+from typing import AsyncIterator, Iterable, Optional, List
 from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared_utils.sql_models import DocumentMetadata
+from shared_utils.queries.query_cache import cached_query, query_cache
+from .documents import (
+    DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, DocumentPage, _document_page, _documents_stmt,
+    _update_document_statuses_stmt, _update_document_stmt,
+)
 
 async def async_insert_document(session: AsyncSession, document_metadata: DocumentMetadata) -> None:
     """
@@ -15,9 +20,12 @@ async def async_insert_document(session: AsyncSession, document_metadata: Docume
     Returns:
         None
     """
+    document_id = document_metadata.document_id
     session.add(document_metadata)
     await session.commit()
+    await query_cache.async_invalidate("document", document_id)
 
+@cached_query("document", DocumentMetadata)
 async def async_get_document(session: AsyncSession, document_id: UUID) -> Optional[DocumentMetadata]:
     """
     Asynchronously retrieves a document by its ID.
@@ -47,6 +55,41 @@ async def async_get_all_documents(session: AsyncSession) -> List[DocumentMetadat
     result = await session.execute(statement)
     return result.scalars().all()
 
+async def async_stream_documents(session: AsyncSession, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[List[DocumentMetadata]]:
+    """
+    Asynchronously streams all document metadata entries in batches, ordered by ID, through a
+    server-side cursor: only one batch is held in memory. The session cannot run other queries
+    until the iteration is finished.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        batch_size (int): The number of documents per batch.
+
+    Returns:
+        AsyncIterator[List[DocumentMetadata]]: Batches of at most `batch_size` documents.
+    """
+    statement = _documents_stmt().execution_options(yield_per=batch_size)
+    result = await session.stream(statement)
+    async for batch in result.scalars().partitions():
+        yield list(batch)
+
+async def async_get_documents_page(session: AsyncSession, after: Optional[UUID] = None,
+                                   limit: int = DEFAULT_PAGE_SIZE) -> DocumentPage:
+    """
+    Asynchronously retrieves a page of document metadata entries with keyset pagination on the
+    document ID, e.g. for a `GetDocumentsResponse` with `next_cursor`.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        after (Optional[UUID]): The `next_cursor` of the previous page, None for the first page.
+        limit (int): The maximum number of documents on the page.
+
+    Returns:
+        DocumentPage: The documents of the page and the cursor of the next one.
+    """
+    result = await session.execute(_documents_stmt(after).limit(limit + 1))
+    return _document_page(list(result.scalars()), limit)
+
 async def async_update_document_status(session: AsyncSession, document_id: UUID, status: str) -> None:
     """
     Asynchronously updates the status of a document.
@@ -59,12 +102,28 @@ async def async_update_document_status(session: AsyncSession, document_id: UUID,
     Returns:
         None
     """
-    statement = select(DocumentMetadata).where(DocumentMetadata.document_id == document_id)
-    result = await session.execute(statement)
-    document = result.scalar_one_or_none()
-    
-    if document:
-        document.status = status
-        await session.commit()
-    else:
-        raise ValueError(f"Document with ID {document_id} not found.")
\ No newline at end of file
+    result = await session.execute(_update_document_stmt(document_id, status=status))
+    if result.first() is None:
+        raise ValueError(f"Document with ID {document_id} not found.")
+    await session.commit()
+    await query_cache.async_invalidate("document", document_id)
+
+async def async_update_document_statuses(session: AsyncSession, document_ids: Iterable[UUID], status: str) -> int:
+    """
+    Asynchronously updates the status of many documents in a single statement.
+
+    Args:
+        session (AsyncSession): The async session to use for the update operation.
+        document_ids (Iterable[UUID]): The IDs of the documents to update.
+        status (str): The new status to set for the documents.
+
+    Returns:
+        int: The number of updated documents.
+    """
+    document_ids = list(document_ids)
+    if not document_ids:
+        return 0
+    result = await session.execute(_update_document_statuses_stmt(document_ids, status))
+    await session.commit()
+    await query_cache.async_invalidate("document", *document_ids)
+    return result.rowcount
@@ -1,8 +1,9 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared_utils.sql_models import IngestionJob
+from .ingestion_jobs import _ingestion_job_status_stmt, _update_ingestion_job_statuses_stmt, _update_ingestion_job_stmt
 
 async def async_insert_ingestion_job(session: AsyncSession, ingestion_job: IngestionJob) -> None:
     """
@@ -33,6 +34,20 @@ async def async_get_ingestion_job(session: AsyncSession, job_id: UUID) -> Option
     result = await session.execute(statement)
     return result.scalar_one_or_none()
 
+async def async_get_ingestion_job_status(session: AsyncSession, job_id: UUID) -> Optional[str]:
+    """
+    Asynchronously retrieves only the status of an ingestion job, without loading its content.
+
+    Args:
+        session (AsyncSession): The async session to use for the query.
+        job_id (UUID): The ID of the ingestion job.
+
+    Returns:
+        Optional[str]: The status of the ingestion job if found, otherwise None.
+    """
+    result = await session.execute(_ingestion_job_status_stmt(job_id))
+    return result.scalar_one_or_none()
+
 async def async_update_ingestion_job_status(session: AsyncSession, job_id: UUID, status: str) -> None:
     """
     Asynchronously updates the status of an ingestion job.
@@ -45,15 +60,10 @@ async def async_update_ingestion_job_status(session: AsyncSession, job_id: UUID,
     Returns:
         None
     """
-    statement = select(IngestionJob).where(IngestionJob.job_id == job_id)
-    result = await session.execute(statement)
-    ingestion_job = result.scalar_one_or_none()
-    
-    if ingestion_job:
-        ingestion_job.status = status
-        await session.commit()
-    else:
+    result = await session.execute(_update_ingestion_job_stmt(job_id, status=status))
+    if result.first() is None:
         raise ValueError(f"Ingestion job with ID {job_id} not found.")
+    await session.commit()
     
 async def async_update_ingestion_job_content(session: AsyncSession, job_id: UUID, content: Dict[str, Any]) -> None:
     """
@@ -67,12 +77,26 @@ async def async_update_ingestion_job_content(session: AsyncSession, job_id: UUID
     Returns:
         None
     """
-    statement = select(IngestionJob).where(IngestionJob.job_id == job_id)
-    result = await session.execute(statement)
-    ingestion_job = result.scalar_one_or_none()
-    
-    if ingestion_job:
-        ingestion_job.content = content
-        await session.commit()
-    else:
-        raise ValueError(f"Ingestion job with ID {job_id} not found.")
\ No newline at end of file
+    result = await session.execute(_update_ingestion_job_stmt(job_id, content=content))
+    if result.first() is None:
+        raise ValueError(f"Ingestion job with ID {job_id} not found.")
+    await session.commit()
+
+async def async_update_ingestion_job_statuses(session: AsyncSession, job_ids: Iterable[UUID], status: str) -> int:
+    """
+    Asynchronously updates the status of many ingestion jobs in a single statement.
+
+    Args:
+        session (AsyncSession): The async session to use for the update operation.
+        job_ids (Iterable[UUID]): The IDs of the ingestion jobs to update.
+        status (str): The new status to set for the ingestion jobs.
+
+    Returns:
+        int: The number of updated ingestion jobs.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    result = await session.execute(_update_ingestion_job_statuses_stmt(job_ids, status))
+    await session.commit()
+    return result.rowcount
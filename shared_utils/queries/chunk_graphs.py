@@ -1,7 +1,18 @@
-from typing import Optional, List
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 from uuid import UUID
+from sqlalchemy import Select, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, select
 from shared_utils.sql_models import ChunkGraph
+from shared_utils.queries.query_cache import cached_query, query_cache
+
+UPSERT_BATCH_SIZE = 500  # rows per INSERT ... ON CONFLICT statement
+
+class UpsertCounts(NamedTuple):
+    """Rows written by an upsert: `inserted` new rows and `updated` existing ones."""
+    inserted: int = 0
+    updated: int = 0
 
 def insert_chunk_graph(session: Session, graph: ChunkGraph) -> None:
     """
@@ -14,8 +25,10 @@ def insert_chunk_graph(session: Session, graph: ChunkGraph) -> None:
     Returns:
         None
     """
+    chunk_id = graph.chunk_id
     session.add(graph)
     session.commit()
+    query_cache.invalidate("chunk_graph_for_chunk", chunk_id)
 
 def get_chunk_graph(session: Session, graph_id: UUID) -> Optional[ChunkGraph]:
     """
@@ -32,6 +45,7 @@ def get_chunk_graph(session: Session, graph_id: UUID) -> Optional[ChunkGraph]:
     result = session.exec(statement).first()
     return result if result else None
 
+@cached_query("chunk_graph_for_chunk", ChunkGraph)
 def get_chunk_graph_for_chunk(session: Session, chunk_id: UUID) -> Optional[ChunkGraph]:
     """
     Retrieves the graph associated with a specific chunk.
@@ -61,3 +75,72 @@ def get_chunk_graphs_for_chunks(session: Session, chunk_ids: List[UUID]) -> List
     statement = select(ChunkGraph).where(ChunkGraph.chunk_id.in_(chunk_ids))
     results = session.exec(statement).all()
     return results if results else []
+
+def upsert_chunk_graphs(session: Session, graphs: Iterable[ChunkGraph], batch_size: int = UPSERT_BATCH_SIZE) -> UpsertCounts:
+    """
+    Inserts many graphs, replacing the ones whose ID already exists (e.g. when a chunk is retried),
+    with one INSERT ... ON CONFLICT DO UPDATE statement per batch and a single commit. Each batch first
+    reads and locks the chunk of its existing graphs, so a graph moved to another chunk also
+    invalidates the cached graph of the chunk it left.
+
+    Args:
+        session (Session): The session to use for the upsert operation.
+        graphs (Iterable[ChunkGraph]): The graph objects to write. The last graph with a given ID wins.
+        batch_size (int): Number of graphs written per statement.
+
+    Returns:
+        UpsertCounts: The number of distinct graph IDs inserted and updated, each counted once by its first write.
+    """
+    written: Dict[UUID, bool] = {}
+    chunk_ids = set()
+    for rows in _upsert_batches(graphs, batch_size):
+        previous = session.exec(_previous_chunk_ids_stmt(rows)).all()
+        _collect_upserted(previous, session.exec(_upsert_chunk_graphs_stmt(rows)).all(), rows, written, chunk_ids)
+    session.commit()
+    query_cache.invalidate("chunk_graph_for_chunk", *chunk_ids)
+    return _upsert_counts(written)
+
+def _upsert_batches(graphs: Iterable[ChunkGraph], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the column values of at most `batch_size` graphs, deduplicated by ID:
+    a statement cannot update the same row twice."""
+    if batch_size <= 0:
+        raise ValueError("batch_size must be greater than 0")
+    graphs = iter(graphs)
+    while batch := list(islice(graphs, batch_size)):
+        rows = {graph.graph_id: {column.name: getattr(graph, column.name) for column in ChunkGraph.__table__.columns} for graph in batch}
+        yield list(rows.values())
+
+def _previous_chunk_ids_stmt(rows: List[Dict[str, Any]]) -> Select:
+    # RETURNING only sees the new rows, so the chunk each existing graph belonged to is read by a
+    # statement of its own before the upsert. Its row locks keep the graphs from moving again before
+    # the upsert in the same transaction
+    return (
+        select(ChunkGraph.graph_id, ChunkGraph.chunk_id)
+        .where(ChunkGraph.graph_id.in_([row["graph_id"] for row in rows]))
+        .with_for_update()
+    )
+
+def _upsert_chunk_graphs_stmt(rows: List[Dict[str, Any]]):
+    stmt = insert(ChunkGraph).values(rows)
+    columns = [column.name for column in ChunkGraph.__table__.columns if not column.primary_key]
+    return stmt.on_conflict_do_update(
+        index_elements=[ChunkGraph.graph_id],
+        set_={column: stmt.excluded[column] for column in columns},
+    ).returning(
+        ChunkGraph.graph_id,
+        # xmax is 0 for rows this statement inserted, the locking transaction's ID for rows it updated
+        literal_column("xmax = 0").label("inserted"),
+    )
+
+def _collect_upserted(previous: Iterable[Tuple[UUID, UUID]], result_rows: Iterable[Any], rows: List[Dict[str, Any]],
+                      written: Dict[UUID, bool], chunk_ids: Set[UUID]) -> None:
+    """Record whether each graph ID was first inserted or updated, and every chunk whose cached graph changed:
+    the new chunk of each graph and the chunk each existing graph belonged to before the upsert."""
+    for graph_id, inserted in result_rows:
+        written.setdefault(graph_id, inserted)
+    chunk_ids.update(chunk_id for _, chunk_id in previous)
+    chunk_ids.update(row["chunk_id"] for row in rows)
+
+def _upsert_counts(written: Dict[UUID, bool]) -> UpsertCounts:
+    inserted = sum(written.values())
+    return UpsertCounts(inserted, len(written) - inserted)
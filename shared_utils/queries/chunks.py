@@ -1,7 +1,36 @@
-from typing import Optional
+from typing import Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 from uuid import UUID
-from sqlmodel import Session, select
+from sqlalchemy import Select, Update, text, tuple_
+from sqlmodel import Session, select, update
 from shared_utils.sql_models.Chunk import Chunk
+from shared_utils.queries.query_cache import cached_query, query_cache
+
+CHUNK_COLUMNS = tuple(column.name for column in Chunk.__table__.columns)
+STREAM_BATCH_SIZE = 1000  # rows fetched per round trip by the streaming readers
+DEFAULT_PAGE_SIZE = 100
+
+class ChunkCursor(NamedTuple):
+    """Position of a chunk in the (page_number, chunk_id) order of its document."""
+    page_number: int
+    chunk_id: UUID
+
+class ChunkSummary(NamedTuple):
+    """The columns of a chunk that listings need, without its text."""
+    chunk_id: UUID
+    page_number: int
+    graph_id: Optional[UUID]
+
+class ChunkPage(NamedTuple):
+    """One page of chunks, and the cursor of the next page (None on the last one)."""
+    chunks: List[Chunk]
+    next_cursor: Optional[ChunkCursor]
+
+# One statement for any number of chunks: the pairs are sent as two arrays instead of one parameter per value
+_UPDATE_CHUNK_GRAPH_IDS = text(f"""
+    UPDATE {Chunk.__tablename__} AS c SET graph_id = v.graph_id
+    FROM unnest(CAST(:chunk_ids AS UUID[]), CAST(:graph_ids AS UUID[])) AS v(chunk_id, graph_id)
+    WHERE c.chunk_id = v.chunk_id
+""")
 
 def insert_chunk(session:Session, chunk: Chunk) -> None:
     """
@@ -14,8 +43,10 @@ def insert_chunk(session:Session, chunk: Chunk) -> None:
     Returns:
         None
     """
+    chunk_id = chunk.chunk_id
     session.add(chunk)
     session.commit()
+    query_cache.invalidate("chunk", chunk_id)
 
 def insert_chunks(session: Session, chunks: list[Chunk]) -> None:
     """
@@ -28,9 +59,39 @@ def insert_chunks(session: Session, chunks: list[Chunk]) -> None:
     Returns:
         None
     """
+    chunk_ids = [chunk.chunk_id for chunk in chunks]
     session.add_all(chunks)
     session.commit()
+    query_cache.invalidate("chunk", *chunk_ids)
+
+def bulk_insert_chunks(session: Session, chunks: Iterable[Chunk]) -> int:
+    """
+    Streams chunks into the database with COPY, bypassing the ORM unit of work.
+    Chunks are consumed one at a time, so a generator keeps memory flat for any number of rows.
+
+    Args:
+        session (Session): The session whose transaction the rows are copied in. Committed on success.
+        chunks (Iterable[Chunk]): The chunks to insert; no chunk may exist yet.
+
+    Returns:
+        int: The number of inserted chunks.
+    """
+    count = 0
+    # psycopg connection of the session's transaction
+    connection = session.connection().connection.driver_connection
+    with connection.cursor() as cur:
+        with cur.copy(f"COPY {Chunk.__tablename__} ({', '.join(CHUNK_COLUMNS)}) FROM STDIN") as copy:
+            for row in _chunk_rows(chunks):
+                copy.write_row(row)
+                count += 1
+    session.commit()
+    return count
+
+def _chunk_rows(chunks: Iterable[Chunk]) -> Iterator[Tuple]:
+    for chunk in chunks:
+        yield tuple(getattr(chunk, column) for column in CHUNK_COLUMNS)
 
+@cached_query("chunk", Chunk)
 def get_chunk(session: Session, chunk_id: UUID) -> Optional[Chunk]:
     """
     Retrieves a chunk by its ID.
@@ -61,6 +122,80 @@ def get_all_chunks_from_doc(session: Session, document_id: UUID) -> list[Chunk]:
     result = session.exec(statement).all()
     return result
 
+def get_chunk_summaries_from_doc(session: Session, document_id: UUID) -> List[ChunkSummary]:
+    """
+    Retrieves the ID, page number and graph ID of all chunks of a document, ordered by page number.
+    Unlike `get_all_chunks_from_doc` the chunk text is neither transferred nor loaded into models.
+
+    Args:
+        session (Session): The session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+
+    Returns:
+        List[ChunkSummary]: A summary of each chunk belonging to the specified document.
+    """
+    return [ChunkSummary(*row) for row in session.exec(_chunk_summaries_stmt(document_id))]
+
+def stream_chunks_from_doc(session: Session, document_id: UUID, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[List[Chunk]]:
+    """
+    Streams the chunks of a document in batches, ordered by page number, through a server-side
+    cursor: only one batch is held in memory. The session cannot run other queries until the
+    iteration is finished.
+
+    Args:
+        session (Session): The session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+        batch_size (int): The number of chunks per batch.
+
+    Returns:
+        Iterator[List[Chunk]]: Batches of at most `batch_size` chunks.
+    """
+    statement = _chunks_from_doc_stmt(document_id).execution_options(yield_per=batch_size)
+    for batch in session.exec(statement).partitions():
+        yield list(batch)
+
+def get_chunks_page(session: Session, document_id: UUID, after: Optional[ChunkCursor] = None,
+                    limit: int = DEFAULT_PAGE_SIZE) -> ChunkPage:
+    """
+    Retrieves a page of the chunks of a document with keyset pagination: the page starts right
+    after the `after` cursor, so each page costs an index range scan however deep it is.
+
+    Args:
+        session (Session): The session to use for the query.
+        document_id (UUID): The ID of the document to get chunks for.
+        after (Optional[ChunkCursor]): The `next_cursor` of the previous page, None for the first page.
+        limit (int): The maximum number of chunks on the page.
+
+    Returns:
+        ChunkPage: The chunks of the page and the cursor of the next one.
+    """
+    chunks = list(session.exec(_chunks_from_doc_stmt(document_id, after).limit(limit + 1)))
+    return _chunk_page(chunks, limit)
+
+def _chunks_from_doc_stmt(document_id: UUID, after: Optional[ChunkCursor] = None) -> Select:
+    statement = select(Chunk).where(Chunk.document_id == document_id)
+    if after is not None:
+        statement = statement.where(tuple_(Chunk.page_number, Chunk.chunk_id) > tuple_(after.page_number, after.chunk_id))
+    return statement.order_by(Chunk.page_number, Chunk.chunk_id)
+
+def _chunk_summaries_stmt(document_id: UUID) -> Select:
+    return (
+        select(Chunk.chunk_id, Chunk.page_number, Chunk.graph_id)
+        .where(Chunk.document_id == document_id)
+        .order_by(Chunk.page_number, Chunk.chunk_id)
+    )
+
+def _chunk_page(chunks: List[Chunk], limit: int) -> ChunkPage:
+    """Build a page from up to `limit + 1` chunks: the extra one only tells that a next page exists."""
+    if len(chunks) <= limit:
+        return ChunkPage(chunks, None)
+    last = chunks[limit - 1]
+    return ChunkPage(chunks[:limit], ChunkCursor(last.page_number, last.chunk_id))
+
+def _update_chunk_graph_id_stmt(chunk_id: UUID, graph_id: UUID) -> Update:
+    """The single UPDATE setting the graph ID of one chunk, returning its ID so a missing chunk shows as no row."""
+    return update(Chunk).where(Chunk.chunk_id == chunk_id).values(graph_id=graph_id).returning(Chunk.chunk_id)
+
 def update_chunk_graph_id(session: Session, chunk_id: UUID, graph_id: UUID) -> None:
     """
     Updates the graph ID of a chunk.
@@ -73,9 +208,25 @@ def update_chunk_graph_id(session: Session, chunk_id: UUID, graph_id: UUID) -> N
     Returns:
         None
     """
-    statement = select(Chunk).where(Chunk.chunk_id == chunk_id)
-    chunk = session.exec(statement).first()
-    if chunk:
-        chunk.graph_id = graph_id
-        session.add(chunk)
-        session.commit()
\ No newline at end of file
+    if session.exec(_update_chunk_graph_id_stmt(chunk_id, graph_id)).first() is not None:
+        session.commit()
+        query_cache.invalidate("chunk", chunk_id)
+
+def update_chunk_graph_ids(session: Session, graph_ids: Mapping[UUID, UUID]) -> int:
+    """
+    Updates the graph IDs of many chunks in a single statement, joining the chunks to the
+    unnested (chunk_id, graph_id) arrays. Chunks loaded in the session are not refreshed.
+
+    Args:
+        session (Session): The session to use for the update operation.
+        graph_ids (Mapping[UUID, UUID]): The new graph ID of each chunk, keyed by chunk ID.
+
+    Returns:
+        int: The number of updated chunks.
+    """
+    if not graph_ids:
+        return 0
+    result = session.exec(_UPDATE_CHUNK_GRAPH_IDS, params={"chunk_ids": list(graph_ids), "graph_ids": list(graph_ids.values())})
+    session.commit()
+    query_cache.invalidate("chunk", *graph_ids)
+    return result.rowcount
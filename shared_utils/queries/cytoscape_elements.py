@@ -0,0 +1,65 @@
+from typing import Optional, List
+from sqlmodel import Session, select
+from shared_utils.sql_models import CytoscapeElements, LayoutName
+
+def insert_cytoscape_elements(session: Session, elements: CytoscapeElements) -> None:
+    """
+    Inserts a new cytoscape elements entry into the database.
+
+    Args:
+        session (Session): The session to use for the insert operation.
+        elements (CytoscapeElements): The cytoscape elements object to insert.
+
+    Returns:
+        None
+    """
+    session.add(elements)
+    session.commit()
+
+def upsert_cytoscape_elements(session: Session, elements: CytoscapeElements) -> None:
+    """
+    Inserts a cytoscape elements entry, or replaces the s3 key of the existing entry for the same graph and layout.
+
+    Args:
+        session (Session): The session to use for the upsert operation.
+        elements (CytoscapeElements): The cytoscape elements object to insert or update.
+
+    Returns:
+        None
+    """
+    session.merge(elements)
+    session.commit()
+
+def get_cytoscape_elements(session: Session, concept_graph_name: str, layout_name: LayoutName) -> Optional[CytoscapeElements]:
+    """
+    Retrieves the cytoscape elements entry of a graph for a specific layout.
+
+    Args:
+        session (Session): The session to use for the query.
+        concept_graph_name (str): The AGE name of the concept graph.
+        layout_name (LayoutName): The layout of the exported elements.
+
+    Returns:
+        Optional[CytoscapeElements]: The cytoscape elements entry if found, otherwise None.
+    """
+    statement = select(CytoscapeElements).where(
+        CytoscapeElements.concept_graph_name == concept_graph_name,
+        CytoscapeElements.layout_name == layout_name
+    )
+    result = session.exec(statement).first()
+    return result if result else None
+
+def get_all_cytoscape_elements(session: Session, concept_graph_name: str) -> List[CytoscapeElements]:
+    """
+    Retrieves the cytoscape elements entries of a graph for every exported layout.
+
+    Args:
+        session (Session): The session to use for the query.
+        concept_graph_name (str): The AGE name of the concept graph.
+
+    Returns:
+        List[CytoscapeElements]: The cytoscape elements entries of the graph.
+    """
+    statement = select(CytoscapeElements).where(CytoscapeElements.concept_graph_name == concept_graph_name)
+    results = session.exec(statement).all()
+    return results if results else []
@@ -1,7 +1,17 @@
-from typing import Optional, List
+from typing import Iterable, Iterator, NamedTuple, Optional, List
 from uuid import UUID
-from sqlmodel import Session, select
+from sqlalchemy import Select, Update
+from sqlmodel import Session, select, update
 from shared_utils.sql_models import DocumentMetadata
+from shared_utils.queries.query_cache import cached_query, query_cache
+
+STREAM_BATCH_SIZE = 1000  # rows fetched per round trip by the streaming readers
+DEFAULT_PAGE_SIZE = 100
+
+class DocumentPage(NamedTuple):
+    """One page of documents, and the cursor of the next page (None on the last one)."""
+    documents: List[DocumentMetadata]
+    next_cursor: Optional[UUID]
 
 def insert_document(session: Session, document_metadata: DocumentMetadata) -> None:
     """
@@ -14,9 +24,12 @@ def insert_document(session: Session, document_metadata: DocumentMetadata) -> No
     Returns:
         None
     """
+    document_id = document_metadata.document_id
     session.add(document_metadata)
     session.commit()
+    query_cache.invalidate("document", document_id)
 
+@cached_query("document", DocumentMetadata)
 def get_document(session: Session, document_id: UUID) -> Optional[DocumentMetadata]:
     """
     Retrieves a document by its ID.
@@ -46,6 +59,63 @@ def get_all_documents(session: Session) -> List[DocumentMetadata]:
     result = session.exec(statement).all()
     return result
 
+def stream_documents(session: Session, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[List[DocumentMetadata]]:
+    """
+    Streams all document metadata entries in batches, ordered by ID, through a server-side cursor:
+    only one batch is held in memory. The session cannot run other queries until the iteration is finished.
+
+    Args:
+        session (Session): The session to use for the query.
+        batch_size (int): The number of documents per batch.
+
+    Returns:
+        Iterator[List[DocumentMetadata]]: Batches of at most `batch_size` documents.
+    """
+    statement = _documents_stmt().execution_options(yield_per=batch_size)
+    for batch in session.exec(statement).partitions():
+        yield list(batch)
+
+def get_documents_page(session: Session, after: Optional[UUID] = None, limit: int = DEFAULT_PAGE_SIZE) -> DocumentPage:
+    """
+    Retrieves a page of document metadata entries with keyset pagination on the document ID,
+    e.g. for a `GetDocumentsResponse` with `next_cursor`.
+
+    Args:
+        session (Session): The session to use for the query.
+        after (Optional[UUID]): The `next_cursor` of the previous page, None for the first page.
+        limit (int): The maximum number of documents on the page.
+
+    Returns:
+        DocumentPage: The documents of the page and the cursor of the next one.
+    """
+    documents = list(session.exec(_documents_stmt(after).limit(limit + 1)))
+    return _document_page(documents, limit)
+
+def _documents_stmt(after: Optional[UUID] = None) -> Select:
+    statement = select(DocumentMetadata)
+    if after is not None:
+        statement = statement.where(DocumentMetadata.document_id > after)
+    return statement.order_by(DocumentMetadata.document_id)
+
+def _document_page(documents: List[DocumentMetadata], limit: int) -> DocumentPage:
+    """Build a page from up to `limit + 1` documents: the extra one only tells that a next page exists."""
+    if len(documents) <= limit:
+        return DocumentPage(documents, None)
+    return DocumentPage(documents[:limit], documents[limit - 1].document_id)
+
+def _update_document_stmt(document_id: UUID, **values) -> Update:
+    """The single UPDATE setting `values` on one document, returning its ID so a missing document shows as no row."""
+    return (
+        update(DocumentMetadata)
+        .where(DocumentMetadata.document_id == document_id)
+        .values(**values)
+        .returning(DocumentMetadata.document_id)
+    )
+
+def _update_document_statuses_stmt(document_ids: List[UUID], status: str) -> Update:
+    """The single UPDATE setting `status` on all the given documents."""
+    return update(DocumentMetadata).where(DocumentMetadata.document_id.in_(document_ids)).values(status=status)
+
 def update_document_status(session: Session, document_id: UUID, status: str) -> None:
     """
     Updates the status of a document.
@@ -58,11 +128,27 @@ def update_document_status(session: Session, document_id: UUID, status: str) ->
     Returns:
         None
     """
-    statement = select(DocumentMetadata).where(DocumentMetadata.document_id == document_id)
-    document = session.exec(statement).first()
-    
-    if document:
-        document.status = status
-        session.commit()
-    else:
-        raise ValueError(f"Document with ID {document_id} not found.")
\ No newline at end of file
+    if session.exec(_update_document_stmt(document_id, status=status)).first() is None:
+        raise ValueError(f"Document with ID {document_id} not found.")
+    session.commit()
+    query_cache.invalidate("document", document_id)
+
+def update_document_statuses(session: Session, document_ids: Iterable[UUID], status: str) -> int:
+    """
+    Updates the status of many documents in a single statement.
+
+    Args:
+        session (Session): The session to use for the update operation.
+        document_ids (Iterable[UUID]): The IDs of the documents to update.
+        status (str): The new status to set for the documents.
+
+    Returns:
+        int: The number of updated documents.
+    """
+    document_ids = list(document_ids)
+    if not document_ids:
+        return 0
+    updated = session.exec(_update_document_statuses_stmt(document_ids, status)).rowcount
+    session.commit()
+    query_cache.invalidate("document", *document_ids)
+    return updated
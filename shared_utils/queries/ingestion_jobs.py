@@ -1,5 +1,7 @@
+from typing import Iterable, List, Optional
 from uuid import UUID
-from sqlmodel import Session, select
+from sqlalchemy import Select, Update
+from sqlmodel import Session, select, update
 from shared_utils.sql_models import IngestionJob
 
 def insert_ingestion_job(session: Session, ingestion_job: IngestionJob) -> None:
@@ -31,6 +33,35 @@ def get_ingestion_job(session: Session, job_id: UUID) -> IngestionJob:
     result = session.exec(statement).first()
     return result if result else None
 
+def _ingestion_job_status_stmt(job_id: UUID) -> Select:
+    return select(IngestionJob.status).where(IngestionJob.job_id == job_id)
+
+def get_ingestion_job_status(session: Session, job_id: UUID) -> Optional[str]:
+    """
+    Retrieves only the status of an ingestion job, without loading its content.
+
+    Args:
+        session (Session): The session to use for the query.
+        job_id (UUID): The ID of the ingestion job.
+
+    Returns:
+        Optional[str]: The status of the ingestion job if found, otherwise None.
+    """
+    return session.exec(_ingestion_job_status_stmt(job_id)).first()
+
+def _update_ingestion_job_stmt(job_id: UUID, **values) -> Update:
+    """The single UPDATE setting `values` on one ingestion job, returning its ID so a missing job shows as no row."""
+    return (
+        update(IngestionJob)
+        .where(IngestionJob.job_id == job_id)
+        .values(**values)
+        .returning(IngestionJob.job_id)
+    )
+
+def _update_ingestion_job_statuses_stmt(job_ids: List[UUID], status: str) -> Update:
+    """The single UPDATE setting `status` on all the given ingestion jobs."""
+    return update(IngestionJob).where(IngestionJob.job_id.in_(job_ids)).values(status=status)
+
 def update_ingestion_job_status(session: Session, job_id: UUID, status: str) -> None:
     """
     Updates the status of an ingestion job.
@@ -43,14 +74,9 @@ def update_ingestion_job_status(session: Session, job_id: UUID, status: str) ->
     Returns:
         None
     """
-    statement = select(IngestionJob).where(IngestionJob.job_id == job_id)
-    ingestion_job = session.exec(statement).first()
-    
-    if ingestion_job:
-        ingestion_job.status = status
-        session.commit()
-    else:
+    if session.exec(_update_ingestion_job_stmt(job_id, status=status)).first() is None:
         raise ValueError(f"Ingestion job with ID {job_id} not found.")
+    session.commit()
     
 def update_ingestion_job_content(session: Session, job_id: UUID, content: dict) -> None:
     """
@@ -64,11 +90,25 @@ def update_ingestion_job_content(session: Session, job_id: UUID, content: dict)
     Returns:
         None
     """
-    statement = select(IngestionJob).where(IngestionJob.job_id == job_id)
-    ingestion_job = session.exec(statement).first()
-    
-    if ingestion_job:
-        ingestion_job.content = content
-        session.commit()
-    else:
-        raise ValueError(f"Ingestion job with ID {job_id} not found.")
\ No newline at end of file
+    if session.exec(_update_ingestion_job_stmt(job_id, content=content)).first() is None:
+        raise ValueError(f"Ingestion job with ID {job_id} not found.")
+    session.commit()
+
+def update_ingestion_job_statuses(session: Session, job_ids: Iterable[UUID], status: str) -> int:
+    """
+    Updates the status of many ingestion jobs in a single statement.
+
+    Args:
+        session (Session): The session to use for the update operation.
+        job_ids (Iterable[UUID]): The IDs of the ingestion jobs to update.
+        status (str): The new status to set for the ingestion jobs.
+
+    Returns:
+        int: The number of updated ingestion jobs.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    updated = session.exec(_update_ingestion_job_statuses_stmt(job_ids, status)).rowcount
+    session.commit()
+    return updated
@@ -0,0 +1,270 @@
+import inspect
+import logging
+import threading
+from functools import wraps
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple, Type
+from pydantic import BaseModel
+from shared_utils.cache_utils import TTLCache
+
+KEY_PREFIX = "query-cache"
+VERSION_KEY_PREFIX = "query-cache-version"  # bumped on every invalidation of a row, by any process
+DEFAULT_QUERY_CACHE_TTL = 300  # seconds a row stays in Redis
+DEFAULT_LOCAL_TTL = 5.0  # seconds a row stays in the process; bounds staleness after writes made by other processes
+DEFAULT_LOCAL_MAXSIZE = 1024
+
+class CacheRead(NamedTuple):
+    """
+    State of the cache when a lookup missed, to be passed to `put` with the row then read from the
+    database: the row is only cached if no invalidation happened meanwhile, in this process
+    (`generation`) or in any process (the Redis `version` of the row).
+    """
+    generation: int
+    version: Optional[str] = None
+    versioned: bool = False  # the Redis version could be read: the row may be written to Redis
+
+class QueryCache:
+    """
+    Opt-in read-through cache for rows looked up by id, in two tiers: a small in-process LRU with a
+    short TTL, backed by Redis (`get_json`/`set_json` of the sync and async clients) with a longer one.
+
+    Rows are cached as JSON and every hit returns a new, detached model instance. Writes through the
+    query functions invalidate both tiers of this process and Redis; other processes drop their local
+    copy after `local_ttl` seconds at most. Invalidations also bump a version of the row in Redis, and
+    a row is only written to Redis while its version is the one seen before the database read, so a
+    process never publishes a row another process updated in the meantime. Disabled until `configure` is called.
+
+    Every process writing the cached rows must configure the Redis clients, otherwise its writes
+    leave stale rows in Redis for up to `ttl` seconds. A process that writes them without reading
+    through the cache calls `configure` and then `disable`: invalidations still bump the Redis versions.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.ttl = DEFAULT_QUERY_CACHE_TTL
+        self._redis: Any = None
+        self._async_redis: Any = None
+        self._local = TTLCache(maxsize=DEFAULT_LOCAL_MAXSIZE, ttl=DEFAULT_LOCAL_TTL)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self._redis_hits = 0
+        self._redis_misses = 0
+        self._redis_errors = 0
+        self._redis_rejected = 0  # writes refused because another process invalidated the row meanwhile
+
+    def configure(self, redis_client: Any = None, async_redis_client: Any = None, ttl: int = DEFAULT_QUERY_CACHE_TTL,
+                  local_ttl: float = DEFAULT_LOCAL_TTL, local_maxsize: int = DEFAULT_LOCAL_MAXSIZE) -> None:
+        """
+        Enable the cache. Without Redis clients only the in-process tier is used.
+
+        Args:
+            redis_client (RedisClient): The client used by the sync query functions (`get_versioned_json`,
+                `set_versioned_json` and `bump_versions`).
+            async_redis_client (AsyncRedisClient): The client used by the async query functions.
+            ttl (int): Seconds a row stays in Redis.
+            local_ttl (float): Seconds a row stays in the in-process LRU.
+            local_maxsize (int): Maximum number of rows in the in-process LRU.
+        """
+        self._redis = redis_client
+        self._async_redis = async_redis_client
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop caching and drop the in-process tier. The Redis clients stay configured, so writes keep
+        invalidating the rows other processes cached.
+        """
+        self.enabled = False
+        self._local.clear()
+
+    def generation(self) -> int:
+        """Number of invalidations so far: a row read from the database is only cached if none happened meanwhile."""
+        with self._lock:
+            return self._invalidations
+
+    def get(self, namespace: str, key: Hashable, model: Type[BaseModel]) -> Tuple[Optional[BaseModel], CacheRead]:
+        """Look a row up in both tiers. Returns the row (None on a miss) and the `CacheRead` to pass to `put`."""
+        read = CacheRead(self.generation())
+        data = self._local.get((namespace, str(key)))
+        if data is None and self._redis is not None:
+            try:
+                data, version = self._redis.get_versioned_json(*_redis_keys(namespace, key))
+                read = CacheRead(read.generation, version, versioned=True)
+            except Exception as e:
+                self._record_redis_error(e)
+            self._record_redis_lookup(data)
+            if data is not None:
+                self._local.put((namespace, str(key)), data)
+        return (model.model_validate(data) if data is not None else None), read
+
+    async def async_get(self, namespace: str, key: Hashable, model: Type[BaseModel]) -> Tuple[Optional[BaseModel], CacheRead]:
+        read = CacheRead(self.generation())
+        data = self._local.get((namespace, str(key)))
+        if data is None and self._async_redis is not None:
+            try:
+                data, version = await self._async_redis.get_versioned_json(*_redis_keys(namespace, key))
+                read = CacheRead(read.generation, version, versioned=True)
+            except Exception as e:
+                self._record_redis_error(e)
+            self._record_redis_lookup(data)
+            if data is not None:
+                self._local.put((namespace, str(key)), data)
+        return (model.model_validate(data) if data is not None else None), read
+
+    def put(self, namespace: str, key: Hashable, row: BaseModel, read: CacheRead) -> None:
+        """Cache a row read from the database after the lookup that returned `read` missed."""
+        data = self._store_locally(namespace, key, row, read.generation)
+        if data is not None and read.versioned and self._redis is not None:
+            data_key, version_key = _redis_keys(namespace, key)
+            try:
+                stored = self._redis.set_versioned_json(data_key, data, version_key, read.version, ex=self.ttl)
+            except Exception as e:
+                self._record_redis_error(e)
+            else:
+                self._record_redis_write(stored)
+
+    async def async_put(self, namespace: str, key: Hashable, row: BaseModel, read: CacheRead) -> None:
+        data = self._store_locally(namespace, key, row, read.generation)
+        if data is not None and read.versioned and self._async_redis is not None:
+            data_key, version_key = _redis_keys(namespace, key)
+            try:
+                stored = await self._async_redis.set_versioned_json(data_key, data, version_key, read.version, ex=self.ttl)
+            except Exception as e:
+                self._record_redis_error(e)
+            else:
+                self._record_redis_write(stored)
+
+    def invalidate(self, namespace: str, *keys: Hashable) -> None:
+        """Drop the cached rows of `keys` and bump their Redis versions. Called by the query functions that write them."""
+        if not keys:
+            return
+        self._drop_locally(namespace, keys)
+        # bumped while disabled too, so processes reading through the cache drop the row
+        if self._redis is None:
+            return
+        data_keys, version_keys = zip(*(_redis_keys(namespace, key) for key in keys))
+        try:
+            self._redis.bump_versions(version_keys, data_keys, ex=self.ttl)
+        except Exception as e:
+            self._record_redis_error(e)
+
+    async def async_invalidate(self, namespace: str, *keys: Hashable) -> None:
+        """Drop the cached rows of `keys` and bump their Redis versions. Called by the async query functions that write them."""
+        if not keys:
+            return
+        self._drop_locally(namespace, keys)
+        # bumped while disabled too, so processes reading through the cache drop the row
+        if self._async_redis is None:
+            return
+        data_keys, version_keys = zip(*(_redis_keys(namespace, key) for key in keys))
+        try:
+            await self._async_redis.bump_versions(version_keys, data_keys, ex=self.ttl)
+        except Exception as e:
+            self._record_redis_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of both tiers and the overall hit ratio (lookups not reaching the database)."""
+        local = self._local.stats()
+        with self._lock:
+            hits = local["hits"] + self._redis_hits
+            lookups = local["hits"] + local["misses"]
+            return {
+                "enabled": self.enabled,
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "local": local,
+                "redis": {"hits": self._redis_hits, "misses": self._redis_misses, "errors": self._redis_errors, "rejected": self._redis_rejected},
+            }
+
+    def _store_locally(self, namespace: str, key: Hashable, row: BaseModel, generation: int) -> Optional[Dict[str, Any]]:
+        """Cache a row read at `generation` in the process tier. Returns its JSON data, None if an invalidation raced the read."""
+        if self.generation() != generation:
+            return None
+        data = row.model_dump(mode='json')
+        self._local.put((namespace, str(key)), data)
+        return data
+
+    def _drop_locally(self, namespace: str, keys: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._invalidations += 1
+        for key in keys:
+            self._local.pop((namespace, str(key)))
+
+    def _record_redis_lookup(self, data: Any) -> None:
+        with self._lock:
+            if data is None:
+                self._redis_misses += 1
+            else:
+                self._redis_hits += 1
+
+    def _record_redis_write(self, stored: bool) -> None:
+        if not stored:
+            with self._lock:
+                self._redis_rejected += 1
+
+    def _record_redis_error(self, error: Exception) -> None:
+        logging.warning(f"Query cache Redis error, falling back to the database: {error}")
+        with self._lock:
+            self._redis_errors += 1
+
+def _redis_keys(namespace: str, key: Hashable) -> Tuple[str, str]:
+    """Key of a cached row and key of its version."""
+    return f"{KEY_PREFIX}:{namespace}:{key}", f"{VERSION_KEY_PREFIX}:{namespace}:{key}"
+
+query_cache = QueryCache()  # module level singleton instance
+
+def cached_query(namespace: str, model: Type[BaseModel]):
+    """
+    Decorator caching a query function that looks a row up by the argument following the session,
+    in `query_cache` under `namespace`. Works with both sync and async query functions; calls go
+    straight to the database while the cache is disabled. Rows that are not found are not cached.
+    """
+    def decorator(query_fn):
+        signature = inspect.signature(query_fn)
+        key_name = list(signature.parameters)[1]
+
+        if inspect.iscoroutinefunction(query_fn):
+            @wraps(query_fn)
+            async def async_wrapper(*args, **kwargs):
+                if not query_cache.enabled:
+                    return await query_fn(*args, **kwargs)
+                key = signature.bind(*args, **kwargs).arguments[key_name]
+                cached, read = await query_cache.async_get(namespace, key, model)
+                if cached is not None:
+                    return cached
+                row = await query_fn(*args, **kwargs)
+                if row is not None:
+                    await query_cache.async_put(namespace, key, row, read)
+                return row
+            return async_wrapper
+        else:
+            @wraps(query_fn)
+            def sync_wrapper(*args, **kwargs):
+                if not query_cache.enabled:
+                    return query_fn(*args, **kwargs)
+                key = signature.bind(*args, **kwargs).arguments[key_name]
+                cached, read = query_cache.get(namespace, key, model)
+                if cached is not None:
+                    return cached
+                row = query_fn(*args, **kwargs)
+                if row is not None:
+                    query_cache.put(namespace, key, row, read)
+                return row
+            return sync_wrapper
+    return decorator
+
+def enable_query_cache(redis_client: Any = None, async_redis_client: Any = None, ttl: int = DEFAULT_QUERY_CACHE_TTL,
+                       local_ttl: float = DEFAULT_LOCAL_TTL, local_maxsize: int = DEFAULT_LOCAL_MAXSIZE) -> None:
+    """Enable caching of `get_document`, `get_chunk`, `get_chunk_graph_for_chunk` and their async twins, see `QueryCache.configure`."""
+    query_cache.configure(redis_client, async_redis_client, ttl, local_ttl, local_maxsize)
+
+def disable_query_cache() -> None:
+    query_cache.disable()
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and hit ratio of the query cache."""
+    return query_cache.stats()
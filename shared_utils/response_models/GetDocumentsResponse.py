@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 
@@ -5,4 +6,5 @@ class GetDocumentsResponse(BaseModel):
     """
     Response model for getting all documents operation.
     """
-    document_ids: list[UUID] = Field(..., description="List of document IDs retrieved from the database.")
\ No newline at end of file
+    document_ids: list[UUID] = Field(..., description="List of document IDs retrieved from the database.")
+    next_cursor: Optional[UUID] = Field(default=None, description="Cursor of the next page of documents, None on the last page.")
\ No newline at end of file
@@ -1,13 +1,19 @@
 from uuid import UUID
-from functools import wraps
+from functools import lru_cache, wraps
+from typing import Dict, Iterable, List
 from unicodedata import normalize
 import inspect
+import logging
 import re
 
+NORMALIZE_CACHE_SIZE = 65536  # distinct entity names whose normalized ID is kept
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
 def deserialize_event(contract_class):
     """
     Decorator to deserialize event data into an event contract class instance.
-    Works with both sync and async callback functions.
+    Works with both sync and async callback functions. To validate each message once for all
+    its callbacks, register the undecorated callback with `event_type=contract_class` instead.
     """
     def decorator(callback_fn):
         # Check if the callback is an async function
@@ -17,7 +23,7 @@ def deserialize_event(contract_class):
                 try:
                     obj = contract_class(**event_data)
                 except Exception as e:
-                    print(f"Deserialization failed for {contract_class.__name__}: {e}")
+                    logging.warning(f"Deserialization failed for {contract_class.__name__}: {e}")
                     return
                 return await callback_fn(obj)
             return async_wrapper
@@ -27,7 +33,7 @@ def deserialize_event(contract_class):
                 try:
                     obj = contract_class(**event_data)
                 except Exception as e:
-                    print(f"Deserialization failed for {contract_class.__name__}: {e}")
+                    logging.warning(f"Deserialization failed for {contract_class.__name__}: {e}")
                     return
                 return callback_fn(obj)
             return sync_wrapper
@@ -44,6 +50,7 @@ def to_age_graph_id(u: UUID) -> str:
     """
     return f"{str(u).replace('-', '_')}"
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_entity_id(name: str) -> str:
     """
     Normalize arbitrary entity names into deterministic string IDs.
@@ -52,18 +59,41 @@ def normalize_entity_id(name: str) -> str:
     - Replaces non-alphanumeric runs with a single underscore
     - Trims leading/trailing underscores
     - Collapses internal whitespace
+
+    Results are memoized: graph building normalizes the same names over and over.
     """
-    # Normalize Unicode characters (e.g., é -> e)
-    name = normalize('NFKD', name)
-    name = name.encode('ascii', 'ignore').decode('ascii')
+    # Normalize Unicode characters (e.g., é -> e); NFKD leaves ASCII text unchanged
+    if not name.isascii():
+        name = normalize('NFKD', name)
+        name = name.encode('ascii', 'ignore').decode('ascii')
     
     # Lowercase
     name = name.lower()
 
     # Replace any sequence of non-alphanumeric characters with underscore
-    name = re.sub(r'[^a-z0-9]+', '_', name)
+    name = _NON_ALPHANUMERIC.sub('_', name)
 
     # Trim leading/trailing underscores
     name = name.strip('_')
 
-    return name
\ No newline at end of file
+    return name
+
+def normalize_entity_ids(names: Iterable[str]) -> List[str]:
+    """
+    Normalize many entity names (a list, any iterable or a numpy array of strings) at once.
+    Each distinct name is normalized once per call, repeated names reuse its ID.
+
+    Args:
+        names (Iterable[str]): The entity names.
+
+    Returns:
+        List[str]: The normalized IDs, in the order of `names`.
+    """
+    ids: Dict[str, str] = {}
+    result = []
+    for name in names:
+        entity_id = ids.get(name)
+        if entity_id is None:
+            entity_id = ids[name] = normalize_entity_id(str(name))
+        result.append(entity_id)
+    return result
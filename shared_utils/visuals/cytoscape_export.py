@@ -0,0 +1,116 @@
+import json
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Mapping, Optional, Tuple, TYPE_CHECKING
+from psycopg import AsyncConnection
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared_utils.agtype_utils import Vertex, Edge, parse_agtype
+from shared_utils.sql_models import CytoscapeElements, LayoutName
+from shared_utils.queries.async_apache_age import async_stream_cypher
+from shared_utils.queries.async_cytoscape_elements import async_upsert_cytoscape_elements
+
+if TYPE_CHECKING:
+    # importing the client module creates its singleton, which requires AWS settings
+    from shared_utils.clients.async_s3_client import S3Client
+
+VERTICES_STMT = "MATCH (v) RETURN v"
+EDGES_STMT = "MATCH ()-[e]->() RETURN e"
+FRAGMENT_SIZE = 1000  # elements serialized per yielded text fragment
+
+Positions = Mapping[int, Tuple[float, float]]
+
+def cytoscape_s3_key(graph_name: str, layout_name: LayoutName) -> str:
+    """Default s3 key of the cytoscape elements of a graph layout."""
+    return f"cytoscape/{graph_name}/{layout_name.value}.json"
+
+def node_element(vertex: Vertex, positions: Optional[Positions] = None) -> Dict[str, Any]:
+    """Build the cytoscape node element of a vertex, positioned when its id is in `positions`."""
+    element: Dict[str, Any] = {"data": {"id": str(vertex.id), "label": vertex.label, "properties": vertex.properties}}
+    if positions is not None:
+        position = positions.get(vertex.id)
+        if position is not None:
+            element["position"] = {"x": float(position[0]), "y": float(position[1])}
+    return element
+
+def edge_element(edge: Edge) -> Dict[str, Any]:
+    """Build the cytoscape edge element of an edge."""
+    return {"data": {
+        "id": str(edge.id),
+        "source": str(edge.start_id),
+        "target": str(edge.end_id),
+        "label": edge.label,
+        "properties": edge.properties,
+    }}
+
+async def iter_cytoscape_json(conn: AsyncConnection, graph_name: str, positions: Optional[Positions] = None, batch_size: int = 5000) -> AsyncIterator[str]:
+    """
+    Streams the vertices and edges of an AGE graph as a cytoscape elements JSON array.
+
+    Rows are read with server-side cursors and serialized as they arrive, so memory use does not
+    depend on the size of the graph. Yields text fragments that concatenate to the JSON document.
+    """
+    async for fragment in iter_json_array(_iter_elements(conn, graph_name, positions, batch_size)):
+        yield fragment
+
+async def iter_json_array(elements: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serializes elements as a JSON array, yielding one text fragment per FRAGMENT_SIZE elements."""
+    yield "["
+    first = True
+    fragment = []
+    async for element in elements:
+        fragment.append(json.dumps(element, separators=(",", ":")))
+        if len(fragment) >= FRAGMENT_SIZE:
+            yield ("" if first else ",") + ",".join(fragment)
+            first = False
+            fragment.clear()
+    if fragment:
+        yield ("" if first else ",") + ",".join(fragment)
+    yield "]"
+
+async def export_cytoscape_elements_to_s3(
+    age_conn: AsyncConnection,
+    session: AsyncSession,
+    s3_client: "S3Client",
+    bucket_name: str,
+    graph_name: str,
+    layout_name: LayoutName,
+    positions: Optional[Positions] = None,
+    s3_key: Optional[str] = None,
+    batch_size: int = 5000,
+) -> Optional[CytoscapeElements]:
+    """
+    Streams the cytoscape elements of an AGE graph to S3 as a multipart upload and registers
+    the `CytoscapeElements` row once the upload is complete.
+
+    Args:
+        age_conn (AsyncConnection): The AGE connection to read the graph with.
+        session (AsyncSession): The async session to register the elements with.
+        s3_client (S3Client): The client to upload with.
+        bucket_name (str): The bucket to upload to.
+        graph_name (str): The AGE name of the graph to export.
+        layout_name (LayoutName): The layout the positions belong to.
+        positions (Optional[Positions]): Node positions keyed by AGE vertex id.
+        s3_key (Optional[str]): The object key, `cytoscape_s3_key(graph_name, layout_name)` by default.
+        batch_size (int): Number of rows fetched per round trip.
+
+    Returns:
+        Optional[CytoscapeElements]: The registered entry, or None if the upload failed.
+    """
+    s3_key = s3_key or cytoscape_s3_key(graph_name, layout_name)
+    uploaded = await s3_client.upload_json_stream(bucket_name, s3_key, iter_cytoscape_json(age_conn, graph_name, positions, batch_size))
+    if not uploaded:
+        logging.error(f"Cytoscape export of {graph_name} ({layout_name.value}) failed")
+        return None
+
+    elements = CytoscapeElements(concept_graph_name=graph_name, layout_name=layout_name, s3_key=s3_key)
+    await async_upsert_cytoscape_elements(session, elements)
+    return elements
+
+async def _iter_elements(conn: AsyncConnection, graph_name: str, positions: Optional[Positions], batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+    async for (vertex,) in async_stream_cypher(conn, graph_name, VERTICES_STMT, batch_size=batch_size):
+        yield node_element(_as_entity(vertex), positions)
+    async for (edge,) in async_stream_cypher(conn, graph_name, EDGES_STMT, batch_size=batch_size):
+        yield edge_element(_as_entity(edge))
+
+def _as_entity(value: Any) -> Any:
+    # rows are agtype text unless the connection decodes agtype
+    return parse_agtype(value) if isinstance(value, str) else value
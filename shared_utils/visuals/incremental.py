@@ -0,0 +1,301 @@
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Literal, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+import numpy as np
+from psycopg import AsyncConnection
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared_utils.agtype_utils import Vertex, Edge
+from shared_utils.sql_models import CytoscapeElements, LayoutName
+from shared_utils.queries.async_apache_age import async_stream_cypher
+from shared_utils.queries.async_cytoscape_elements import async_get_cytoscape_elements, async_upsert_cytoscape_elements
+from shared_utils.visuals.cytoscape_export import (
+    VERTICES_STMT, EDGES_STMT, Positions, cytoscape_s3_key, edge_element, iter_json_array, node_element, _as_entity,
+)
+from shared_utils.visuals.layouts import compute_layout, index_graph, layout_positions, _adjacency
+
+if TYPE_CHECKING:
+    # importing the client module creates its singleton, which requires AWS settings
+    from shared_utils.clients.async_s3_client import S3Client
+
+# closed-form layouts are O(n) and move most nodes when the graph changes: recomputed, never patched
+RECOMPUTED_LAYOUTS = frozenset({LayoutName.CIRCULAR, LayoutName.SHELL, LayoutName.SPIRAL, LayoutName.BIPARTITE, LayoutName.MULTIPARTITE})
+# force-directed layouts get a local spring pass around the new nodes
+REFINED_LAYOUTS = frozenset({LayoutName.SPRING, LayoutName.KAMADA_KAWAI})
+MAX_INCREMENTAL_CHANGE_RATIO = 0.25  # above this share of new nodes, the layout is recomputed
+INCREMENTAL_ITERATIONS = 30
+
+class GraphDiff(NamedTuple):
+    """Element ids that differ between the graph and its last export."""
+    added_nodes: Set[int]
+    changed_nodes: Set[int]
+    removed_nodes: Set[int]
+    added_edges: Set[int]
+    changed_edges: Set[int]
+    removed_edges: Set[int]
+
+    @property
+    def is_empty(self) -> bool:
+        return not any(self)
+
+class VisualsUpdateReport(BaseModel):
+    """Outcome of updating the cytoscape elements of one layout."""
+    layout_name: LayoutName
+    mode: Literal["full", "incremental", "unchanged", "failed"]
+    added_nodes: int = 0
+    changed_nodes: int = 0
+    removed_nodes: int = 0
+    added_edges: int = 0
+    changed_edges: int = 0
+    removed_edges: int = 0
+    elapsed_seconds: float = 0.0
+
+async def async_update_graph_visuals(
+    age_conn: AsyncConnection,
+    session: AsyncSession,
+    s3_client: "S3Client",
+    bucket_name: str,
+    graph_name: str,
+    layout_names: Iterable[LayoutName] = tuple(LayoutName),
+    seed: Optional[int] = None,
+    batch_size: int = 5000,
+    max_change_ratio: float = MAX_INCREMENTAL_CHANGE_RATIO,
+) -> List[VisualsUpdateReport]:
+    """
+    Brings the cytoscape elements of every layout of a graph up to date with the graph.
+
+    The graph is read once and diffed against the last export of each layout. Unchanged layouts
+    are left alone; otherwise only new nodes are placed, seeded from the positions of their
+    neighbours, while existing nodes keep their positions and unchanged elements are written back
+    as exported. Layouts without a previous export, closed-form layouts and changes above
+    `max_change_ratio` of the nodes are recomputed in full.
+
+    Args:
+        age_conn (AsyncConnection): The AGE connection to read the graph with.
+        session (AsyncSession): The async session holding the `CytoscapeElements` entries.
+        s3_client (S3Client): The client to download and upload the elements with.
+        bucket_name (str): The bucket of the elements.
+        graph_name (str): The AGE name of the graph.
+        layout_names (Iterable[LayoutName]): The layouts to update, all by default.
+        seed (Optional[int]): Seed of the randomized layouts.
+        batch_size (int): Number of rows fetched per round trip.
+        max_change_ratio (float): Largest share of new nodes placed incrementally.
+
+    Returns:
+        List[VisualsUpdateReport]: One report per layout.
+    """
+    vertices, edges = await async_read_graph_elements(age_conn, graph_name, batch_size)
+    reports = []
+    for layout_name in layout_names:
+        reports.append(await _update_layout_elements(
+            session, s3_client, bucket_name, graph_name, layout_name, vertices, edges, seed, max_change_ratio
+        ))
+    return reports
+
+async def async_read_graph_elements(conn: AsyncConnection, graph_name: str, batch_size: int = 5000) -> Tuple[Dict[int, Vertex], Dict[int, Edge]]:
+    """Reads the vertices and edges of an AGE graph, keyed by id."""
+    vertices = {}
+    async for (value,) in async_stream_cypher(conn, graph_name, VERTICES_STMT, batch_size=batch_size):
+        vertex = _as_entity(value)
+        vertices[vertex.id] = vertex
+    edges = {}
+    async for (value,) in async_stream_cypher(conn, graph_name, EDGES_STMT, batch_size=batch_size):
+        edge = _as_entity(value)
+        edges[edge.id] = edge
+    return vertices, edges
+
+def split_elements(elements: Iterable[Dict[str, Any]]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """Splits exported cytoscape elements into node and edge elements keyed by AGE id."""
+    nodes, edges = {}, {}
+    for element in elements:
+        data = element["data"]
+        if "source" in data:
+            edges[int(data["id"])] = element
+        else:
+            nodes[int(data["id"])] = element
+    return nodes, edges
+
+def element_positions(node_elements: Mapping[int, Dict[str, Any]]) -> Dict[int, Tuple[float, float]]:
+    """Positions of the exported node elements that have one."""
+    return {
+        vertex_id: (element["position"]["x"], element["position"]["y"])
+        for vertex_id, element in node_elements.items() if "position" in element
+    }
+
+def diff_elements(
+    vertices: Mapping[int, Vertex],
+    edges: Mapping[int, Edge],
+    previous_nodes: Mapping[int, Dict[str, Any]],
+    previous_edges: Mapping[int, Dict[str, Any]],
+) -> GraphDiff:
+    """Compares the graph with its exported node and edge elements."""
+    return GraphDiff(
+        added_nodes=vertices.keys() - previous_nodes.keys(),
+        changed_nodes={i for i in vertices.keys() & previous_nodes.keys() if node_element(vertices[i])["data"] != previous_nodes[i]["data"]},
+        removed_nodes=previous_nodes.keys() - vertices.keys(),
+        added_edges=edges.keys() - previous_edges.keys(),
+        changed_edges={i for i in edges.keys() & previous_edges.keys() if edge_element(edges[i])["data"] != previous_edges[i]["data"]},
+        removed_edges=previous_edges.keys() - edges.keys(),
+    )
+
+def incremental_layout(
+    layout_name: LayoutName,
+    vertex_ids: Sequence[int],
+    edge_pairs: Iterable[Tuple[int, int]],
+    previous_positions: Mapping[int, Tuple[float, float]],
+    seed: Optional[int] = None,
+    iterations: int = INCREMENTAL_ITERATIONS,
+) -> Dict[int, Tuple[float, float]]:
+    """
+    Extends a layout to vertices it has no position for, without moving the others.
+
+    New vertices are seeded at the barycenter of their positioned neighbours (random positions for
+    RANDOM, or when no neighbour is positioned). For REFINED_LAYOUTS a spring pass then runs on the
+    new vertices and their neighbours only, so the cost follows the size of the change.
+
+    Returns:
+        Dict[int, Tuple[float, float]]: Positions of all vertices, keyed by vertex id.
+    """
+    ids, edges = index_graph(vertex_ids, edge_pairs)
+    id_list = ids.tolist()
+    placed = np.fromiter((vertex_id in previous_positions for vertex_id in id_list), dtype=bool, count=len(id_list))
+    if not placed.any():
+        positions = compute_layout(layout_name, len(ids), edges, seed=seed)
+        return {vertex_id: (float(x), float(y)) for vertex_id, (x, y) in zip(id_list, positions)}
+    if placed.all():
+        return {vertex_id: tuple(previous_positions[vertex_id]) for vertex_id in id_list}
+
+    rng = np.random.default_rng(seed)
+    positions = np.zeros((len(ids), 2))
+    positions[placed] = [previous_positions[vertex_id] for vertex_id in ids[placed].tolist()]
+    adjacency = _adjacency(len(ids), edges)
+    edge_length = _median_edge_length(positions, edges, placed)
+    new = np.nonzero(~placed)[0]
+
+    if layout_name != LayoutName.RANDOM:
+        seeded = _seed_at_neighbour_barycenters(adjacency, positions, placed, rng, edge_length)
+    else:
+        seeded = placed.copy()
+    unseeded = np.nonzero(~seeded)[0]
+    low, high = positions[placed].min(axis=0), positions[placed].max(axis=0)
+    positions[unseeded] = low + rng.random((len(unseeded), 2)) * (high - low)
+
+    if layout_name in REFINED_LAYOUTS:
+        local = np.union1d(new, adjacency[new].indices)
+        local_edges = _sparse_edges(adjacency[local][:, local])
+        positions[local] = compute_layout(
+            LayoutName.SPRING, len(local), local_edges, seed=seed, iterations=iterations,
+            initial_positions=positions[local], fixed=placed[local], optimal_distance=edge_length,
+        )
+
+    return {vertex_id: (float(x), float(y)) for vertex_id, (x, y) in zip(id_list, positions)}
+
+def _sparse_edges(adjacency) -> np.ndarray:
+    """(E, 2) index pairs of the upper triangle of a symmetric adjacency matrix."""
+    upper = adjacency.tocoo()
+    keep = upper.row < upper.col
+    return np.column_stack([upper.row[keep], upper.col[keep]])
+
+def _median_edge_length(positions: np.ndarray, edges: np.ndarray, placed: np.ndarray) -> float:
+    """Typical edge length of the existing layout, the length new edges are laid out with."""
+    edges = edges[placed[edges[:, 0]] & placed[edges[:, 1]]]
+    if len(edges):
+        lengths = np.sqrt(((positions[edges[:, 0]] - positions[edges[:, 1]]) ** 2).sum(axis=1))
+        lengths = lengths[lengths > 0]
+        if len(lengths):
+            return float(np.median(lengths))
+    extent = float(np.ptp(positions[placed], axis=0).max())
+    return max(extent / np.sqrt(placed.sum()), 1.0)
+
+def _seed_at_neighbour_barycenters(adjacency, positions: np.ndarray, placed: np.ndarray, rng: np.random.Generator, edge_length: float) -> np.ndarray:
+    """
+    Places pending nodes at the barycenter of their seeded neighbours, in rounds so chains of new
+    nodes are reached from the existing layout. Returns the mask of seeded nodes.
+    """
+    seeded = placed.copy()
+    pending = np.nonzero(~seeded)[0]
+    while len(pending):
+        rows = adjacency[pending]
+        counts = rows @ seeded.astype(float)
+        reached = counts > 0
+        if not reached.any():
+            break
+        sums = rows @ (positions * seeded[:, None])
+        nodes = pending[reached]
+        # jitter keeps nodes seeded from the same neighbours apart
+        positions[nodes] = sums[reached] / counts[reached, None] + rng.normal(scale=0.1 * edge_length, size=(len(nodes), 2))
+        seeded[nodes] = True
+        pending = pending[~reached]
+    return seeded
+
+async def _update_layout_elements(
+    session: AsyncSession,
+    s3_client: "S3Client",
+    bucket_name: str,
+    graph_name: str,
+    layout_name: LayoutName,
+    vertices: Dict[int, Vertex],
+    edges: Dict[int, Edge],
+    seed: Optional[int],
+    max_change_ratio: float,
+) -> VisualsUpdateReport:
+    start = time.perf_counter()
+    s3_key = cytoscape_s3_key(graph_name, layout_name)
+    previous = None
+    existing = await async_get_cytoscape_elements(session, graph_name, layout_name)
+    if existing is not None and existing.s3_key:
+        s3_key = existing.s3_key
+        previous = await s3_client.download_json(bucket_name, s3_key)
+
+    previous_nodes, previous_edges = split_elements(previous or [])
+    diff = diff_elements(vertices, edges, previous_nodes, previous_edges)
+    counts = {field: len(ids) for field, ids in diff._asdict().items()}
+    if previous is not None and diff.is_empty:
+        return VisualsUpdateReport(layout_name=layout_name, mode="unchanged", elapsed_seconds=time.perf_counter() - start, **counts)
+
+    previous_positions = element_positions(previous_nodes)
+    vertex_ids = list(vertices)
+    edge_pairs = [(edge.start_id, edge.end_id) for edge in edges.values()]
+    incremental = (
+        previous is not None
+        and layout_name not in RECOMPUTED_LAYOUTS
+        and len(previous_positions) == len(previous_nodes)
+        and len(diff.added_nodes) <= max_change_ratio * len(vertices)
+    )
+    if incremental:
+        positions = incremental_layout(layout_name, vertex_ids, edge_pairs, previous_positions, seed=seed)
+        reused_nodes = previous_nodes.keys() - diff.changed_nodes - diff.removed_nodes
+    else:
+        positions = layout_positions(layout_name, vertex_ids, edge_pairs, seed=seed)
+        reused_nodes = set()
+    reused_edges = previous_edges.keys() - diff.changed_edges - diff.removed_edges
+
+    elements = _iter_updated_elements(vertices, edges, positions, previous_nodes, previous_edges, reused_nodes, reused_edges)
+    uploaded = await s3_client.upload_json_stream(bucket_name, s3_key, iter_json_array(elements))
+    if not uploaded:
+        logging.error(f"Cytoscape update of {graph_name} ({layout_name.value}) failed")
+        return VisualsUpdateReport(layout_name=layout_name, mode="failed", elapsed_seconds=time.perf_counter() - start, **counts)
+
+    if existing is None:
+        await async_upsert_cytoscape_elements(session, CytoscapeElements(concept_graph_name=graph_name, layout_name=layout_name, s3_key=s3_key))
+    return VisualsUpdateReport(
+        layout_name=layout_name,
+        mode="incremental" if incremental else "full",
+        elapsed_seconds=time.perf_counter() - start,
+        **counts,
+    )
+
+async def _iter_updated_elements(
+    vertices: Dict[int, Vertex],
+    edges: Dict[int, Edge],
+    positions: Positions,
+    previous_nodes: Mapping[int, Dict[str, Any]],
+    previous_edges: Mapping[int, Dict[str, Any]],
+    reused_nodes: Set[int],
+    reused_edges: Set[int],
+) -> AsyncIterator[Dict[str, Any]]:
+    """Unchanged elements are written back as exported; only the others are rebuilt."""
+    for vertex_id, vertex in vertices.items():
+        yield previous_nodes[vertex_id] if vertex_id in reused_nodes else node_element(vertex, positions)
+    for edge_id, edge in edges.items():
+        yield previous_edges[edge_id] if edge_id in reused_edges else edge_element(edge)
@@ -0,0 +1,484 @@
+import math
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+from psycopg import AsyncConnection
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import LinearOperator, eigsh, cg
+from scipy.spatial import ConvexHull, QhullError
+from shared_utils.sql_models import LayoutName
+from shared_utils.queries.async_apache_age import async_stream_cypher
+
+DEFAULT_SCALE = 1000.0  # positions are centered on 0 and fit in [-scale, scale]
+SPRING_ITERATIONS = 50
+STRESS_ITERATIONS = 100
+EXACT_REPULSION_MAX_NODES = 1500  # above this, spring repulsion uses the multi-level grid approximation
+EXACT_STRESS_MAX_NODES = 1000  # above this, kamada-kawai uses pivot MDS instead of full stress majorization
+DENSE_EIGEN_MAX_NODES = 1000
+NUM_PIVOTS = 50
+NODES_PER_CELL = 4  # target occupancy of the finest repulsion grid
+NEAR_FIELD_PAIRS_PER_NODE = 64
+MAX_CELLS_PER_NODE = 4  # bounds the refinement of the finest repulsion grid
+EXPANSION_ORDER = 6  # terms of the local expansions used by the spring repulsion approximation
+
+VERTEX_IDS_STMT = "MATCH (v) RETURN id(v)"
+EDGE_IDS_STMT = "MATCH (a)-[e]->(b) RETURN id(a), id(b)"
+
+# cells interacting with a node at one grid level: the children of its parent cell's 3x3
+# neighbourhood, minus its own 3x3 neighbourhood (handled at the finer levels)
+_CHILD_OFFSETS = np.array([(dx, dy) for dx in range(-2, 4) for dy in range(-2, 4)], dtype=np.int64)
+
+def compute_layout(
+    layout_name: LayoutName,
+    num_nodes: int,
+    edges: np.ndarray,
+    seed: Optional[int] = None,
+    scale: float = DEFAULT_SCALE,
+    iterations: Optional[int] = None,
+    initial_positions: Optional[np.ndarray] = None,
+    fixed: Optional[np.ndarray] = None,
+    optimal_distance: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Computes node positions for a layout.
+
+    Args:
+        layout_name (LayoutName): The layout to compute.
+        num_nodes (int): Number of nodes, identified by their index.
+        edges (np.ndarray): (E, 2) array of node indices. Direction, self loops and duplicates are ignored.
+        seed (Optional[int]): Seed of the random generator used by randomized layouts.
+        scale (float): Positions are centered on 0 and rescaled to fit in [-scale, scale].
+        iterations (Optional[int]): Iterations of the iterative layouts (SPRING, KAMADA_KAWAI).
+        initial_positions (Optional[np.ndarray]): (N, 2) starting positions for SPRING. When given,
+            positions keep their coordinate system and are not rescaled.
+        fixed (Optional[np.ndarray]): Boolean mask of nodes SPRING must not move.
+        optimal_distance (Optional[float]): SPRING edge length, in the coordinates of `initial_positions`.
+            Set it when refining part of a larger layout so the part keeps the scale of the whole.
+
+    Returns:
+        np.ndarray: (N, 2) array of positions.
+    """
+    if num_nodes == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    adjacency = _adjacency(num_nodes, edges)
+
+    if layout_name == LayoutName.SPRING:
+        positions = _spring_layout(adjacency, rng, iterations or SPRING_ITERATIONS, initial_positions, fixed, optimal_distance)
+        if initial_positions is not None:
+            return positions
+    elif layout_name == LayoutName.KAMADA_KAWAI:
+        positions = _kamada_kawai_layout(adjacency, rng, iterations or STRESS_ITERATIONS)
+    elif layout_name == LayoutName.SPECTRAL:
+        positions = _spectral_layout(adjacency, rng)
+    elif layout_name == LayoutName.PLANAR:
+        positions = _planar_layout(adjacency, rng)
+    elif layout_name == LayoutName.CIRCULAR:
+        positions = _circular_layout(adjacency)
+    elif layout_name == LayoutName.SHELL:
+        positions = _shell_layout(adjacency)
+    elif layout_name == LayoutName.SPIRAL:
+        positions = _spiral_layout(adjacency)
+    elif layout_name == LayoutName.BIPARTITE:
+        positions = _layered_layout(_bfs_levels(adjacency) % 2)
+    elif layout_name == LayoutName.MULTIPARTITE:
+        positions = _layered_layout(_bfs_levels(adjacency))
+    elif layout_name == LayoutName.RANDOM:
+        positions = rng.random((num_nodes, 2))
+    else:
+        raise ValueError(f"Unsupported layout: {layout_name}")
+
+    return _rescale(positions, scale)
+
+def index_graph(vertex_ids: Sequence[int], edge_pairs: Iterable[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maps AGE vertex ids to node indices.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The vertex ids, and the (E, 2) edges as indices into them.
+        Edges with an endpoint missing from `vertex_ids` are dropped.
+    """
+    ids = np.asarray(vertex_ids, dtype=np.int64)
+    pairs = np.asarray(list(edge_pairs), dtype=np.int64).reshape(-1, 2)
+    if len(ids) == 0 or len(pairs) == 0:
+        return ids, np.zeros((0, 2), dtype=np.int64)
+    sorter = np.argsort(ids)
+    found = np.searchsorted(ids, pairs, sorter=sorter)
+    found = np.minimum(found, len(ids) - 1)
+    indices = sorter[found]
+    valid = (ids[indices] == pairs).all(axis=1)
+    return ids, indices[valid]
+
+def layout_positions(layout_name: LayoutName, vertex_ids: Sequence[int], edge_pairs: Iterable[Tuple[int, int]], **options) -> Dict[int, Tuple[float, float]]:
+    """Computes a layout for vertices and (start_id, end_id) edges, returning positions keyed by vertex id."""
+    ids, edges = index_graph(vertex_ids, edge_pairs)
+    positions = compute_layout(layout_name, len(ids), edges, **options)
+    return {int(vertex_id): (float(x), float(y)) for vertex_id, (x, y) in zip(ids.tolist(), positions)}
+
+async def async_read_graph_structure(conn: AsyncConnection, graph_name: str, batch_size: int = 10000) -> Tuple[np.ndarray, np.ndarray]:
+    """Reads the vertex ids and (start_id, end_id) pairs of an AGE graph with server-side cursors."""
+    vertex_ids = [int(vertex_id) async for (vertex_id,) in async_stream_cypher(conn, graph_name, VERTEX_IDS_STMT, cols=["id"], batch_size=batch_size)]
+    edge_pairs = [(int(start), int(end)) async for (start, end) in async_stream_cypher(conn, graph_name, EDGE_IDS_STMT, cols=["start_id", "end_id"], batch_size=batch_size)]
+    return index_graph(vertex_ids, edge_pairs)
+
+async def async_compute_graph_layout(conn: AsyncConnection, graph_name: str, layout_name: LayoutName, **options) -> Dict[int, Tuple[float, float]]:
+    """Computes a layout of an AGE graph, returning positions keyed by AGE vertex id."""
+    ids, edges = await async_read_graph_structure(conn, graph_name)
+    positions = compute_layout(layout_name, len(ids), edges, **options)
+    return {int(vertex_id): (float(x), float(y)) for vertex_id, (x, y) in zip(ids.tolist(), positions)}
+
+def _adjacency(num_nodes: int, edges: np.ndarray) -> sparse.csr_matrix:
+    """Symmetric, binary adjacency matrix without self loops."""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    adjacency = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_nodes, num_nodes))
+    adjacency.data[:] = 1.0  # collapse duplicate edges
+    return adjacency
+
+def _rescale(positions: np.ndarray, scale: float) -> np.ndarray:
+    positions = positions - positions.mean(axis=0)
+    extent = np.abs(positions).max()
+    if extent == 0:
+        return positions
+    return positions * (scale / extent)
+
+def _bfs_levels(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """BFS depth of every node from the highest degree node of its connected component."""
+    n = adjacency.shape[0]
+    _, labels = csgraph.connected_components(adjacency, directed=False)
+    degrees = np.diff(adjacency.indptr)
+    order = np.lexsort((-degrees, labels))
+    sorted_labels = labels[order]
+    roots = order[np.r_[True, sorted_labels[1:] != sorted_labels[:-1]]]
+
+    # one BFS from a virtual node linked to every component root
+    virtual = sparse.csr_matrix((np.ones(len(roots)), (np.full(len(roots), n), roots)), shape=(n + 1, n + 1))
+    extended = sparse.block_diag((adjacency, sparse.csr_matrix((1, 1)))).tocsr() + virtual
+    depth = csgraph.shortest_path(extended, method='D', directed=False, unweighted=True, indices=n)
+    return (depth[:n] - 1).astype(np.int64)
+
+def _circular_layout(adjacency: sparse.csr_matrix) -> np.ndarray:
+    n = adjacency.shape[0]
+    # neighbours end up close on the circle when nodes are ordered by BFS depth
+    order = np.argsort(_bfs_levels(adjacency), kind='stable')
+    theta = np.empty(n)
+    theta[order] = np.arange(n) * (2 * np.pi / n)
+    return np.column_stack([np.cos(theta), np.sin(theta)])
+
+def _shell_layout(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """Concentric circles, one per BFS depth."""
+    levels = _bfs_levels(adjacency)
+    counts = np.bincount(levels)
+    order = np.argsort(levels, kind='stable')
+    rank = np.empty(len(levels), dtype=np.int64)
+    rank[order] = np.arange(len(levels)) - np.repeat(np.cumsum(counts) - counts, counts)
+    radius = levels + (0 if counts[0] == 1 else 1)
+    theta = 2 * np.pi * rank / counts[levels]
+    return np.column_stack([radius * np.cos(theta), radius * np.sin(theta)])
+
+def _spiral_layout(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """Archimedean spiral with roughly equal spacing, highest degree nodes at the center."""
+    n = adjacency.shape[0]
+    order = np.argsort(-np.diff(adjacency.indptr), kind='stable')
+    theta = np.empty(n)
+    theta[order] = np.sqrt(4 * np.pi * np.arange(n))
+    return np.column_stack([theta * np.cos(theta), theta * np.sin(theta)])
+
+def _layered_layout(layers: np.ndarray) -> np.ndarray:
+    """One vertical column per layer, nodes centered in their column (bipartite/multipartite)."""
+    counts = np.bincount(layers)
+    order = np.argsort(layers, kind='stable')
+    rank = np.empty(len(layers), dtype=np.int64)
+    rank[order] = np.arange(len(layers)) - np.repeat(np.cumsum(counts) - counts, counts)
+    y = rank - (counts[layers] - 1) / 2
+    # keep columns as far apart as the tallest column is high
+    x = layers * max(counts.max() / max(len(counts), 1), 1.0)
+    return np.column_stack([x, y]).astype(float)
+
+def _spectral_layout(adjacency: sparse.csr_matrix, rng: np.random.Generator) -> np.ndarray:
+    """
+    Second and third eigenvectors of the regularized normalized adjacency D^-1/2 (A + tau/n) D^-1/2.
+    The regularization keeps disconnected graphs from collapsing each component to a point.
+    """
+    n = adjacency.shape[0]
+    if n <= 3:
+        return _circular_layout(adjacency)
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    tau = max(degrees.mean(), 1.0)
+    d_inv_sqrt = 1.0 / np.sqrt(degrees + tau)
+
+    if n <= DENSE_EIGEN_MAX_NODES:
+        matrix = adjacency.toarray() + tau / n
+        matrix = d_inv_sqrt[:, None] * matrix * d_inv_sqrt[None, :]
+        values, vectors = np.linalg.eigh(matrix)
+        vectors = vectors[:, np.argsort(values)[::-1][:3]]
+    else:
+        def matvec(x):
+            y = np.ravel(x) * d_inv_sqrt
+            return d_inv_sqrt * (adjacency @ y + tau / n * y.sum())
+        operator = LinearOperator((n, n), matvec=matvec, dtype=float)
+        values, vectors = eigsh(operator, k=3, which='LA', tol=1e-6, v0=rng.random(n))
+        vectors = vectors[:, np.argsort(values)[::-1]]
+
+    return vectors[:, 1:3] * d_inv_sqrt[:, None]
+
+def _planar_layout(adjacency: sparse.csr_matrix, rng: np.random.Generator) -> np.ndarray:
+    """
+    Tutte (barycentric) embedding: the convex hull of the spectral layout is pinned to a circle
+    and every other node is placed at the barycenter of its neighbours. Crossing free for
+    3-connected planar graphs; planarity itself is not verified.
+    """
+    n = adjacency.shape[0]
+    if n <= 3:
+        return _circular_layout(adjacency)
+    initial = _rescale(_spectral_layout(adjacency, rng), 1.0)
+    try:
+        boundary = ConvexHull(initial).vertices
+    except QhullError:
+        return initial
+
+    positions = initial.copy()
+    theta = np.linspace(0, 2 * np.pi, len(boundary), endpoint=False)
+    positions[boundary] = np.column_stack([np.cos(theta), np.sin(theta)])
+    interior = np.setdiff1d(np.arange(n), boundary)
+    if len(interior) == 0:
+        return positions
+
+    laplacian = csgraph.laplacian(adjacency).tocsr()
+    l_ii = laplacian[interior][:, interior]
+    l_ib = laplacian[interior][:, boundary]
+    # a weak pull towards the spectral position keeps parts not connected to the boundary solvable
+    eps = 1e-3
+    system = (l_ii + eps * sparse.identity(len(interior))).tocsr()
+    rhs = -(l_ib @ positions[boundary]) + eps * initial[interior]
+    for axis in range(2):
+        positions[interior, axis], _ = cg(system, rhs[:, axis], x0=initial[interior, axis], rtol=1e-6, maxiter=1000)
+    return positions
+
+def _kamada_kawai_layout(adjacency: sparse.csr_matrix, rng: np.random.Generator, iterations: int) -> np.ndarray:
+    """
+    Layout whose euclidean distances match graph distances. Small graphs run stress majorization
+    on all pairs; large graphs use pivot MDS, which only needs BFS from a few pivots.
+    """
+    n = adjacency.shape[0]
+    if n <= 2:
+        return _circular_layout(adjacency)
+    if n > EXACT_STRESS_MAX_NODES:
+        return _pivot_mds(adjacency, rng)
+
+    distances = csgraph.shortest_path(adjacency, method='D', directed=False, unweighted=True)
+    distances = _fill_unreachable(distances)
+    positions = _classical_mds(distances)
+    return _stress_majorization(positions, distances, iterations)
+
+def _fill_unreachable(distances: np.ndarray) -> np.ndarray:
+    """Place nodes of other components just beyond the farthest reachable node."""
+    finite = np.isfinite(distances)
+    longest = distances[finite].max() if finite.any() else 1.0
+    return np.where(finite, distances, longest + 1)
+
+def _classical_mds(distances: np.ndarray) -> np.ndarray:
+    squared = distances ** 2
+    centered = -0.5 * (squared - squared.mean(axis=0) - squared.mean(axis=1)[:, None] + squared.mean())
+    values, vectors = np.linalg.eigh(centered)
+    top = np.argsort(values)[::-1][:2]
+    return vectors[:, top] * np.sqrt(np.maximum(values[top], 1e-12))
+
+def _stress_majorization(positions: np.ndarray, distances: np.ndarray, iterations: int) -> np.ndarray:
+    """Moves every node to the weighted mean of where each other node wants it (weights 1/d^2)."""
+    with np.errstate(divide='ignore'):
+        weights = np.where(distances > 0, 1.0 / distances ** 2, 0.0)
+    weight_sums = weights.sum(axis=1)[:, None]
+    for _ in range(iterations):
+        dx = positions[:, 0, None] - positions[None, :, 0]
+        dy = positions[:, 1, None] - positions[None, :, 1]
+        pull = weights * distances / (np.sqrt(dx * dx + dy * dy) + 1e-12)
+        targets = weights @ positions + np.column_stack([(pull * dx).sum(axis=1), (pull * dy).sum(axis=1)])
+        positions = targets / weight_sums
+    return positions
+
+def _pivot_mds(adjacency: sparse.csr_matrix, rng: np.random.Generator) -> np.ndarray:
+    """Pivot MDS (Brandes & Pich) with farthest-first pivots."""
+    n = adjacency.shape[0]
+    num_pivots = min(NUM_PIVOTS, n)
+    rows = []
+    closest = np.full(n, np.inf)
+    pivot = int(rng.integers(n))
+    for _ in range(num_pivots):
+        row = csgraph.shortest_path(adjacency, method='D', directed=False, unweighted=True, indices=pivot)
+        rows.append(row)
+        closest = np.minimum(closest, row)
+        pivot = int(np.argmax(closest))
+    distances = _fill_unreachable(np.array(rows).T)
+    squared = distances ** 2
+    centered = -0.5 * (squared - squared.mean(axis=0) - squared.mean(axis=1)[:, None] + squared.mean())
+    vectors, values, _ = np.linalg.svd(centered, full_matrices=False)
+    return vectors[:, :2] * values[:2]
+
+def _spring_layout(adjacency: sparse.csr_matrix, rng: np.random.Generator, iterations: int, initial_positions: Optional[np.ndarray], fixed: Optional[np.ndarray], optimal_distance: Optional[float] = None) -> np.ndarray:
+    """Fruchterman-Reingold force-directed layout."""
+    n = adjacency.shape[0]
+    if initial_positions is None:
+        positions = rng.random((n, 2))
+        extent = 1.0
+    else:
+        positions = np.array(initial_positions, dtype=float)
+        extent = max(float(np.ptp(positions, axis=0).max()), 1.0)
+    if n == 1:
+        return positions
+
+    if optimal_distance is None:
+        k = extent / math.sqrt(n)
+        temperature = 0.1 * extent
+    else:
+        # moves of at most one edge length keep a refined part close to where it was seeded
+        k = temperature = optimal_distance
+    edges = sparse.triu(adjacency, k=1).tocoo()
+    sources, targets = edges.row, edges.col
+    cooling = temperature / (iterations + 1)
+    repulsion = _exact_repulsion if n <= EXACT_REPULSION_MAX_NODES else _grid_repulsion
+
+    for _ in range(iterations):
+        displacement = repulsion(positions) * (k * k)
+
+        # attraction d^2/k along every edge
+        delta = positions[sources] - positions[targets]
+        distance = np.sqrt((delta ** 2).sum(axis=1))
+        pull = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, pull[:, axis], minlength=n)
+            displacement[:, axis] += np.bincount(targets, pull[:, axis], minlength=n)
+
+        if fixed is not None:
+            displacement[fixed] = 0.0
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-12)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return positions
+
+def _exact_repulsion(positions: np.ndarray) -> np.ndarray:
+    """Sum over all pairs of delta / d^2 (repulsion k^2/d along the unit vector, up to k^2)."""
+    dx = positions[:, 0, None] - positions[None, :, 0]
+    dy = positions[:, 1, None] - positions[None, :, 1]
+    inverse = 1.0 / np.maximum(dx * dx + dy * dy, 1e-12)
+    return np.column_stack([(dx * inverse).sum(axis=1), (dy * inverse).sum(axis=1)])
+
+def _grid_repulsion(positions: np.ndarray) -> np.ndarray:
+    """
+    Approximation of `_exact_repulsion` on a hierarchy of uniform grids (a low order fast
+    multipole method). In the plane, delta / d^2 is conj(1 / (z - s)) for complex positions, so
+    at every level each cell collects the centers of mass of the 27 cells that are children of its
+    parent's neighbours but not its own neighbours into a local Taylor expansion, which is shifted
+    down to its children. Nodes evaluate the expansion of their finest cell; pairs in neighbouring
+    finest cells are computed exactly. Cost is O(n) per call.
+    """
+    low = positions.min(axis=0)
+    span = max(float(np.ptp(positions, axis=0).max()), 1e-12)
+    unit = (positions - low) / span * (1 - 1e-9)  # in [0, 1)
+    finest = _finest_grid_level(unit)
+    origin = complex(low[0], low[1])
+
+    local = parent_cells = parent_centers = None
+    for level in range(2, finest + 1):
+        size = 1 << level
+        width = span / size
+        cells = (unit * size).astype(np.int64)
+        # expansions are only kept for occupied cells, identified by their sorted flat index
+        occupied, node_cell = np.unique(cells[:, 0] * size + cells[:, 1], return_inverse=True)
+        mass = np.bincount(node_cell).astype(float)
+        centroids = (np.bincount(node_cell, positions[:, 0]) + 1j * np.bincount(node_cell, positions[:, 1])) / mass
+        grid_x, grid_y = np.divmod(occupied, size)
+        centers = origin + width * ((grid_x + 0.5) + 1j * (grid_y + 0.5))
+
+        if local is None:
+            local = np.zeros((len(occupied), EXPANSION_ORDER), dtype=complex)
+        else:
+            parents = np.searchsorted(parent_cells, (grid_x // 2) * (size // 2) + grid_y // 2)
+            local = _shift_local_expansion(local[parents], centers - parent_centers[parents])
+
+        source_x = 2 * (grid_x[:, None] // 2) + _CHILD_OFFSETS[None, :, 0]
+        source_y = 2 * (grid_y[:, None] // 2) + _CHILD_OFFSETS[None, :, 1]
+        valid = ((source_x >= 0) & (source_x < size) & (source_y >= 0) & (source_y < size)
+                 & ((np.abs(source_x - grid_x[:, None]) > 1) | (np.abs(source_y - grid_y[:, None]) > 1)))
+        targets, columns = np.nonzero(valid)
+        source_flat = source_x[targets, columns] * size + source_y[targets, columns]
+        sources = np.minimum(np.searchsorted(occupied, source_flat), len(occupied) - 1)
+        keep = occupied[sources] == source_flat
+        targets, sources = targets[keep], sources[keep]
+
+        # 1 / (z - s) = -sum_k (z - c)^k / (s - c)^(k + 1) around the target cell center c
+        offset = centroids[sources] - centers[targets]
+        term = mass[sources] / offset
+        for order in range(EXPANSION_ORDER):
+            term = term / offset if order else term
+            local[:, order] -= (np.bincount(targets, term.real, minlength=len(occupied))
+                                + 1j * np.bincount(targets, term.imag, minlength=len(occupied)))
+        parent_cells, parent_centers = occupied, centers
+
+    z = positions[:, 0] + 1j * positions[:, 1]
+    coefficients = local[node_cell]
+    dz = z - centers[node_cell]
+    field = coefficients[:, -1]
+    for order in range(EXPANSION_ORDER - 2, -1, -1):
+        field = field * dz + coefficients[:, order]
+    far = np.conj(field)
+
+    return np.column_stack([far.real, far.imag]) + _near_field_repulsion(positions, unit, size)
+
+def _shift_local_expansion(coefficients: np.ndarray, shift: np.ndarray) -> np.ndarray:
+    """Re-centers sum_k a_k (z - c)^k on c + shift."""
+    shifted = np.zeros_like(coefficients)
+    for j in range(EXPANSION_ORDER):
+        for k in range(j, EXPANSION_ORDER):
+            shifted[:, j] += math.comb(k, j) * coefficients[:, k] * shift ** (k - j)
+    return shifted
+
+def _finest_grid_level(unit: np.ndarray) -> int:
+    """
+    Finest grid level: about NODES_PER_CELL nodes per cell for uniform positions, refined while
+    dense regions make the exact near field exceed NEAR_FIELD_PAIRS_PER_NODE pairs per node.
+    """
+    n = len(unit)
+    level = max(2, math.ceil(math.log2(math.sqrt(n / NODES_PER_CELL))))
+    while (1 << (2 * level)) < MAX_CELLS_PER_NODE * n:
+        size = 1 << level
+        cells = (unit * size).astype(np.int64)
+        counts = np.bincount(cells[:, 0] * size + cells[:, 1], minlength=size * size).astype(float)
+        if 9 * float((counts ** 2).sum()) <= NEAR_FIELD_PAIRS_PER_NODE * n:
+            break
+        level += 1
+    return level
+
+def _near_field_repulsion(positions: np.ndarray, unit: np.ndarray, size: int) -> np.ndarray:
+    """Exact repulsion between nodes in the same or adjacent cells of the finest grid."""
+    n = len(positions)
+    cells = (unit * size).astype(np.int64)
+    flat = cells[:, 0] * size + cells[:, 1]
+    order = np.argsort(flat, kind='stable')
+    counts = np.bincount(flat, minlength=size * size)
+    starts = np.cumsum(counts) - counts
+
+    force = np.zeros_like(positions)
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            nx, ny = cells[:, 0] + ox, cells[:, 1] + oy
+            sources = np.nonzero((nx >= 0) & (nx < size) & (ny >= 0) & (ny < size))[0]
+            neighbour_cells = nx[sources] * size + ny[sources]
+            partner_counts = counts[neighbour_cells]
+            total = int(partner_counts.sum())
+            if total == 0:
+                continue
+            first = np.repeat(sources, partner_counts)
+            local = np.arange(total) - np.repeat(np.cumsum(partner_counts) - partner_counts, partner_counts)
+            second = order[np.repeat(starts[neighbour_cells], partner_counts) + local]
+            keep = first != second
+            first, second = first[keep], second[keep]
+            dx = positions[first, 0] - positions[second, 0]
+            dy = positions[first, 1] - positions[second, 1]
+            inverse = 1.0 / np.maximum(dx * dx + dy * dy, 1e-12)
+            force[:, 0] += np.bincount(first, dx * inverse, minlength=n)
+            force[:, 1] += np.bincount(first, dy * inverse, minlength=n)
+    return force
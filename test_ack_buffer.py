@@ -0,0 +1,47 @@
+import time
+import pytest
+from shared_utils.clients.utils.ack_buffer import AckBuffer
+
+# Test 1: Size and time triggers
+
+def test_buffer_is_due_when_full():
+    buffer = AckBuffer("group", batch_size=3, flush_interval=60)
+    assert not buffer.add("1-0")
+    assert not buffer.add("1-1")
+    assert not buffer.is_due()
+    assert buffer.add("1-2")
+    assert buffer.is_due()
+
+def test_buffer_is_due_after_flush_interval():
+    buffer = AckBuffer("group", batch_size=100, flush_interval=0.01)
+    assert not buffer.is_due()
+    buffer.add("1-0")
+    time.sleep(0.02)
+    assert buffer.is_due()
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        AckBuffer("group", batch_size=0)
+
+# Test 2: Drain, retry and metrics
+
+def test_drain_and_record_flush():
+    buffer = AckBuffer("group", batch_size=2)
+    buffer.add("1-0")
+    buffer.add("1-1")
+    ids, added_at = buffer.drain()
+    assert ids == ["1-0", "1-1"]
+    assert len(buffer) == 0
+    buffer.record_flush(added_at)
+    stats = buffer.stats()
+    assert (stats["acked"], stats["flushes"], stats["max_batch_size"], stats["avg_batch_size"]) == (2, 1, 2, 2.0)
+    assert stats["avg_ack_latency"] >= 0
+
+def test_failed_flush_is_retried_in_order():
+    buffer = AckBuffer("group")
+    buffer.add("1-0")
+    ids, added_at = buffer.drain()
+    buffer.add("1-1")
+    buffer.restore(ids, added_at)
+    assert buffer.drain()[0] == ["1-0", "1-1"]
+    assert buffer.stats()["errors"] == 1
@@ -0,0 +1,71 @@
+from decimal import Decimal
+import pytest
+from shared_utils.agtype_utils import parse_agtype, Vertex, Edge, Path
+
+VERTEX = '{"id": 844424930131971, "label": "Entity", "properties": {"id": "AALTO UNIVERSITY", "name": "Aalto University"}}::vertex'
+EDGE = '{"id": 1125899906842625, "label": "WORKS_AT", "end_id": 844424930131971, "start_id": 844424930131972, "properties": {}}::edge'
+OTHER_VERTEX = '{"id": 844424930131972, "label": "Entity", "properties": {"id": "JANE-ELLEN LONG", "name": "Jane-Ellen Long"}}::vertex'
+
+# Test 1: Graph entities decode into their slotted types
+
+def test_vertex():
+    vertex = parse_agtype(VERTEX)
+    assert vertex == Vertex(844424930131971, "Entity", {"id": "AALTO UNIVERSITY", "name": "Aalto University"})
+
+def test_edge():
+    edge = parse_agtype(EDGE)
+    assert isinstance(edge, Edge)
+    assert (edge.start_id, edge.end_id, edge.label) == (844424930131972, 844424930131971, "WORKS_AT")
+
+def test_path():
+    path = parse_agtype(f"[{OTHER_VERTEX}, {EDGE}, {VERTEX}]::path")
+    assert isinstance(path, Path)
+    assert [v.id for v in path.vertices] == [844424930131972, 844424930131971]
+    assert [e.label for e in path.edges] == ["WORKS_AT"]
+
+# Test 2: Composite values holding graph entities (e.g. nodes(p), collect(v), maps)
+
+def test_list_of_vertices():
+    vertices = parse_agtype(f"[{VERTEX}, {OTHER_VERTEX}]")
+    assert [v.label for v in vertices] == ["Entity", "Entity"]
+
+def test_map_with_vertex():
+    result = parse_agtype(f'{{"a": {VERTEX}, "n": 1}}')
+    assert isinstance(result["a"], Vertex)
+    assert result["n"] == 1
+
+# Test 3: Scalars
+
+@pytest.mark.parametrize("text,expected", [
+    ('"JANE-ELLEN LONG"', "JANE-ELLEN LONG"),
+    ("42", 42),
+    ("2.5", 2.5),
+    ("true", True),
+    ("null", None),
+    ('["a", 1]', ["a", 1]),
+    ("12.345::numeric", Decimal("12.345")),
+])
+def test_scalars(text, expected):
+    assert parse_agtype(text) == expected
+
+def test_annotation_text_inside_strings_is_kept():
+    vertex = parse_agtype('{"id": 1, "label": "Entity", "properties": {"name": "a::vertex"}}::vertex')
+    assert vertex.properties["name"] == "a::vertex"
+
+def test_invalid_value():
+    with pytest.raises(ValueError):
+        parse_agtype('{"id": 1')
+
+@pytest.mark.parametrize("text", ['"a" "b"', '42 x', '[1] ]', f"{VERTEX} 1"])
+def test_trailing_data(text):
+    with pytest.raises(ValueError):
+        parse_agtype(text)
+
+def test_trailing_whitespace():
+    assert parse_agtype(' "a" \n') == "a"
+
+def test_path_with_annotation_text_inside_strings():
+    tricky = '{"id": 3, "label": "Entity", "properties": {"name": "x}::edge"}}::vertex'
+    path = parse_agtype(f"[{OTHER_VERTEX}, {EDGE}, {tricky}]::path")
+    assert path.vertices[1].properties["name"] == "x}::edge"
+    assert len(path.elements) == 3
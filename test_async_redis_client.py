@@ -6,6 +6,7 @@ from pydantic import BaseModel
 import pytest
 import uuid
 from shared_utils.clients.redis_client import redis_client
+from shared_utils.clients.async_redis_client import AsyncRedisClient
 
 class TestMessage(BaseModel):
     id: str
@@ -210,4 +211,96 @@ def test_callback_error_handling():
     assert successful_calls[0] == 2, "Successful callback was not called correctly"
 
     # Cleanup
-    redis_client.stop_consumer(stream_name)
\ No newline at end of file
+    redis_client.stop_consumer(stream_name)
+
+# Test 5: asyncio-native consumer
+# A slow message only holds its own slot: the others keep flowing through the free slots
+
+@pytest.mark.asyncio
+async def test_async_client_slow_message_does_not_block_stream():
+    client = AsyncRedisClient()
+    stream_name = f"test-stream-{uuid.uuid4()}"
+    group_id = "test-group"
+    processed = []
+    all_fast_done = asyncio.Event()
+
+    async def callback(msg_id, data):
+        await asyncio.sleep(2 if data['value'] == "slow" else 0.1)
+        processed.append(data['value'])
+        if len(processed) == 5:
+            all_fast_done.set()
+
+    await client.create_consumer(stream_name, group_id, max_concurrent_tasks=2)
+    await client.register_callback(stream_name, group_id, callback)
+    await client.send(stream_name, TestMessage(id="0", value="slow"))
+    for i in range(5):
+        await client.send(stream_name, TestMessage(id=str(i + 1), value=f"fast-{i}"))
+
+    await asyncio.wait_for(all_fast_done.wait(), timeout=1.5)
+    assert "slow" not in processed
+
+    # stop_consumer waits for in-flight messages and flushes their acks
+    await client.stop_consumer(stream_name)
+    assert len(processed) == 6
+    pending = await client._client.xpending(stream_name, group_id)
+    assert pending['pending'] == 0
+    await client.close()
+
+# Test 6: Batched and buffered producers
+# send_many pipelines the XADDs, the buffered producer resolves every send with its message id
+
+@pytest.mark.asyncio
+async def test_send_many_and_buffered_producer():
+    client = AsyncRedisClient()
+    stream_name = f"test-stream-{uuid.uuid4()}"
+
+    ids = redis_client.send_many(stream_name, [TestMessage(id=str(i), value="sync") for i in range(5)], batch_size=2)
+    ids += await client.send_many(stream_name, [TestMessage(id=str(i + 5), value="async") for i in range(5)], batch_size=2)
+    assert len(ids) == 10
+
+    producer = client.create_producer(linger=0.01, max_batch_size=4)
+    futures = [producer.enqueue(stream_name, TestMessage(id=str(i + 10), value="buffered")) for i in range(10)]
+    ids += await asyncio.gather(*futures)
+    await producer.close()
+
+    entries = await client._client.xrange(stream_name)
+    assert [entry_id.decode('utf-8') for entry_id, _ in entries] == ids
+    stats = producer.stats()
+    assert (stats["sent"], stats["errors"], stats["max_batch_size"]) == (10, 0, 4)
+    await client._client.delete(stream_name)
+    await client.close()
+
+# Test 7: Typed callbacks
+# Every callback typed with the same event class receives the same validated instance,
+# invalid payloads are counted instead of reaching them
+
+@pytest.mark.asyncio
+async def test_typed_callbacks_share_one_validated_event():
+    client = AsyncRedisClient()
+    stream_name = f"test-stream-{uuid.uuid4()}"
+    group_id = "test-group"
+    received = []
+    done = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    async def first(event):
+        received.append(event)
+
+    def second(event):
+        # sync callbacks run in a worker thread: asyncio.Event is not thread-safe
+        received.append(event)
+        loop.call_soon_threadsafe(done.set)
+
+    await client.register_callback(stream_name, group_id, first, event_type=TestMessage)
+    await client.register_callback(stream_name, group_id, second, event_type=TestMessage)
+    await client._client.xadd(stream_name, {"data": '{"id": "0"}'})  # missing value
+    await client.send(stream_name, TestMessage(id="1", value="typed"))
+
+    await asyncio.wait_for(done.wait(), timeout=3)
+    await client.stop_consumer(stream_name)
+    assert len(received) == 2
+    assert received[0] is received[1]
+    assert received[0] == TestMessage(id="1", value="typed")
+    assert client.get_invalid_message_counts(stream_name) == 1
+    await client._client.delete(stream_name)
+    await client.close()
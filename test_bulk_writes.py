@@ -0,0 +1,128 @@
+import os
+import uuid
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session
+from shared_utils.queries.apache_age import _prepare_bulk_rows
+from shared_utils.queries.chunk_graphs import (
+    _collect_upserted, _previous_chunk_ids_stmt, _upsert_batches, _upsert_chunk_graphs_stmt, _upsert_counts, upsert_chunk_graphs,
+)
+from shared_utils.queries.chunks import _UPDATE_CHUNK_GRAPH_IDS, _update_chunk_graph_id_stmt
+from shared_utils.queries.documents import _update_document_statuses_stmt, _update_document_stmt
+from shared_utils.queries.ingestion_jobs import _update_ingestion_job_statuses_stmt, _update_ingestion_job_stmt
+from shared_utils.queries.query_cache import query_cache
+from shared_utils.sql_models import Chunk, ChunkGraph, DocumentMetadata
+
+def compile_pg(stmt):
+    return str(stmt.compile(dialect=postgresql.psycopg.dialect()))
+
+@pytest.fixture
+def pg_session():
+    """Session on the database of the POSTGRES_* environment variables, rolled back after the test."""
+    if not os.getenv("POSTGRES_USER"):
+        pytest.skip("POSTGRES_USER is not set")
+    from shared_utils.clients.db_client import db_client
+    with db_client.engine.connect() as connection:
+        transaction = connection.begin()
+        # commits of the code under test only release a savepoint
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            yield session
+        transaction.rollback()
+
+# Test 1: ChunkGraph upserts
+
+def test_upsert_batches_keep_the_last_graph_per_id():
+    graph_id = uuid.uuid4()
+    graphs = [
+        ChunkGraph(graph_id=graph_id, chunk_id=uuid.uuid4(), entities=["first"]),
+        ChunkGraph(graph_id=graph_id, chunk_id=uuid.uuid4(), entities=["retried"], relations=[("a", "r", "b")]),
+        ChunkGraph(graph_id=uuid.uuid4(), chunk_id=uuid.uuid4()),
+    ]
+    batches = list(_upsert_batches(iter(graphs), batch_size=2))
+    assert [len(rows) for rows in batches] == [1, 1]
+    assert batches[0][0]["entities"] == ["retried"]
+    assert batches[0][0]["relations"] == [("a", "r", "b")]
+    with pytest.raises(ValueError):
+        list(_upsert_batches(graphs, batch_size=0))
+
+def test_upsert_statement():
+    rows = next(_upsert_batches([ChunkGraph(graph_id=uuid.uuid4(), chunk_id=uuid.uuid4())], batch_size=10))
+    sql = compile_pg(_upsert_chunk_graphs_stmt(rows))
+    assert "ON CONFLICT (graph_id) DO UPDATE SET chunk_id = excluded.chunk_id, entities = excluded.entities" in sql
+    assert sql.startswith("INSERT INTO chunk_graphs")
+    assert sql.endswith("RETURNING chunk_graphs.graph_id, xmax = 0 AS inserted")
+    sql = compile_pg(_previous_chunk_ids_stmt(rows))
+    assert sql.startswith("SELECT chunk_graphs.graph_id, chunk_graphs.chunk_id \nFROM chunk_graphs \nWHERE chunk_graphs.graph_id IN (")
+    assert sql.endswith("FOR UPDATE")
+
+def test_moved_graphs_invalidate_their_previous_chunk_and_count_once():
+    moved, new = uuid.uuid4(), uuid.uuid4()
+    old_chunk, new_chunk, other_chunk = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    written, chunk_ids = {}, set()
+    _collect_upserted([(moved, old_chunk)], [(moved, False), (new, True)],
+                      [{"graph_id": moved, "chunk_id": new_chunk}, {"graph_id": new, "chunk_id": other_chunk}], written, chunk_ids)
+    # a later batch writing the graph inserted above again does not count it as updated too
+    _collect_upserted([(new, other_chunk)], [(new, False)], [{"graph_id": new, "chunk_id": other_chunk}], written, chunk_ids)
+    assert chunk_ids == {old_chunk, new_chunk, other_chunk}
+    assert _upsert_counts(written) == (1, 1)
+
+def test_upsert_invalidates_the_chunk_a_moved_graph_left(pg_session, monkeypatch):
+    document = DocumentMetadata(document_id=uuid.uuid4(), s3_key="docs/a.pdf", status="pending")
+    old_chunk, new_chunk = (Chunk(chunk_id=uuid.uuid4(), document_id=document.document_id, text="", page_number=page) for page in (1, 2))
+    graph_id, new_graph_id = uuid.uuid4(), uuid.uuid4()
+    pg_session.add_all([document, old_chunk, new_chunk, ChunkGraph(graph_id=graph_id, chunk_id=old_chunk.chunk_id)])
+    pg_session.commit()
+    invalidated = set()
+    monkeypatch.setattr(query_cache, "invalidate", lambda namespace, *keys: invalidated.update(keys))
+
+    counts = upsert_chunk_graphs(pg_session, [
+        ChunkGraph(graph_id=graph_id, chunk_id=new_chunk.chunk_id, entities=["moved"]),
+        ChunkGraph(graph_id=new_graph_id, chunk_id=new_chunk.chunk_id),
+    ])
+    assert counts == (1, 1)
+    assert invalidated == {old_chunk.chunk_id, new_chunk.chunk_id}
+
+# Test 2: Set-based updates
+
+def test_single_row_updates_return_the_id():
+    sql = compile_pg(_update_document_stmt(uuid.uuid4(), status="done"))
+    assert sql.startswith("UPDATE documentmetadata SET status=")
+    assert "WHERE documentmetadata.document_id = " in sql
+    assert sql.endswith("RETURNING documentmetadata.document_id")
+    sql = compile_pg(_update_ingestion_job_stmt(uuid.uuid4(), content={"pages": 3}))
+    assert sql.startswith("UPDATE ingestion_jobs SET content=")
+    assert "WHERE ingestion_jobs.job_id = " in sql
+    assert sql.endswith("RETURNING ingestion_jobs.job_id")
+    sql = compile_pg(_update_chunk_graph_id_stmt(uuid.uuid4(), uuid.uuid4()))
+    assert sql.startswith("UPDATE chunks SET graph_id=")
+    assert "WHERE chunks.chunk_id = " in sql
+    assert sql.endswith("RETURNING chunks.chunk_id")
+
+def test_bulk_status_updates_are_a_single_in_update():
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    sql = compile_pg(_update_document_statuses_stmt(ids, "done"))
+    assert sql.startswith("UPDATE documentmetadata SET status=")
+    assert "WHERE documentmetadata.document_id IN (" in sql
+    assert "RETURNING" not in sql
+    sql = compile_pg(_update_ingestion_job_statuses_stmt(ids, "done"))
+    assert sql.startswith("UPDATE ingestion_jobs SET status=")
+    assert "WHERE ingestion_jobs.job_id IN (" in sql
+
+def test_chunk_graph_ids_update_joins_unnested_arrays():
+    sql = compile_pg(_UPDATE_CHUNK_GRAPH_IDS)
+    assert "unnest(CAST(%(chunk_ids)s AS UUID[]), CAST(%(graph_ids)s AS UUID[]))" in sql
+    assert "WHERE c.chunk_id = v.chunk_id" in sql
+
+# Test 3: AGE bulk load rows
+
+def test_bulk_rows_write_each_vertex_once_with_or_without_deduplication():
+    relations = [("Alice", "knows", "Bob"), ("Alice", "knows", "Bob")]
+    for deduplicate, edges in ((True, 1), (False, 2)):
+        vertex_rows, edge_rows = _prepare_bulk_rows(["Alice", "Bob", "Alice"], relations, deduplicate)
+        assert [row["name"] for row in vertex_rows] == ["Alice", "Bob"]
+        assert len(edge_rows["KNOWS"]) == edges
+
+def test_bulk_rows_without_deduplication_keep_one_vertex_per_endpoint():
+    vertex_rows, edge_rows = _prepare_bulk_rows(["Alice", "Bob"], [("Alice", "knows", "Bob")], False)
+    assert len(vertex_rows) == 2
+    assert edge_rows == {"KNOWS": [{"src": vertex_rows[0]["id"], "dst": vertex_rows[1]["id"], "name": "knows"}]}
@@ -0,0 +1,42 @@
+from shared_utils.agtype_utils import Vertex, Edge
+from shared_utils.sql_models import LayoutName
+from shared_utils.visuals.cytoscape_export import node_element, edge_element
+from shared_utils.visuals.incremental import diff_elements, element_positions, incremental_layout, split_elements
+from shared_utils.visuals.layouts import layout_positions
+
+VERTICES = {i: Vertex(i, "Entity", {"id": f"ENTITY {i}"}) for i in range(1, 7)}
+EDGES = {100 + i: Edge(100 + i, "RELATED_TO", i, i + 1, {}) for i in range(1, 6)}
+
+def _export(vertices, edges, positions):
+    return [node_element(v, positions) for v in vertices.values()] + [edge_element(e) for e in edges.values()]
+
+# Test 1: Diff against the last export
+
+def test_diff_elements():
+    previous_nodes, previous_edges = split_elements(_export(VERTICES, EDGES, {}))
+    vertices = dict(VERTICES)
+    vertices[7] = Vertex(7, "Entity", {"id": "ENTITY 7"})
+    vertices[2] = Vertex(2, "Entity", {"id": "ENTITY 2", "name": "renamed"})
+    del vertices[6]
+    edges = {k: v for k, v in EDGES.items() if k != 105}
+    diff = diff_elements(vertices, edges, previous_nodes, previous_edges)
+    assert diff.added_nodes == {7}
+    assert diff.changed_nodes == {2}
+    assert diff.removed_nodes == {6}
+    assert diff.removed_edges == {105}
+    assert not diff.added_edges and not diff.changed_edges
+
+def test_unchanged_graph_has_empty_diff():
+    previous_nodes, previous_edges = split_elements(_export(VERTICES, EDGES, {1: (0.0, 0.0)}))
+    assert diff_elements(VERTICES, EDGES, previous_nodes, previous_edges).is_empty
+
+# Test 2: Only new vertices are placed
+
+def test_incremental_layout_keeps_existing_positions():
+    pairs = [(e.start_id, e.end_id) for e in EDGES.values()]
+    previous = layout_positions(LayoutName.SPRING, list(VERTICES), pairs, seed=0)
+    previous_nodes, _ = split_elements(_export(VERTICES, EDGES, previous))
+    positions = incremental_layout(LayoutName.SPRING, list(VERTICES) + [7, 8], pairs + [(7, 3), (8, 7)], element_positions(previous_nodes), seed=0)
+    assert all(positions[i] == previous[i] for i in VERTICES)
+    assert set(positions) == set(VERTICES) | {7, 8}
+    assert positions[7] not in previous.values()
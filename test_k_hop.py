@@ -0,0 +1,26 @@
+from shared_utils.agtype_utils import Vertex, Edge, Path
+from shared_utils.queries.apache_age import _collect_k_hop_rows, _k_hop_stmt, _merge_subgraphs
+
+A = Vertex(1, "Entity", {"id": "A"})
+B = Vertex(2, "Entity", {"id": "B"})
+A_TO_B = Edge(10, "RELATED_TO", 1, 2, {})
+
+# Test 1: Seeds are part of their neighbourhood
+
+def test_seed_without_outgoing_edges_keeps_its_vertex():
+    rows = [("A", A, Path((A, A_TO_B, B))), ("B", B, None)]
+    subgraphs = _collect_k_hop_rows(rows, ["A", "B", "MISSING"])
+    assert subgraphs["B"].vertices == {2: B}
+    assert subgraphs["B"].edges == {}
+    assert subgraphs["MISSING"].vertices == {}
+    merged = _merge_subgraphs(subgraphs.values())
+    assert set(merged.vertices) == {1, 2} and set(merged.edges) == {10}
+
+def test_agtype_text_rows():
+    rows = [('"B"', '{"id": 2, "label": "Entity", "properties": {"id": "B"}}::vertex', None)]
+    assert _collect_k_hop_rows(rows, ["B"])["B"].vertices == {2: B}
+
+def test_statement_optionally_matches_outgoing_paths():
+    stmt = _k_hop_stmt(2)
+    assert "OPTIONAL MATCH p=(a)-[*1..2]->(b)" in stmt
+    assert stmt.endswith("RETURN a.id, a, p")
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from shared_utils.sql_models import LayoutName
+from shared_utils.visuals.layouts import compute_layout, index_graph, layout_positions, _exact_repulsion, _grid_repulsion
+
+# two components (a 6-cycle with a chord and a path) plus an isolated node
+EDGES = np.array([(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 3), (6, 7), (7, 8), (8, 6), (7, 6)])
+NUM_NODES = 10
+
+# Test 1: Every layout returns finite positions scaled to the requested box
+
+@pytest.mark.parametrize("layout_name", list(LayoutName))
+def test_layout_shape(layout_name):
+    positions = compute_layout(layout_name, NUM_NODES, EDGES, seed=1, scale=100.0)
+    assert positions.shape == (NUM_NODES, 2)
+    assert np.isfinite(positions).all()
+    assert np.abs(positions).max() == pytest.approx(100.0)
+
+@pytest.mark.parametrize("layout_name", list(LayoutName))
+def test_layout_trivial_graphs(layout_name):
+    assert compute_layout(layout_name, 0, np.zeros((0, 2))).shape == (0, 2)
+    assert np.isfinite(compute_layout(layout_name, 1, np.zeros((0, 2)))).all()
+
+def test_layout_is_deterministic_for_a_seed():
+    first = compute_layout(LayoutName.SPRING, NUM_NODES, EDGES, seed=7)
+    second = compute_layout(LayoutName.SPRING, NUM_NODES, EDGES, seed=7)
+    assert np.array_equal(first, second)
+
+# Test 2: Layout specific structure
+
+def test_bipartite_layout_separates_the_two_sides():
+    edges = np.array([(0, 3), (0, 4), (1, 3), (2, 4)])
+    positions = compute_layout(LayoutName.BIPARTITE, 5, edges)
+    left, right = positions[[0, 1, 2], 0], positions[[3, 4], 0]
+    assert len(set(left)) == 1 and len(set(right)) == 1
+    assert left[0] != right[0]
+
+def test_spring_keeps_fixed_nodes_in_place():
+    initial = np.random.default_rng(0).random((NUM_NODES, 2)) * 500
+    fixed = np.zeros(NUM_NODES, dtype=bool)
+    fixed[:5] = True
+    positions = compute_layout(LayoutName.SPRING, NUM_NODES, EDGES, initial_positions=initial, fixed=fixed)
+    assert np.array_equal(positions[:5], initial[:5])
+    assert not np.array_equal(positions[5:], initial[5:])
+
+def test_grid_repulsion_matches_exact():
+    positions = np.random.default_rng(0).random((3000, 2))
+    exact, approximate = _exact_repulsion(positions), _grid_repulsion(positions)
+    assert np.linalg.norm(exact - approximate) / np.linalg.norm(exact) < 0.01
+
+# Test 3: AGE vertex ids
+
+def test_layout_positions_are_keyed_by_vertex_id():
+    vertex_ids = [844424930131971, 844424930131972, 844424930131973]
+    edge_pairs = [(844424930131971, 844424930131972), (844424930131972, 1)]  # unknown endpoint is dropped
+    ids, edges = index_graph(vertex_ids, edge_pairs)
+    assert edges.tolist() == [[0, 1]]
+    positions = layout_positions(LayoutName.CIRCULAR, vertex_ids, edge_pairs)
+    assert set(positions) == set(vertex_ids)
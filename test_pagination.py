@@ -0,0 +1,43 @@
+import uuid
+from sqlalchemy.dialects import postgresql
+from shared_utils.queries.chunks import ChunkCursor, _chunk_page, _chunks_from_doc_stmt
+from shared_utils.queries.documents import _document_page, _documents_stmt
+from shared_utils.response_models import GetDocumentsResponse
+from shared_utils.sql_models import DocumentMetadata
+from shared_utils.sql_models.Chunk import Chunk
+
+def compile_pg(stmt):
+    return str(stmt.compile(dialect=postgresql.psycopg.dialect()))
+
+def make_chunks(n):
+    document_id = uuid.uuid4()
+    return [Chunk(chunk_id=uuid.uuid4(), document_id=document_id, text="", page_number=i) for i in range(n)]
+
+# Test 1: Keyset statements
+
+def test_chunks_are_ordered_and_filtered_by_page_number_and_chunk_id():
+    sql = compile_pg(_chunks_from_doc_stmt(uuid.uuid4(), ChunkCursor(3, uuid.uuid4())))
+    assert "(chunks.page_number, chunks.chunk_id) > (%(param_1)s::INTEGER, %(param_2)s::UUID)" in sql
+    assert sql.endswith("ORDER BY chunks.page_number, chunks.chunk_id")
+    assert ">" not in compile_pg(_chunks_from_doc_stmt(uuid.uuid4()))
+
+def test_documents_are_ordered_by_id():
+    sql = compile_pg(_documents_stmt(uuid.uuid4()))
+    assert "WHERE documentmetadata.document_id > %(document_id_1)s" in sql
+    assert sql.endswith("ORDER BY documentmetadata.document_id")
+
+# Test 2: Next cursors
+
+def test_chunk_page_cursor_points_at_the_last_returned_chunk():
+    chunks = make_chunks(4)
+    page = _chunk_page(chunks, limit=3)
+    assert page.chunks == chunks[:3]
+    assert page.next_cursor == ChunkCursor(2, chunks[2].chunk_id)
+    assert _chunk_page(chunks[:3], limit=3).next_cursor is None
+
+def test_document_page_fills_get_documents_response():
+    documents = [DocumentMetadata(document_id=uuid.uuid4(), s3_key="", status="") for _ in range(3)]
+    page = _document_page(documents, limit=2)
+    response = GetDocumentsResponse(document_ids=[d.document_id for d in page.documents], next_cursor=page.next_cursor)
+    assert response.next_cursor == documents[1].document_id
+    assert GetDocumentsResponse(document_ids=[]).next_cursor is None
@@ -0,0 +1,26 @@
+import uuid
+from sqlalchemy.dialects import postgresql
+from shared_utils.queries.chunks import ChunkSummary, _chunk_summaries_stmt
+from shared_utils.queries.ingestion_jobs import _ingestion_job_status_stmt
+
+def compile_pg(stmt):
+    return str(stmt.compile(dialect=postgresql.psycopg.dialect()))
+
+# Test 1: Projections select only the columns they return
+
+def test_chunk_summaries_skip_the_text():
+    sql = compile_pg(_chunk_summaries_stmt(uuid.uuid4()))
+    assert sql.startswith("SELECT chunks.chunk_id, chunks.page_number, chunks.graph_id \nFROM chunks")
+    assert "chunks.text" not in sql
+    assert sql.endswith("ORDER BY chunks.page_number, chunks.chunk_id")
+
+def test_chunk_summary_is_a_lightweight_tuple():
+    summary = ChunkSummary(*(uuid.uuid4(), 3, None))
+    assert summary.page_number == 3 and summary.graph_id is None
+    assert ChunkSummary.__slots__ == ()
+
+def test_ingestion_job_status_skips_the_content():
+    sql = compile_pg(_ingestion_job_status_stmt(uuid.uuid4()))
+    assert sql.startswith("SELECT ingestion_jobs.status \nFROM ingestion_jobs")
+    assert "ingestion_jobs.content" not in sql
+    assert sql.endswith("WHERE ingestion_jobs.job_id = %(job_id_1)s::UUID")
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import uuid
+import pytest
+from shared_utils.cache_utils import TTLCache
+from shared_utils.queries.query_cache import QueryCache, cached_query, query_cache
+from shared_utils.sql_models import DocumentMetadata
+
+class DictRedis:
+    """In-memory stand-in for the versioned JSON interface of RedisClient."""
+    def __init__(self):
+        self.values = {}
+        self.versions = {}
+
+    def get_versioned_json(self, key, version_key):
+        return self.values.get(key), self.versions.get(version_key)
+
+    def set_versioned_json(self, key, value, version_key, version, ex=None):
+        if self.versions.get(version_key) != version:
+            return False
+        self.values[key] = value
+        return True
+
+    def bump_versions(self, version_keys, delete_keys=(), ex=None):
+        for version_key in version_keys:
+            self.versions[version_key] = str(int(self.versions.get(version_key, 0)) + 1)
+        for key in delete_keys:
+            self.values.pop(key, None)
+
+class AsyncDictRedis(DictRedis):
+    async def get_versioned_json(self, key, version_key):
+        return super().get_versioned_json(key, version_key)
+
+    async def set_versioned_json(self, key, value, version_key, version, ex=None):
+        return super().set_versioned_json(key, value, version_key, version, ex)
+
+    async def bump_versions(self, version_keys, delete_keys=(), ex=None):
+        return super().bump_versions(version_keys, delete_keys, ex)
+
+class CountingQueries:
+    """Query functions over an in-memory table, counting database round trips."""
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+
+    def get(self, session, document_id):
+        self.calls += 1
+        row = self.rows.get(document_id)
+        return row.model_copy() if row else None
+
+@pytest.fixture
+def cache():
+    yield query_cache
+    query_cache.disable()
+
+def make_document(status="pending"):
+    return DocumentMetadata(document_id=uuid.uuid4(), s3_key="docs/a.pdf", status=status)
+
+# Test 1: TTL cache
+
+def test_ttl_cache_expires_entries():
+    ttl_cache = TTLCache(maxsize=2, ttl=0.01)
+    ttl_cache.put("a", 1)
+    assert ttl_cache.get("a") == 1
+    time.sleep(0.02)
+    assert "a" not in ttl_cache
+    assert ttl_cache.get("a") is None
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+# Test 2: Read-through and invalidation
+
+def test_cached_query_reads_through_once(cache):
+    queries = CountingQueries()
+    get_document = cached_query("document", DocumentMetadata)(queries.get)
+    document = make_document()
+    queries.rows[document.document_id] = document
+
+    assert get_document(None, document.document_id) == document  # disabled: straight to the database
+    cache.configure(redis_client=DictRedis())
+    first = get_document(None, document.document_id)
+    second = get_document(None, document_id=document.document_id)
+    assert first == second == document
+    assert first is not second  # every hit is a detached copy
+    assert queries.calls == 2
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_invalidation_drops_both_tiers(cache):
+    redis = DictRedis()
+    cache.configure(redis_client=redis)
+    queries = CountingQueries()
+    get_document = cached_query("document", DocumentMetadata)(queries.get)
+    document = make_document()
+    queries.rows[document.document_id] = document
+    get_document(None, document.document_id)
+    assert redis.values
+
+    queries.rows[document.document_id] = document.model_copy(update={"status": "processed"})
+    cache.invalidate("document", document.document_id)
+    assert not redis.values
+    assert get_document(None, document.document_id).status == "processed"
+
+def test_rows_read_before_an_invalidation_are_not_cached(cache):
+    cache.configure()
+    document = make_document()
+    _, read = cache.get("document", document.document_id, DocumentMetadata)
+    cache.invalidate("document", document.document_id)
+    cache.put("document", document.document_id, document, read)
+    assert cache.get("document", document.document_id, DocumentMetadata)[0] is None
+
+def test_rows_invalidated_by_another_process_are_not_written_to_redis():
+    redis = DictRedis()
+    reader, writer, other = QueryCache(), QueryCache(), QueryCache()
+    for cache in (reader, writer, other):
+        cache.configure(redis_client=redis)
+    stale = make_document()
+    _, read = reader.get("document", stale.document_id, DocumentMetadata)
+    writer.invalidate("document", stale.document_id)  # the row was updated while the reader queried it
+    reader.put("document", stale.document_id, stale, read)
+    assert other.get("document", stale.document_id, DocumentMetadata)[0] is None
+    assert reader.stats()["redis"]["rejected"] == 1
+
+def test_writers_with_the_cache_disabled_still_invalidate_redis():
+    redis = DictRedis()
+    reader, writer = QueryCache(), QueryCache()
+    reader.configure(redis_client=redis)
+    writer.configure(redis_client=redis)
+    writer.disable()
+    document = make_document()
+    reader.put("document", document.document_id, document, reader.get("document", document.document_id, DocumentMetadata)[1])
+    writer.invalidate("document", document.document_id)
+    assert not redis.values
+    assert redis.versions == {f"query-cache-version:document:{document.document_id}": "1"}
+
+def test_redis_tier_is_shared_between_processes():
+    redis = DictRedis()
+    writer, reader = QueryCache(), QueryCache()
+    writer.configure(redis_client=redis)
+    reader.configure(redis_client=redis)
+    document = make_document()
+    writer.put("document", document.document_id, document, writer.get("document", document.document_id, DocumentMetadata)[1])
+    assert reader.get("document", document.document_id, DocumentMetadata)[0] == document
+    assert reader.stats()["redis"]["hits"] == 1
+
+def test_async_cached_query(cache):
+    cache.configure(async_redis_client=AsyncDictRedis())
+    queries = CountingQueries()
+
+    @cached_query("document", DocumentMetadata)
+    async def async_get_document(session, document_id):
+        return queries.get(session, document_id)
+
+    document = make_document()
+    queries.rows[document.document_id] = document
+
+    async def run():
+        assert await async_get_document(None, document.document_id) == document
+        assert await async_get_document(None, document.document_id) == document
+        await query_cache.async_invalidate("document", document.document_id)
+        assert await async_get_document(None, document.document_id) == document
+
+    asyncio.run(run())
+    assert queries.calls == 2
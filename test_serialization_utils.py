@@ -0,0 +1,27 @@
+import numpy as np
+from shared_utils.serialization_utils import normalize_entity_id, normalize_entity_ids
+
+# Test 1: Normalization rules
+
+def test_normalize_entity_id():
+    assert normalize_entity_id("Marie Curie") == "marie_curie"
+    assert normalize_entity_id("  José  García!! ") == "jose_garcia"
+    assert normalize_entity_id("Straße & Co. KG") == "strae_co_kg"
+    assert normalize_entity_id("Ångström-Müller") == "angstrom_muller"
+    assert normalize_entity_id("日本") == ""
+
+def test_normalize_entity_id_is_memoized():
+    normalize_entity_id.cache_clear()
+    normalize_entity_id("Protein Folding")
+    normalize_entity_id("Protein Folding")
+    info = normalize_entity_id.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+# Test 2: Batch API
+
+def test_normalize_entity_ids():
+    names = ["Zoë", "NASA", "Zoë", "Acme Corp."]
+    assert normalize_entity_ids(names) == ["zoe", "nasa", "zoe", "acme_corp"]
+    assert normalize_entity_ids(iter(names)) == normalize_entity_ids(names)
+    assert normalize_entity_ids(np.array(names)) == normalize_entity_ids(names)
+    assert normalize_entity_ids([]) == []
@@ -0,0 +1,75 @@
+import uuid
+import pytest
+from pydantic import ValidationError
+from shared_utils.clients.utils.stream_codecs import DecodedMessage, StreamCodec
+from shared_utils.event_models.ProcessChunkRequestEvent import ProcessChunkRequestEvent
+
+def make_event(text):
+    return ProcessChunkRequestEvent(job_id=uuid.uuid4(), chunk_id=uuid.uuid4(), document_id=uuid.uuid4(), text=text)
+
+def as_read(fields):
+    # redis-py returns field names and values as bytes
+    return {key.encode('utf-8'): value for key, value in fields.items()}
+
+# Test 1: JSON codec and legacy entries
+
+def test_json_round_trip():
+    event = make_event("short")
+    fields = StreamCodec().encode(event)
+    assert fields["codec"] == b"json"
+    assert StreamCodec().decode(as_read(fields)) == event.model_dump(mode='json')
+
+def test_entries_without_codec_are_legacy_json():
+    event = make_event("legacy")
+    assert StreamCodec(compression="zlib").decode({b"data": event.model_dump_json().encode('utf-8')}) == event.model_dump(mode='json')
+    assert StreamCodec().decode({b"other": b"x"}) is None
+
+# Test 2: Compression above the threshold only
+
+def test_zlib_compresses_large_payloads():
+    codec = StreamCodec(compression="zlib", compression_threshold=1024)
+    small, large = codec.encode(make_event("a" * 10)), codec.encode(make_event("chunk text " * 1000))
+    assert small["codec"] == b"json"
+    assert large["codec"] == b"json+zlib"
+    assert len(large["data"]) < 1000
+    # any consumer decodes it, whatever codec it sends with
+    assert StreamCodec().decode(as_read(large))["text"] == "chunk text " * 1000
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        StreamCodec(serializer="pickle")
+    with pytest.raises(ValueError):
+        StreamCodec().decode({b"data": b"x", b"codec": b"json+lz4"})
+
+# Test 3: Optional codecs
+
+def test_msgpack_zstd_round_trip():
+    pytest.importorskip("msgpack")
+    pytest.importorskip("zstandard")
+    event = make_event("chunk text " * 1000)
+    fields = StreamCodec(serializer="msgpack", compression="zstd").encode(event)
+    assert fields["codec"] == b"msgpack+zstd"
+    assert StreamCodec().decode(as_read(fields)) == event.model_dump(mode='json')
+
+# Test 4: Typed decoding, once per event type
+
+def test_decode_model_validates_raw_json():
+    event = make_event("chunk text " * 1000)
+    for codec in (StreamCodec(), StreamCodec(compression="zlib")):
+        assert codec.decode_model(as_read(codec.encode(event)), ProcessChunkRequestEvent) == event
+    with pytest.raises(ValidationError):
+        StreamCodec().decode_model({b"data": b'{"text": 1}'}, ProcessChunkRequestEvent)
+
+def test_decoded_message_is_shared_between_callbacks():
+    message = DecodedMessage(StreamCodec(), as_read(StreamCodec().encode(make_event("shared"))))
+    assert message.decode(ProcessChunkRequestEvent) is message.decode(ProcessChunkRequestEvent)
+    assert message.decode()["text"] == "shared"
+    assert not message.errors
+
+def test_decoded_message_keeps_errors():
+    message = DecodedMessage(StreamCodec(), {b"data": b'{"text": "no ids"}'})
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            message.decode(ProcessChunkRequestEvent)
+    assert list(message.errors) == [ProcessChunkRequestEvent]
+    assert message.decode() == {"text": "no ids"}
@@ -0,0 +1,34 @@
+from shared_utils.clients.utils.stream_recovery import idle_consumers, split_claimed, unique_consumer_name
+
+# Test 1: Every process reads under its own consumer name
+
+def test_unique_consumer_name():
+    first, second = unique_consumer_name("chunk-processing"), unique_consumer_name("chunk-processing")
+    assert first.startswith("chunk-processing-")
+    assert first != second
+
+# Test 2: XAUTOCLAIM responses
+
+def test_split_claimed_redis_7():
+    response = [b"1700000000000-3", [(b"1-0", {b"data": b"{}"})], [b"0-5"]]
+    cursor, messages, deleted = split_claimed(response)
+    assert cursor == "1700000000000-3"
+    assert messages == [(b"1-0", {b"data": b"{}"})]
+    assert deleted == [b"0-5"]
+
+def test_split_claimed_reports_entries_without_fields_as_deleted():
+    cursor, messages, deleted = split_claimed([b"0-0", [(b"1-0", None), (b"2-0", {b"data": b"{}"}), (None, None)]])
+    assert cursor == "0-0"
+    assert [msg_id for msg_id, _ in messages] == [b"2-0"]
+    assert deleted == [b"1-0"]
+
+# Test 3: Only idle consumers without pending messages are deleted
+
+def test_idle_consumers():
+    consumers = [
+        {"name": b"me", "pending": 0, "idle": 10_000_000},
+        {"name": b"crashed-with-pending", "pending": 3, "idle": 10_000_000},
+        {"name": b"crashed", "pending": 0, "idle": 10_000_000},
+        {"name": b"alive", "pending": 0, "idle": 500},
+    ]
+    assert idle_consumers(consumers, "me", idle_timeout_ms=60_000) == ["crashed"]
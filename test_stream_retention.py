@@ -0,0 +1,45 @@
+import pytest
+from pydantic import ValidationError
+from shared_utils.clients.utils.stream_retention import (
+    StreamRetentionPolicy, age_cutoff_id, parse_stream_id, safe_trim_id, trim_id, xadd_trim_args,
+)
+
+# Test 1: Policies
+
+def test_policy_needs_a_bound():
+    with pytest.raises(ValidationError):
+        StreamRetentionPolicy()
+    with pytest.raises(ValidationError):
+        StreamRetentionPolicy(max_len=0)
+
+def test_stream_ids_compare_numerically():
+    assert parse_stream_id(b"1700000000000-12") == (1700000000000, 12)
+    assert parse_stream_id("99-0") < parse_stream_id("100-0")
+    assert age_cutoff_id(60, now=1000.0) == "940000-0"
+
+# Test 2: The trimmer never passes the oldest entry a consumer group still needs
+
+def test_safe_trim_id():
+    groups = [
+        {"name": b"caught-up", "pending": 0, "last-delivered-id": b"500-3"},
+        {"name": b"behind", "pending": 2, "last-delivered-id": b"900-0"},
+    ]
+    assert safe_trim_id(groups, {"behind": b"300-1"}) == "300-1"
+    assert safe_trim_id(groups[:1], {}) == "500-4"
+    assert safe_trim_id([], {}) is None
+
+def test_trim_id_is_bounded_by_safe_id():
+    policy = StreamRetentionPolicy(max_age_seconds=60)
+    assert trim_id(policy, "300-1", now=1000.0) == "300-1"
+    assert trim_id(policy, "950000-0", now=1000.0) == "940000-0"
+    assert trim_id(policy, None, now=1000.0) == "940000-0"
+    assert trim_id(StreamRetentionPolicy(max_len=10), "300-1") is None
+
+# Test 3: Trimming on produce
+
+def test_xadd_trim_args():
+    assert xadd_trim_args(None, "1-0") == {}
+    assert xadd_trim_args(StreamRetentionPolicy(max_len=1000, max_age_seconds=60), "1-0") == {"maxlen": 1000, "approximate": True}
+    age = StreamRetentionPolicy(max_age_seconds=60, approximate=False)
+    assert xadd_trim_args(age, None) == {}
+    assert xadd_trim_args(age, "1-0") == {"minid": "1-0", "approximate": False}